@@ -0,0 +1,167 @@
+# Integer base conversion for very long digit strings, bases 2 to 36.
+# - Between power-of-two bases (2, 4, 8, 16, 32) digits are regrouped through
+#   their bit patterns with lookup tables, in linear time and without ever
+#   building a Python int.
+# - Other pairs go through an int built and printed with divide-and-conquer
+#   (splitting at cached powers of the base), which avoids the quadratic
+#   digit-by-digit loops and the 4300-digit limit of int()/str().
+
+DIGITS = "0123456789abcdefghijklmnopqrstuvwxyz"
+PREFIXES = {2: "0b", 8: "0o", 16: "0x"}
+LEAF = 512
+
+_bits_tables = {}
+_digit_tables = {}
+_powers = {}
+
+
+def _power_of_two(base):
+    bits = base.bit_length() - 1
+    return bits if base == 1 << bits else None
+
+
+def check_base(base):
+    if not 2 <= base <= 36:
+        raise ValueError(f"base {base} hors de l'intervalle 2–36")
+
+
+def _split_sign(text, base):
+    text = text.strip().replace("_", "").lower()
+    sign = ""
+    if text and text[0] in "+-":
+        sign, text = ("-" if text[0] == "-" else ""), text[1:]
+    prefix = PREFIXES.get(base)
+    if prefix and text.startswith(prefix):
+        text = text[2:]
+    if not text:
+        raise ValueError("Entrée vide")
+    bad = set(text) - set(DIGITS[:base])
+    if bad:
+        raise ValueError(f"chiffre invalide pour la base {base} : {sorted(bad)[0]!r}")
+    return sign, text
+
+
+# -- power-of-two regrouping ---------------------------------------------
+
+def _bits_table(bits):
+    table = _bits_tables.get(bits)
+    if table is None:
+        table = _bits_tables[bits] = {DIGITS[i]: format(i, f"0{bits}b") for i in range(1 << bits)}
+    return table
+
+
+def _digit_table(bits):
+    table = _digit_tables.get(bits)
+    if table is None:
+        table = _digit_tables[bits] = {format(i, f"0{bits}b"): DIGITS[i] for i in range(1 << bits)}
+    return table
+
+
+def regroup(digits, from_bits, to_bits):
+    bit_string = "".join(map(_bits_table(from_bits).__getitem__, digits)).lstrip("0")
+    if not bit_string:
+        return "0"
+    if to_bits == 1:
+        return bit_string
+    pad = -len(bit_string) % to_bits
+    bit_string = "0" * pad + bit_string
+    table = _digit_table(to_bits)
+    return "".join(table[bit_string[i:i + to_bits]] for i in range(0, len(bit_string), to_bits))
+
+
+# -- divide and conquer through int ----------------------------------------
+
+def _power(base, exponent):
+    key = (base, exponent)
+    value = _powers.get(key)
+    if value is None:
+        value = _powers[key] = base ** exponent
+    return value
+
+
+def _trim_powers(max_exponent=1 << 16):
+    # Keep the small powers for the next values of a bulk conversion, drop
+    # the huge ones a single long input needed.
+    for key in [key for key in _powers if key[1] > max_exponent]:
+        del _powers[key]
+
+
+def parse_int(digits, base):
+    n = len(digits)
+    if n <= LEAF:
+        return int(digits, base)
+    # Split so the low part has LEAF * 2^k digits: the same powers are reused.
+    k = LEAF
+    while k * 2 < n:
+        k *= 2
+    high, low = digits[:-k], digits[-k:]
+    return parse_int(high, base) * _power(base, k) + parse_int(low, base)
+
+
+def _small_to_string(n, base):
+    if base == 10:
+        return str(n)
+    spec = {2: "b", 8: "o", 16: "x"}.get(base)
+    if spec:
+        return format(n, spec)
+    out = []
+    while n:
+        n, d = divmod(n, base)
+        out.append(DIGITS[d])
+    return "".join(reversed(out)) or "0"
+
+
+def format_int(n, base):
+    if n < 0:
+        return "-" + format_int(-n, base)
+    if n < _power(base, LEAF):
+        return _small_to_string(n, base)
+    k = LEAF
+    while _power(base, k * 2) <= n:
+        k *= 2
+    high, low = divmod(n, _power(base, k))
+    return format_int(high, base) + format_int(low, base).zfill(k)
+
+
+# -- public API -------------------------------------------------------------
+
+def convert(text, from_base, to_base, prefix=False):
+    check_base(from_base)
+    check_base(to_base)
+    sign, digits = _split_sign(text, from_base)
+    from_bits, to_bits = _power_of_two(from_base), _power_of_two(to_base)
+    if from_bits and to_bits:
+        out = regroup(digits, from_bits, to_bits)
+    elif from_base == to_base:
+        out = digits.lstrip("0") or "0"
+    else:
+        try:
+            out = format_int(parse_int(digits, from_base), to_base)
+        finally:
+            _trim_powers()
+    if out == "0":
+        sign = ""
+    if prefix:
+        out = PREFIXES.get(to_base, "") + out
+    return sign + out
+
+
+def convert_stream(lines, from_base, to_base, prefix=False):
+    # Lazily converts one value per line; only the current line is in memory.
+    # Yields (input, result, ok).
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield line, convert(line, from_base, to_base, prefix), True
+        except ValueError as e:
+            yield line, f"Erreur : {e}", False
+
+
+def convert_file(source, target, from_base, to_base, prefix=False):
+    errors = 0
+    for line, result, ok in convert_stream(source, from_base, to_base, prefix):
+        errors += not ok
+        target.write(result + "\n")
+    return errors
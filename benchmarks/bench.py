@@ -0,0 +1,273 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+# Headless benchmark harness. Every case runs the same code path as one of the
+# GUI actions ('=', ∂f(x), ∫f(x), plot, unit and base conversion) over the
+# stored corpus, times each operation, and reports latency percentiles and
+# throughput. Results can be saved as a baseline and later runs compared
+# against it; a case whose median latency grew by more than the threshold is
+# flagged as a regression.
+
+CORPUS = os.path.join(HERE, "corpus.json")
+BASELINE = os.path.join(HERE, "baseline.json")
+CASES = {}
+
+
+def case(name, repeat=5):
+    def register(fn):
+        CASES[name] = (fn, repeat)
+        return fn
+    return register
+
+
+class Op:
+    # One timed operation; `reset` runs untimed before it (cold caches),
+    # `items` is how many values it processes (for throughput).
+
+    def __init__(self, fn, reset=None, items=1):
+        self.fn = fn
+        self.reset = reset
+        self.items = items
+
+
+# -- cases -------------------------------------------------------------------
+
+@case("evaluate")
+def bench_evaluate(corpus):
+    from calculator_core import evaluate_for_display
+    return [Op(lambda e=e: evaluate_for_display(e)) for e in corpus["expressions"]]
+
+
+@case("evaluate_cold")
+def bench_evaluate_cold(corpus):
+    import expression_engine
+    from calculator_core import evaluate_for_display
+    return [Op(lambda e=e: evaluate_for_display(e), reset=expression_engine.clear_cache)
+            for e in corpus["expressions"]]
+
+
+@case("evaluate_precise")
+def bench_evaluate_precise(corpus):
+    from calculator_core import evaluate_for_display
+    return [Op(lambda e=e: evaluate_for_display(e, 30)) for e in corpus["precise_expressions"]]
+
+
+@case("derivative_cold", repeat=3)
+def bench_derivative_cold(corpus):
+    import symbolic
+    return [Op(lambda t=t: symbolic.derivative_at(t, 0.75), reset=symbolic.clear_caches)
+            for t in corpus["functions"]]
+
+
+@case("derivative_warm")
+def bench_derivative_warm(corpus):
+    import symbolic
+    return [Op(lambda t=t: symbolic.derivative_at(t, 0.75)) for t in corpus["functions"]]
+
+
+@case("integral", repeat=3)
+def bench_integral(corpus):
+    import integration
+    import symbolic
+
+    def reset():
+        # The sympy worker process has caches of its own: start a new one.
+        symbolic.clear_caches()
+        integration.restart()
+    return [Op(lambda t=t, a=a, b=b: integration.definite_integral(t, a, b), reset=reset)
+            for t, a, b in corpus["integrals"]]
+
+
+@case("integral_numerical", repeat=3)
+def bench_integral_numerical(corpus):
+    import integration
+    return [Op(lambda t=t, a=a, b=b: integration.numerical_integral(t, a, b))
+            for t, a, b in corpus["integrals"]]
+
+
+@case("plot", repeat=3)
+def bench_plot(corpus):
+    import plot_sampler
+
+    def plot(text, xmin, xmax):
+        f = plot_sampler.make_vector_function(text)
+        x, y = plot_sampler.sample_function(f, xmin, xmax)
+        plot_sampler.view_limits(x, y)
+        return len(x)
+
+    return [Op(lambda t=t, a=a, b=b: plot(t, a, b)) for t, a, b in corpus["plots"]]
+
+
+@case("units_scalar")
+def bench_units_scalar(corpus, count=10000):
+    from calculator_core import convert_units
+    values = [random.uniform(-1e3, 1e3) for _ in range(count)]
+
+    def run(conv_type, from_unit, to_unit):
+        for v in values:
+            convert_units(v, conv_type, from_unit, to_unit)
+
+    return [Op(lambda c=c: run(*c), items=count) for c in corpus["conversions"]]
+
+
+@case("units_array")
+def bench_units_array(corpus, count=1000000):
+    import numpy as np
+    import unit_registry
+    values = np.random.default_rng(0).uniform(-1e3, 1e3, count)
+    return [Op(lambda c=c: unit_registry.convert_array(values, *c), items=count)
+            for c in corpus["conversions"]]
+
+
+@case("base", repeat=3)
+def bench_base(corpus):
+    import base_convert
+    from calculator_core import BASES, convert_base
+    ops = []
+    for from_name, to_name, length in corpus["bases"]:
+        digits = base_convert.DIGITS[:BASES[from_name]]
+        text = "".join(random.choice(digits) for _ in range(length))
+        ops.append(Op(lambda t=text, f=from_name, to=to_name: convert_base(t, f, to), items=length))
+    return ops
+
+
+# -- running and reporting -----------------------------------------------------
+
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return float("nan")
+    pos = (len(sorted_values) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def run_case(name, corpus, repeat, warmup=1):
+    fn, default_repeat = CASES[name]
+    random.seed(0)
+    ops = fn(corpus)
+    # Every op once per warm-up pass, so warm cases time no first call (cold
+    # cases reset their caches before each timed call anyway).
+    for _ in range(warmup):
+        for op in ops:
+            op.fn()
+    samples = []
+    items = 0
+    for _ in range(repeat or default_repeat):
+        for op in ops:
+            if op.reset:
+                op.reset()
+            start = time.perf_counter()
+            op.fn()
+            samples.append(time.perf_counter() - start)
+            items += op.items
+    samples.sort()
+    total = sum(samples)
+    return {
+        "ops": len(samples),
+        "p50_ms": percentile(samples, 0.50) * 1e3,
+        "p90_ms": percentile(samples, 0.90) * 1e3,
+        "p99_ms": percentile(samples, 0.99) * 1e3,
+        "max_ms": samples[-1] * 1e3,
+        "mean_ms": total / len(samples) * 1e3,
+        "items_per_s": items / total if total else float("inf"),
+    }
+
+
+def compare(results, baseline, threshold):
+    regressions = []
+    for name, stats in results.items():
+        base = baseline.get("results", {}).get(name)
+        if not base:
+            continue
+        stats["ratio"] = stats["p50_ms"] / base["p50_ms"] if base["p50_ms"] else None
+        if stats["ratio"] is not None and stats["ratio"] > 1 + threshold:
+            regressions.append(name)
+    return regressions
+
+
+def format_table(results, regressions):
+    header = f"{'case':<20}{'ops':>6}{'p50 ms':>11}{'p90 ms':>11}{'p99 ms':>11}{'items/s':>14}{'vs base':>10}"
+    lines = [header, "-" * len(header)]
+    for name, s in results.items():
+        ratio = s.get("ratio")
+        shown = f"{ratio:.2f}x" if ratio is not None else "-"
+        flag = "  REGRESSION" if name in regressions else ""
+        lines.append(f"{name:<20}{s['ops']:>6}{s['p50_ms']:>11.3f}{s['p90_ms']:>11.3f}"
+                     f"{s['p99_ms']:>11.3f}{s['items_per_s']:>14.1f}{shown:>10}{flag}")
+    return "\n".join(lines)
+
+
+def environment():
+    return {"python": platform.python_version(), "machine": platform.machine(),
+            "platform": platform.platform(), "time": time.strftime("%Y-%m-%d %H:%M:%S")}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run the calculator benchmarks headless.")
+    parser.add_argument("cases", nargs="*", help="cases to run (default: all): " + ", ".join(CASES))
+    parser.add_argument("--corpus", default=CORPUS, help="corpus file (default: benchmarks/corpus.json)")
+    parser.add_argument("--repeat", type=int, default=0,
+                        help="passes over the corpus per case (default: per-case setting)")
+    parser.add_argument("--baseline", default=BASELINE,
+                        help="baseline to compare against (default: benchmarks/baseline.json)")
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="write this run's results to the baseline file")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="flag a case whose median is this much slower than the baseline "
+                             "(default: 0.25, i.e. +25%%)")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.cases if name not in CASES]
+    if unknown:
+        parser.error("unknown case: " + ", ".join(unknown))
+    with open(args.corpus, encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    results = {}
+    try:
+        for name in args.cases or CASES:
+            print(f"running {name}...", file=sys.stderr)
+            results[name] = run_case(name, corpus, args.repeat)
+    finally:
+        if "integration" in sys.modules:
+            sys.modules["integration"].shutdown()
+
+    baseline = {}
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    regressions = compare(results, baseline, args.threshold)
+    print(format_table(results, regressions))
+
+    report = {"environment": environment(), "results": results}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.save_baseline:
+        if os.path.exists(args.baseline):
+            # Keep the cases this run skipped.
+            with open(args.baseline, encoding="utf-8") as f:
+                previous = json.load(f).get("results", {})
+            report["results"] = {**previous, **results}
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"baseline saved to {args.baseline}", file=sys.stderr)
+    elif regressions:
+        print(f"{len(regressions)} regression(s) above +{args.threshold:.0%}: "
+              + ", ".join(regressions), file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from bench import CORPUS, percentile
+
+# Load-test client for calculator_server.py. Concurrent clients send a mix of
+# requests built from the benchmark corpus over HTTP (one keep-alive
+# connection each) or the Unix socket, a share of them repeated so the result
+# cache is exercised, and the run reports throughput, latency percentiles and
+# the server's own counters (cache hit rate, mean batch size).
+
+SERVER = os.path.join(os.path.dirname(HERE), "calculator_server.py")
+DEFAULT_MIX = "evaluate=6,units=3,base=1,derivative=1"
+
+
+def make_requests(corpus, count, mix, repeat_ratio, seed=0):
+    rng = random.Random(seed)
+    weights = dict((name, float(w)) for name, w in (item.split("=") for item in mix.split(",")))
+
+    def fresh(op):
+        if op == "evaluate":
+            return {"op": op, "expression": f"{rng.choice(corpus['expressions'])} + {rng.randint(0, 10**6)}"}
+        if op == "units":
+            conv_type, from_unit, to_unit = rng.choice(corpus["conversions"])
+            return {"op": op, "value": rng.uniform(-1e3, 1e3), "type": conv_type,
+                    "from_unit": from_unit, "to_unit": to_unit}
+        if op == "base":
+            return {"op": op, "value": str(rng.randint(0, 10**30)), "from_base": "Decimal",
+                    "to_base": rng.choice(["Binary", "Hexadecimal"])}
+        if op == "derivative":
+            return {"op": op, "function": rng.choice(corpus["functions"]), "x": round(rng.uniform(0.1, 3), 2)}
+        if op == "integral":
+            function, a, b = rng.choice(corpus["integrals"])
+            return {"op": op, "function": function, "a": a, "b": b}
+        raise ValueError(f"unknown operation in --mix: {op}")
+
+    ops, w = zip(*weights.items())
+    requests = []
+    for _ in range(count):
+        if requests and rng.random() < repeat_ratio:
+            requests.append(rng.choice(requests))
+        else:
+            requests.append(fresh(rng.choices(ops, w)[0]))
+    return requests
+
+
+class HttpClient:
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.reader = self.writer = None
+
+    async def call(self, request):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps({k: v for k, v in request.items() if k != "op"}).encode()
+        self.writer.write(f"POST /{request['op']} HTTP/1.1\r\nHost: {self.host}\r\n"
+                          f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+        await self.writer.drain()
+        await self.reader.readline()
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        return json.loads(await self.reader.readexactly(length))
+
+    async def stats(self):
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        writer.write(f"GET /stats HTTP/1.1\r\nHost: {self.host}\r\nConnection: close\r\n\r\n".encode())
+        data = await reader.read()
+        writer.close()
+        return json.loads(data.split(b"\r\n\r\n", 1)[1])
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+class UnixClient:
+    def __init__(self, path):
+        self.path = path
+        self.reader = self.writer = None
+
+    async def call(self, request):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_unix_connection(self.path)
+        self.writer.write(json.dumps(request).encode() + b"\n")
+        await self.writer.drain()
+        return json.loads(await self.reader.readline())
+
+    async def stats(self):
+        client = UnixClient(self.path)
+        try:
+            return await client.call({"op": "stats"})
+        finally:
+            client.close()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def run_load(make_client, requests, concurrency):
+    latencies = []
+    errors = []
+    queue = iter(requests)
+
+    async def worker():
+        client = make_client()
+        try:
+            for request in queue:
+                start = time.perf_counter()
+                reply = await client.call(request)
+                latencies.append(time.perf_counter() - start)
+                if not reply.get("ok"):
+                    errors.append(reply.get("error"))
+        finally:
+            client.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stats = await make_client().stats()
+    return elapsed, sorted(latencies), errors, stats
+
+
+def spawn_server(args):
+    # Starts calculator_server.py on a free port (or the Unix socket) and
+    # returns the process and its address once it is listening.
+    command = [sys.executable, SERVER, "--processes", str(args.processes)]
+    command += ["--unix", args.unix] if args.unix else ["--port", "0"]
+    process = subprocess.Popen(command, stderr=subprocess.PIPE, text=True)
+    for line in process.stderr:
+        if "listening on" in line:
+            return process, line.rsplit(" ", 1)[1].strip()
+    raise SystemExit("the server did not start")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the throughput of calculator_server.py.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", metavar="PATH", help="use the server's Unix socket instead of HTTP")
+    parser.add_argument("--spawn", action="store_true",
+                        help="start a server for the run (on a free port) and stop it afterwards")
+    parser.add_argument("--processes", type=int, default=2, help="with --spawn: sympy worker processes")
+    parser.add_argument("--requests", type=int, default=5000, help="number of requests (default: 5000)")
+    parser.add_argument("--concurrency", type=int, default=32, help="concurrent clients (default: 32)")
+    parser.add_argument("--repeat", type=float, default=0.3,
+                        help="share of requests repeating an earlier one (default: 0.3)")
+    parser.add_argument("--mix", default=DEFAULT_MIX,
+                        help=f"operation weights (default: {DEFAULT_MIX}; also integral)")
+    parser.add_argument("--corpus", default=CORPUS, help="corpus file (default: benchmarks/corpus.json)")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    with open(args.corpus, encoding="utf-8") as f:
+        corpus = json.load(f)
+    requests = make_requests(corpus, args.requests, args.mix, args.repeat)
+
+    process = None
+    host, port = args.host, args.port
+    if args.spawn:
+        process, address = spawn_server(args)
+        if not args.unix:
+            host, port = address.rsplit("/", 1)[1].rsplit(":", 1)
+            port = int(port)
+    make_client = (lambda: UnixClient(args.unix)) if args.unix else (lambda: HttpClient(host, port))
+    try:
+        elapsed, latencies, errors, stats = asyncio.run(run_load(make_client, requests, args.concurrency))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    result = {
+        "requests": len(latencies),
+        "concurrency": args.concurrency,
+        "seconds": elapsed,
+        "requests_per_s": len(latencies) / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1e3,
+        "p90_ms": percentile(latencies, 0.90) * 1e3,
+        "p99_ms": percentile(latencies, 0.99) * 1e3,
+        "errors": len(errors),
+        "server": stats,
+    }
+    print(f"{result['requests']} requests, {args.concurrency} clients, {elapsed:.2f} s: "
+          f"{result['requests_per_s']:.0f} req/s")
+    print(f"latency p50 {result['p50_ms']:.2f} ms  p90 {result['p90_ms']:.2f} ms  p99 {result['p99_ms']:.2f} ms")
+    cache = stats.get("cache", {})
+    print(f"cache hit rate {cache.get('hit_rate', 0):.0%}, {stats.get('shared_in_flight', 0)} shared in flight, "
+          f"mean batch {stats.get('mean_batch', 0):.1f}, {len(errors)} error(s)")
+    for error in sorted(set(map(str, errors)))[:5]:
+        print(f"  error: {error}", file=sys.stderr)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
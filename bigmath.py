@@ -0,0 +1,130 @@
+import decimal
+import math
+
+# Exact big-integer helpers: a prime-swing factorial and a display format that
+# shows only the leading/trailing digits of huge integers. Converting a
+# million-digit int with str() is quadratic (and refused by default above 4300
+# digits), so the summary is computed from logarithms and a modulus instead.
+
+DISPLAY_DIGITS = 60
+EDGE_DIGITS = 20
+
+
+def _primes_up_to(n):
+    if n < 2:
+        return []
+    sieve = bytearray([1]) * (n + 1)
+    sieve[0] = sieve[1] = 0
+    for p in range(2, math.isqrt(n) + 1):
+        if sieve[p]:
+            sieve[p * p::p] = bytes(len(range(p * p, n + 1, p)))
+    return [i for i, is_prime in enumerate(sieve) if is_prime]
+
+
+def product(values, lo=0, hi=None):
+    # Balanced binary-splitting product so multiplications stay between
+    # operands of similar size.
+    if hi is None:
+        hi = len(values)
+    n = hi - lo
+    if n <= 8:
+        result = 1
+        for i in range(lo, hi):
+            result *= values[i]
+        return result
+    mid = (lo + hi) // 2
+    return product(values, lo, mid) * product(values, mid, hi)
+
+
+def _swing(n, primes):
+    # Odd part of n≀ = n! / ((n//2)!)^2, from its prime factorisation
+    # (primes must not include 2).
+    factors = []
+    root = math.isqrt(n)
+    for p in primes:
+        if p > n:
+            break
+        if p > n // 2:
+            factors.append(p)
+        elif p > n // 3:
+            continue
+        elif p > root:
+            if (n // p) & 1:
+                factors.append(p)
+        else:
+            q, e = n, 0
+            while q >= p:
+                q //= p
+                e += q & 1
+            if e:
+                factors.append(p ** e)
+    return product(factors)
+
+
+def factorial(n):
+    if n < 0:
+        raise ValueError("factorial() not defined for negative values")
+    if n < 500:
+        return math.factorial(n)
+    primes = _primes_up_to(n)[1:]
+
+    def odd_factorial(m):
+        if m < 2:
+            return 1
+        half = odd_factorial(m // 2)
+        return half * half * _swing(m, primes)
+
+    # n! = odd part * 2^(n - popcount(n))
+    return odd_factorial(n) << (n - bin(n).count("1"))
+
+
+def digit_count(n):
+    n = abs(n)
+    if n < 10 ** 18:
+        return len(str(n))
+    log = _log10(n)
+    if _near_power_of_ten(log):
+        k = int(log.to_integral_value())
+        return k + 1 if n >= 10 ** k else k
+    return int(log) + 1
+
+
+def _log10(n):
+    bits = n.bit_length()
+    shift = max(bits - 96, 0)
+    with decimal.localcontext() as ctx:
+        ctx.prec = 60
+        return (decimal.Decimal(n >> shift).log10()
+                + decimal.Decimal(shift) * decimal.Decimal(2).log10())
+
+
+def _near_power_of_ten(log):
+    # Truncating to 96 bits leaves ~1e-29 relative error: closer than that to
+    # a power of ten, the logarithm cannot decide and an exact check is used.
+    return abs(log - log.to_integral_value()) < decimal.Decimal("1e-25")
+
+
+def leading_digits(n, count=EDGE_DIGITS):
+    n = abs(n)
+    digits = digit_count(n)
+    if digits <= count:
+        return str(n)
+    log = _log10(n)
+    if _near_power_of_ten(log):
+        return str(n // 10 ** (digits - count))
+    with decimal.localcontext() as ctx:
+        ctx.prec = 60
+        lead = decimal.Decimal(10) ** (log - (digits - 1) + count - 1)
+    return str(int(lead))[:count]
+
+
+def trailing_digits(n, count=EDGE_DIGITS):
+    return str(abs(n) % 10 ** count).zfill(count)
+
+
+def format_big_int(n, max_digits=DISPLAY_DIGITS, edge=EDGE_DIGITS):
+    digits = digit_count(n)
+    if digits <= max_digits:
+        return str(n)
+    sign = "-" if n < 0 else ""
+    return f"{sign}{leading_digits(n, edge)}…{trailing_digits(n, edge)} ({digits} chiffres)"
@@ -0,0 +1,132 @@
+import argparse
+import csv
+import itertools
+import sys
+
+import base_convert
+import unit_registry
+from calculator_core import UNITS, BASES, evaluate_for_display, convert_units, convert_base, resolve_base
+
+# Headless batch front-end: reads one input per line from a file or stdin and
+# streams results to stdout (plain or CSV) without loading any GUI library.
+
+
+def make_handler(args):
+    if args.units:
+        conv_type, from_u, to_u = args.units
+        return lambda line: convert_units(float(line), conv_type, from_u, to_u)
+    if args.base:
+        from_b, to_b = args.base
+        return lambda line: convert_base(line, from_b, to_b)
+    return lambda line: evaluate_for_display(line, args.digits)[1]
+
+
+def iter_lines(stream):
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield line
+
+
+def iter_results(lines, args, chunk_size=65536):
+    # Yields (input, result, ok). Unit conversions go through the registry's
+    # vectorized path one chunk at a time; a chunk with an unparsable value
+    # falls back to line-by-line conversion so the error is reported per line.
+    handler = make_handler(args)
+    if args.units:
+        lines = iter(lines)
+        while True:
+            chunk = list(itertools.islice(lines, chunk_size))
+            if not chunk:
+                return
+            try:
+                values = unit_registry.convert_array(chunk, *args.units)
+            except ValueError:
+                pass
+            else:
+                yield from zip(chunk, values.tolist(), itertools.repeat(True))
+                continue
+            for line in chunk:
+                yield from _handle(handler, line)
+    if args.base:
+        from_b, to_b = (resolve_base(b) for b in args.base)
+        yield from base_convert.convert_stream(lines, from_b, to_b, prefix=True)
+        return
+    for line in lines:
+        yield from _handle(handler, line)
+
+
+def _handle(handler, line):
+    try:
+        yield line, handler(line), True
+    except Exception as e:
+        yield line, f"Error: {e}", False
+
+
+def run(args):
+    if args.units and args.units[0] not in UNITS:
+        raise SystemExit(f"unknown conversion type: {args.units[0]}")
+    if args.base:
+        try:
+            for base in args.base:
+                base_convert.check_base(resolve_base(base))
+        except ValueError as e:
+            raise SystemExit(str(e))
+    source = open(args.input, encoding="utf-8", newline="") if args.input != "-" else sys.stdin
+    target = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    errors = 0
+    try:
+        if args.column is not None:
+            try:
+                _, skipped = unit_registry.convert_csv(source, target, args.column, *args.units)
+            except ValueError as e:
+                raise SystemExit(str(e))
+            # Rows whose cell is not a number are copied unchanged.
+            for line, cell in skipped:
+                print(f"line {line}: not a number: {cell!r}", file=sys.stderr)
+            errors = len(skipped)
+        else:
+            writer = csv.writer(target) if args.csv else None
+            if writer:
+                writer.writerow(["input", "result"])
+            for line, result, ok in iter_results(iter_lines(source), args):
+                errors += not ok
+                if writer:
+                    writer.writerow([line, result])
+                else:
+                    target.write(f"{result}\n")
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+    return 1 if errors and args.strict else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Evaluate calculator expressions in batch.")
+    parser.add_argument("input", nargs="?", default="-",
+                        help="file with one input per line (default: stdin)")
+    parser.add_argument("-o", "--output", help="write results to this file instead of stdout")
+    parser.add_argument("--csv", action="store_true", help="write 'input,result' CSV rows")
+    parser.add_argument("--strict", action="store_true",
+                        help="exit with status 1 if any line failed")
+    parser.add_argument("--digits", type=int, default=0,
+                        help="evaluate with this many significant digits (default: double precision)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--units", nargs=3, metavar=("TYPE", "FROM", "TO"),
+                      help="treat lines as numbers and convert units, e.g. length mètre pied")
+    mode.add_argument("--base", nargs=2, metavar=("FROM", "TO"),
+                      help="treat lines as integers and convert between bases: "
+                           + "/".join(BASES) + " or a number from 2 to 36")
+    parser.add_argument("--column",
+                        help="with --units: input is a CSV file; convert this column "
+                             "(header name or 0-based index) and copy the other columns")
+    args = parser.parse_args(argv)
+    if args.column is not None and not args.units:
+        parser.error("--column requires --units")
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,98 @@
+import base_convert
+import bigmath
+import instrumentation
+import unit_registry
+from expression_engine import evaluate
+from unit_registry import UNITS
+
+# GUI-free calculator logic shared by the Tk app and the command-line tool.
+# Nothing here may import tkinter, matplotlib or sympy.
+
+BASES = {"Binary": 2, "Octal": 8, "Decimal": 10, "Hexadecimal": 16}
+
+
+def is_very_close(val, tol=1e-8):
+    nearest = round(val)
+    return abs(val - nearest) < tol
+
+
+def is_close(val, target, tol=1e-8):
+    return abs(val - target) < tol
+
+
+def round_result(result):
+    if isinstance(result, float) and is_very_close(result):
+        result = int(round(result))
+    elif isinstance(result, float):
+        # Optionally, also round all floats to a certain precision for display
+        result = round(result, 8)
+
+    if isinstance(result, int) and result not in (0, 1, -1):
+        # Exact integers (possibly too large to convert to float).
+        return result
+    if is_close(result, 0.0):
+        result = 0.0
+    elif is_close(result, 1.0):
+        result = 1.0
+    elif is_close(result, -1.0):
+        result = -1.0
+    return result
+
+
+def evaluate_expression(expression, env=None):
+    return round_result(evaluate(expression, env))
+
+
+def evaluate_precise(expression, digits, env=None):
+    import mpmath
+    with mpmath.workdps(digits + 10):
+        value = evaluate(expression, env, backend="mpmath")
+        if isinstance(value, mpmath.mpf):
+            nearest = mpmath.nint(value)
+            tol = mpmath.mpf(10) ** (-digits) * max(1, abs(value))
+            if abs(value - nearest) < tol and abs(nearest) < mpmath.mpf(10) ** digits:
+                return bigmath.format_big_int(int(nearest))
+        return mpmath.nstr(value, digits)
+
+
+def format_result(result):
+    # Returns the display text and whether it is the exact value (False when
+    # a huge integer had to be abbreviated).
+    if isinstance(result, int) and not isinstance(result, bool):
+        text = bigmath.format_big_int(result)
+        return text, "…" not in text
+    return str(result), True
+
+
+def evaluate_for_display(expression, digits=0, env=None):
+    with instrumentation.timed("evaluate"):
+        if digits:
+            text = evaluate_precise(expression, digits, env)
+            return text, text, True
+        result = evaluate_expression(expression, env)
+        return (result,) + format_result(result)
+
+
+def factorial_of(expression, env=None):
+    with instrumentation.timed("factorial"):
+        val = int(evaluate(expression, env))
+        result = bigmath.factorial(val)
+        return (val, result) + format_result(result)
+
+
+def convert_units(value, conv_type, from_unit, to_unit):
+    return unit_registry.convert(value, conv_type, from_unit, to_unit)
+
+
+def resolve_base(base):
+    if base in BASES:
+        return BASES[base]
+    try:
+        return int(base)
+    except (TypeError, ValueError):
+        raise ValueError(f"Base inconnue : {base}") from None
+
+
+def convert_base(value, from_base, to_base):
+    with instrumentation.timed("convert.base"):
+        return base_convert.convert(value, resolve_base(from_base), resolve_base(to_base), prefix=True)
@@ -0,0 +1,498 @@
+import argparse
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import instrumentation
+import unit_registry
+from calculator_core import evaluate_for_display, round_result, convert_units, convert_base
+from instrumentation import log
+
+# Local calculation service: the calculator engine for other processes on the
+# same machine, over localhost HTTP or a Unix socket (newline-delimited JSON).
+#
+# Unit and base conversions are cheap: concurrent ones are queued for a few
+# milliseconds and run as one batch on a thread, and the scalar unit
+# conversions of a batch that share their units go through a single
+# vectorized call. Evaluation and sympy work (derivatives, integrals) run one
+# request per worker of a process pool, each with its own time limit. Exact
+# integer arithmetic (9**9**9) can hold a worker in C code for minutes, so a
+# request that outlives the limit gets the pool killed and replaced, as
+# jobs.py does for the GUI, and the requests it interrupted are run again.
+# Results are kept in an LRU cache shared by all clients, and identical
+# requests in flight are computed once.
+#
+#   HTTP:  POST /evaluate {"expression": "sin(pi/2)"}   -> {"ok": true, "result": "1", ...}
+#          POST /batch [{"op": "units", "value": 3, "type": "length", ...}, ...]
+#          GET /stats
+#   Unix:  {"id": 1, "op": "derivative", "function": "x**2", "x": 3}  (one per line)
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MAX_BODY = 16 * 1024 * 1024
+
+
+# -- operations (run in worker threads/processes) ---------------------------
+
+def op_evaluate(expression, digits=0):
+    result, text, exact = evaluate_for_display(expression, int(digits))
+    return {"result": text, "exact": exact}
+
+
+def op_derivative(function, x):
+    import symbolic
+    return {"result": round_result(symbolic.derivative_at(function, float(x)))}
+
+
+def op_integral(function, a, b, timeout=5.0):
+    import integration
+    result = integration.definite_integral(function, float(a), float(b), float(timeout))
+    try:
+        value = float(result.value)
+    except TypeError:
+        value = str(result.value)
+    return {"result": value, "method": result.method, "error": result.error}
+
+
+def op_units(value, type, from_unit, to_unit):
+    if isinstance(value, list):
+        return {"result": unit_registry.convert_array(value, type, from_unit, to_unit).tolist()}
+    return {"result": convert_units(float(value), type, from_unit, to_unit)}
+
+
+def op_base(value, from_base, to_base):
+    return {"result": convert_base(str(value), from_base, to_base)}
+
+
+# name: (function, runs in the process pool)
+OPERATIONS = {
+    "evaluate": (op_evaluate, True),
+    "derivative": (op_derivative, True),
+    "integral": (op_integral, True),
+    "units": (op_units, False),
+    "base": (op_base, False),
+}
+
+
+def _call(op, params):
+    try:
+        return True, OPERATIONS[op][0](**params)
+    except Exception as e:
+        return False, f"{type(e).__name__}: {e}"
+
+
+def run_batch(requests):
+    # [(op, params), ...] -> [(ok, payload or error message), ...]
+    results = [None] * len(requests)
+    groups = {}
+    for i, (op, params) in enumerate(requests):
+        if op == "units" and isinstance(params.get("value"), (int, float)) \
+                and set(params) == {"value", "type", "from_unit", "to_unit"}:
+            key = (params["type"], params["from_unit"], params["to_unit"])
+            groups.setdefault(key, []).append(i)
+        else:
+            results[i] = _call(op, params)
+    for key, indexes in groups.items():
+        try:
+            values = unit_registry.convert_array([requests[i][1]["value"] for i in indexes], *key)
+        except Exception:
+            for i in indexes:
+                results[i] = _call(*requests[i])
+            continue
+        for i, value in zip(indexes, values.tolist()):
+            results[i] = True, {"result": value}
+    return results
+
+
+def _warm_worker():
+    import symbolic  # noqa: F401 (sympy import, once per worker process)
+
+
+# -- service ----------------------------------------------------------------
+
+class ResultCache:
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self._data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        value = self._data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        if len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class CalculationService:
+    def __init__(self, processes=2, threads=2, cache_size=10000, batch_window=0.002,
+                 max_batch=256, request_timeout=30.0):
+        self.processes = processes
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.request_timeout = request_timeout
+        self.cache = ResultCache(cache_size)
+        self._threads = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="calc-server")
+        self._start_pool()
+        # One running request per worker, so a time limit only counts run time.
+        self._slots = asyncio.Semaphore(processes)
+        self._inflight = {}
+        self._queue = []
+        self._timer = None
+        self._tasks = set()
+        self.requests = 0
+        self.shared = 0
+        self.batches = 0
+        self.batched = 0
+        self.pool_restarts = 0
+        self.started = time.time()
+
+    async def submit(self, op, params):
+        # Returns (ok, payload or error message).
+        self.requests += 1
+        if op not in OPERATIONS:
+            return False, f"opération inconnue : {op!r}"
+        key = json.dumps([op, params], sort_keys=True)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        future = self._inflight.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._inflight[key] = loop.create_future()
+            if OPERATIONS[op][1]:
+                self._spawn(self._run_heavy(key, op, params, future))
+            else:
+                self._queue.append((key, op, params, future))
+                if len(self._queue) >= self.max_batch:
+                    self._flush()
+                elif self._timer is None:
+                    self._timer = loop.call_later(self.batch_window, self._flush)
+        else:
+            self.shared += 1
+        return await asyncio.shield(future)
+
+    def _spawn(self, coroutine):
+        task = asyncio.ensure_future(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def _settle(self, key, future, result):
+        self._inflight.pop(key, None)
+        if result[0]:
+            self.cache.put(key, result)
+        if not future.done():
+            future.set_result(result)
+
+    def _timeout_error(self):
+        return False, f"délai dépassé ({self.request_timeout:g} s)"
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._queue = self._queue, []
+        if not batch:
+            return
+        self.batches += 1
+        self.batched += len(batch)
+        self._spawn(self._run_batch(batch))
+
+    async def _run_batch(self, batch):
+        requests = [(op, params) for _, op, params, _ in batch]
+        log.debug("server batch of %d", len(batch))
+        try:
+            with instrumentation.timed("server.batch"):
+                results = await asyncio.wait_for(asyncio.get_running_loop().run_in_executor(
+                    self._threads, run_batch, requests), self.request_timeout)
+        except asyncio.TimeoutError:
+            results = [self._timeout_error()] * len(batch)
+        except Exception as e:
+            results = [(False, f"{type(e).__name__}: {e}")] * len(batch)
+        for (key, op, params, future), result in zip(batch, results):
+            self._settle(key, future, result)
+
+    async def _run_heavy(self, key, op, params, future):
+        async with self._slots:
+            try:
+                with instrumentation.timed("server.process"):
+                    result = await self._run_in_pool(op, params)
+            except asyncio.TimeoutError:
+                result = self._timeout_error()
+            except Exception as e:
+                result = False, f"{type(e).__name__}: {e}"
+        self._settle(key, future, result)
+
+    async def _run_in_pool(self, op, params):
+        while True:
+            pool, ready = self._pool, self._ready
+            work = ready
+            try:
+                # The time limit starts once the workers have imported sympy.
+                await asyncio.wrap_future(ready)
+                if pool is not self._pool:
+                    continue
+                work = pool.submit(_call, op, params)
+                return await asyncio.wait_for(asyncio.wrap_future(work), self.request_timeout)
+            except asyncio.CancelledError:
+                # Work still queued in a killed pool is cancelled: run it again.
+                if pool is self._pool or not work.cancelled():
+                    raise
+            except asyncio.TimeoutError:
+                if pool is self._pool:
+                    log.debug("server request %s timed out, killing the process pool", op)
+                    self._restart_pool()
+                raise
+            except BrokenProcessPool:
+                if pool is self._pool:
+                    # A worker died on its own: replace the pool for the next requests.
+                    self._restart_pool()
+                    raise
+                # Killed because another request timed out: run this one again.
+
+    def _start_pool(self):
+        self._pool = ProcessPoolExecutor(max_workers=self.processes, initializer=_warm_worker,
+                                         mp_context=multiprocessing.get_context("spawn"))
+        self._ready = self._pool.submit(_warm_worker)
+
+    def _restart_pool(self):
+        self._kill_pool()
+        self._start_pool()
+        self.pool_restarts += 1
+
+    def _kill_pool(self):
+        pool = self._pool
+        terminate = getattr(pool, "terminate_workers", None)
+        if terminate is not None:
+            terminate()
+        else:
+            for process in list((pool._processes or {}).values()):
+                process.terminate()
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self):
+        lookups = self.cache.hits + self.cache.misses
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "requests": self.requests,
+            "cache": {"entries": len(self.cache), "hits": self.cache.hits, "misses": self.cache.misses,
+                      "hit_rate": self.cache.hits / lookups if lookups else 0.0},
+            "shared_in_flight": self.shared,
+            "batches": self.batches,
+            "mean_batch": self.batched / self.batches if self.batches else 0.0,
+            "pool_restarts": self.pool_restarts,
+        }
+
+    def close(self):
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        self._kill_pool()
+
+
+def response(ok, payload):
+    return {"ok": True, **payload} if ok else {"ok": False, "error": payload}
+
+
+async def handle_request(service, request):
+    # One JSON request {"op": ..., params...} -> response dict.
+    if not isinstance(request, dict) or "op" not in request:
+        return response(False, 'requête invalide : objet {"op": ...} attendu')
+    params = {k: v for k, v in request.items() if k not in ("op", "id")}
+    if request["op"] == "stats":
+        return response(True, service.stats())
+    return response(*await service.submit(request["op"], params))
+
+
+async def handle_batch(service, requests):
+    if not isinstance(requests, list):
+        return response(False, "requête invalide : liste attendue")
+    return await asyncio.gather(*(handle_request(service, r) for r in requests))
+
+
+# -- transports ---------------------------------------------------------------
+
+HTTP_STATUS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               413: "Payload Too Large"}
+
+
+async def _http_reply(writer, status, body, keep_alive):
+    data = json.dumps(body, ensure_ascii=False).encode()
+    head = (f"HTTP/1.1 {status} {HTTP_STATUS[status]}\r\nContent-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(data)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    writer.write(head.encode() + data)
+    await writer.drain()
+
+
+async def serve_http_connection(service, reader, writer):
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            try:
+                method, path, version = line.decode("latin-1").split()
+            except ValueError:
+                await _http_reply(writer, 400, response(False, "requête HTTP invalide"), False)
+                break
+            headers = {}
+            while True:
+                header = await reader.readline()
+                if header in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = header.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+            try:
+                length = int(headers.get("content-length", 0))
+            except ValueError:
+                length = -1
+            if length < 0:
+                await _http_reply(writer, 400, response(False, "Content-Length invalide"), False)
+                break
+            if length > MAX_BODY:
+                await _http_reply(writer, 413, response(False, "requête trop grande"), False)
+                break
+            body = await reader.readexactly(length) if length else b""
+            status, result = await _route(service, method, path.rstrip("/"), body)
+            await _http_reply(writer, status, result, keep_alive)
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _route(service, method, path, body):
+    if method == "GET" and path == "/stats":
+        return 200, response(True, service.stats())
+    if method != "POST":
+        return 405, response(False, "méthode non autorisée")
+    try:
+        request = json.loads(body or b"{}")
+    except ValueError as e:
+        return 400, response(False, f"JSON invalide : {e}")
+    if path == "/batch":
+        return 200, await handle_batch(service, request)
+    op = path.lstrip("/")
+    if op not in OPERATIONS:
+        return 404, response(False, f"opération inconnue : {op!r}")
+    if not isinstance(request, dict):
+        return 400, response(False, "requête invalide : objet attendu")
+    return 200, await handle_request(service, {**request, "op": op})
+
+
+async def serve_line_connection(service, reader, writer):
+    # Requests on one connection are handled concurrently; replies carry the
+    # request's "id" and may come back out of order.
+    tasks = set()
+
+    async def answer(line):
+        try:
+            request = json.loads(line)
+        except ValueError as e:
+            result = response(False, f"JSON invalide : {e}")
+        else:
+            if isinstance(request, list):
+                result = await handle_batch(service, request)
+            else:
+                result = await handle_request(service, request)
+                if isinstance(request, dict) and "id" in request:
+                    result["id"] = request["id"]
+        writer.write(json.dumps(result, ensure_ascii=False).encode() + b"\n")
+        await writer.drain()
+
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            if line.strip():
+                task = asyncio.ensure_future(answer(line))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+    except ConnectionError:
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(service, host=DEFAULT_HOST, port=DEFAULT_PORT, unix=None):
+    if unix:
+        if os.path.exists(unix):
+            os.remove(unix)
+        server = await asyncio.start_unix_server(
+            lambda r, w: serve_line_connection(service, r, w), path=unix)
+        address = unix
+    else:
+        server = await asyncio.start_server(
+            lambda r, w: serve_http_connection(service, r, w), host=host, port=port)
+        address = "http://{}:{}".format(*server.sockets[0].getsockname()[:2])
+    print(f"calculator server listening on {address}", file=sys.stderr, flush=True)
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the calculator engine to local processes.")
+    parser.add_argument("--host", default=DEFAULT_HOST,
+                        help=f"interface to listen on (default: {DEFAULT_HOST}, local only)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT,
+                        help=f"HTTP port (default: {DEFAULT_PORT}, 0 for any free port)")
+    parser.add_argument("--unix", metavar="PATH",
+                        help="listen on this Unix socket (newline-delimited JSON) instead of HTTP")
+    parser.add_argument("--processes", type=int, default=2, help="sympy worker processes (default: 2)")
+    parser.add_argument("--cache-size", type=int, default=10000,
+                        help="results kept in the shared cache (default: 10000)")
+    parser.add_argument("--batch-window-ms", type=float, default=2.0,
+                        help="how long conversions are collected into a batch (default: 2 ms)")
+    parser.add_argument("--max-batch", type=int, default=256, help="largest batch (default: 256)")
+    parser.add_argument("--timeout", type=float, default=30.0,
+                        help="time limit of one running request in seconds (default: 30)")
+    parser.add_argument("--debug", action="store_true", help="log debug messages to stderr")
+    args = parser.parse_args(argv)
+    if args.debug:
+        logging.basicConfig(level=logging.DEBUG, format="%(asctime)s %(threadName)s %(message)s")
+    if args.unix and not hasattr(asyncio, "start_unix_server"):
+        parser.error("Unix sockets are not available on this platform")
+
+    service = CalculationService(args.processes, cache_size=args.cache_size,
+                                 batch_window=args.batch_window_ms / 1000, max_batch=args.max_batch,
+                                 request_timeout=args.timeout)
+    # Stopped by SIGTERM as by Ctrl+C: the pools are shut down and the socket removed.
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        asyncio.run(serve(service, args.host, args.port, args.unix))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+        if args.unix and os.path.exists(args.unix):
+            os.remove(args.unix)
+    return 0
+
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -0,0 +1,269 @@
+import itertools
+import math
+
+import numpy as np
+
+# Statistics over data that may not fit in memory: the rows are read in
+# chunks and folded into single-pass aggregates. Mean and variance use
+# Welford's update generalized to whole chunks (Chan et al.), quantiles a
+# logarithmic-bucket sketch (DDSketch) with a bounded relative error, and the
+# regression keeps running co-moments of x and y. Aggregates of the same kind
+# can be merged, so chunks could also be processed separately. Cells that are
+# not numbers ("NA", blank) are read as NaN, which every aggregate skips (and
+# RunningStats counts).
+
+CHUNK_ROWS = 65536
+DELIMITERS = ",;\t"
+
+
+def _is_number(text):
+    try:
+        float(text)
+    except ValueError:
+        return False
+    return True
+
+
+def _column_index(column, header):
+    if isinstance(column, int):
+        return column
+    column = column.strip()
+    if column.isdigit():
+        return int(column)
+    if header is None or column not in header:
+        raise ValueError(f"colonne inconnue : {column!r}")
+    return header.index(column)
+
+
+def _parse_rows(chunk, delimiter, usecols):
+    # Slow path for a chunk np.loadtxt rejected: row by row, NaN for cells
+    # that are missing or not numbers.
+    out = np.full((len(chunk), len(usecols)), np.nan)
+    for i, line in enumerate(chunk):
+        fields = line.split(delimiter)
+        for j, col in enumerate(usecols):
+            try:
+                out[i, j] = float(fields[col])
+            except (IndexError, ValueError):
+                pass
+    return out
+
+
+def read_columns(lines, columns=(0,), chunk_rows=CHUNK_ROWS):
+    # Yields float arrays of shape (n, len(columns)) from an iterable of text
+    # lines (an open file, or pasted text). The first line is a header when it
+    # is not numeric; columns are header names or 0-based indexes.
+    lines = (line for line in lines if line.strip())
+    first = next(lines, None)
+    if first is None:
+        return
+    delimiter = next((d for d in DELIMITERS if d in first), None)
+    fields = [field.strip() for field in first.split(delimiter)]
+    header = not all(_is_number(field) for field in fields)
+    usecols = [_column_index(column, fields if header else None) for column in columns]
+    if not header:
+        lines = itertools.chain([first], lines)
+    while True:
+        chunk = list(itertools.islice(lines, chunk_rows))
+        if not chunk:
+            break
+        try:
+            yield np.loadtxt(chunk, delimiter=delimiter, usecols=usecols, ndmin=2)
+        except ValueError:
+            yield _parse_rows(chunk, delimiter, usecols)
+
+
+class RunningStats:
+    __slots__ = ("count", "mean", "m2", "min", "max", "skipped")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self.skipped = 0
+
+    def update(self, values):
+        finite = values[np.isfinite(values)]
+        self.skipped += values.size - finite.size
+        if finite.size:
+            mean = float(finite.mean())
+            m2 = float(np.square(finite - mean).sum())
+            self._combine(finite.size, mean, m2, float(finite.min()), float(finite.max()))
+
+    def merge(self, other):
+        self.skipped += other.skipped
+        if other.count:
+            self._combine(other.count, other.mean, other.m2, other.min, other.max)
+
+    def _combine(self, n, mean, m2, low, high):
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.count * n / total
+        self.count = total
+        self.min = min(self.min, low)
+        self.max = max(self.max, high)
+
+    @property
+    def variance(self):
+        # Sample variance (n - 1).
+        return self.m2 / (self.count - 1) if self.count > 1 else math.nan
+
+    @property
+    def std(self):
+        return math.sqrt(self.variance)
+
+
+class QuantileSketch:
+    # Values are counted in buckets ]gamma^(k-1), gamma^k] (by absolute value,
+    # negatives apart), so any quantile is returned within relative_accuracy
+    # of a true sample value, whatever the number of values.
+    MIN_VALUE = 1e-300
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.positive = {}
+        self.negative = {}
+        self.zeros = 0
+        self.count = 0
+
+    def _add(self, store, values):
+        if not values.size:
+            return
+        keys = np.ceil(np.log(values) / self._log_gamma).astype(np.int64)
+        low = int(keys.min())
+        counts = np.bincount(keys - low)
+        for offset in np.flatnonzero(counts).tolist():
+            key = low + offset
+            store[key] = store.get(key, 0) + int(counts[offset])
+
+    def update(self, values):
+        values = values[np.isfinite(values)]
+        positive = values > self.MIN_VALUE
+        negative = values < -self.MIN_VALUE
+        self._add(self.positive, values[positive])
+        self._add(self.negative, -values[negative])
+        self.zeros += int(values.size - positive.sum() - negative.sum())
+        self.count += int(values.size)
+
+    def merge(self, other):
+        if other.gamma != self.gamma:
+            raise ValueError("précisions de sketch différentes")
+        for store, other_store in ((self.positive, other.positive), (self.negative, other.negative)):
+            for key, count in other_store.items():
+                store[key] = store.get(key, 0) + count
+        self.zeros += other.zeros
+        self.count += other.count
+
+    def _value(self, key):
+        return 2 * self.gamma ** key / (self.gamma + 1)
+
+    def _buckets(self):
+        # (value, count) in increasing order of value.
+        for key in sorted(self.negative, reverse=True):
+            yield -self._value(key), self.negative[key]
+        if self.zeros:
+            yield 0.0, self.zeros
+        for key in sorted(self.positive):
+            yield self._value(key), self.positive[key]
+
+    def quantiles(self, qs):
+        if not self.count:
+            return [math.nan] * len(qs)
+        order = sorted(range(len(qs)), key=lambda i: qs[i])
+        out = [math.nan] * len(qs)
+        seen = 0
+        buckets = self._buckets()
+        value, count = next(buckets)
+        for i in order:
+            rank = qs[i] * (self.count - 1)
+            while seen + count <= rank:
+                seen += count
+                value, count = next(buckets)
+            out[i] = value
+        return out
+
+    def quantile(self, q):
+        return self.quantiles([q])[0]
+
+
+class RunningRegression:
+    # Least-squares line y = slope·x + intercept from running co-moments.
+    __slots__ = ("count", "mean_x", "mean_y", "sxx", "syy", "sxy")
+
+    def __init__(self):
+        self.count = 0
+        self.mean_x = self.mean_y = 0.0
+        self.sxx = self.syy = self.sxy = 0.0
+
+    def update(self, x, y):
+        keep = np.isfinite(x) & np.isfinite(y)
+        x, y = x[keep], y[keep]
+        if not x.size:
+            return
+        mx, my = float(x.mean()), float(y.mean())
+        dx, dy = x - mx, y - my
+        self._combine(x.size, mx, my, float(dx @ dx), float(dy @ dy), float(dx @ dy))
+
+    def merge(self, other):
+        if other.count:
+            self._combine(other.count, other.mean_x, other.mean_y, other.sxx, other.syy, other.sxy)
+
+    def _combine(self, n, mx, my, sxx, syy, sxy):
+        total = self.count + n
+        dx, dy = mx - self.mean_x, my - self.mean_y
+        weight = self.count * n / total
+        self.mean_x += dx * n / total
+        self.mean_y += dy * n / total
+        self.sxx += sxx + dx * dx * weight
+        self.syy += syy + dy * dy * weight
+        self.sxy += sxy + dx * dy * weight
+        self.count = total
+
+    @property
+    def slope(self):
+        if self.count < 2 or self.sxx == 0:
+            raise ValueError("régression impossible : x est constant ou il manque des points")
+        return self.sxy / self.sxx
+
+    @property
+    def intercept(self):
+        return self.mean_y - self.slope * self.mean_x
+
+    @property
+    def r(self):
+        return self.sxy / math.sqrt(self.sxx * self.syy) if self.syy else math.nan
+
+
+def summarize(chunks, relative_accuracy=0.01):
+    # One pass: statistics of the first column and, when the chunks have a
+    # second column x, the regression of the first column on it.
+    stats = RunningStats()
+    sketch = QuantileSketch(relative_accuracy)
+    reg = None
+    for chunk in chunks:
+        values = chunk[:, 0]
+        stats.update(values)
+        sketch.update(values)
+        if chunk.shape[1] > 1:
+            reg = reg or RunningRegression()
+            reg.update(chunk[:, 1], values)
+    if not stats.count:
+        raise ValueError("aucune valeur numérique")
+    return stats, sketch, reg
+
+
+def histogram(chunks, low, high, bins=30):
+    # Second pass, once the range is known: counts and bin edges.
+    if low == high:
+        low, high = low - 0.5, high + 0.5
+    edges = np.linspace(low, high, bins + 1)
+    counts = np.zeros(bins, dtype=np.int64)
+    for chunk in chunks:
+        values = chunk[:, 0]
+        counts += np.histogram(values[np.isfinite(values)], bins=edges)[0]
+    return counts, edges
@@ -0,0 +1,317 @@
+from collections import namedtuple
+
+from expression_engine import TOKEN_RE, compile_tokens
+
+# Editing model behind the calculator's input line. The text is held as
+# tokens in a gap buffer (tokens left of the cursor, and tokens right of it in
+# reverse order), so an edit only re-lexes the few tokens around the cursor,
+# whatever the length of the expression. Every edit returns the Change to
+# apply to the widget (no full-text rewrite), and is recorded for undo/redo.
+#
+# The live preview splits the tokens into the terms of the top-level sum;
+# terms are compiled from their token tuples through a cache, so typing at
+# the end of a long expression only parses the term being edited.
+
+Change = namedtuple("Change", ["start", "removed", "inserted"])
+
+# A lexeme can be cut into at most this many tokens while being typed
+# ("1", "e", "-", "5" for 1e-5), so re-lexing that many tokens on each side of
+# an edit always rebuilds the same tokens as lexing the whole text.
+WINDOW = 3
+MAX_UNDO = 1000
+
+
+def lex(text):
+    tokens = []
+    pos = 0
+    n = len(text)
+    while pos < n:
+        ch = text[pos]
+        if ch.isspace():
+            end = pos + 1
+            while end < n and text[end].isspace():
+                end += 1
+            tokens.append(("space", text[pos:end]))
+            pos = end
+            continue
+        m = TOKEN_RE.match(text, pos)
+        if m:
+            kind = m.lastgroup
+            tokens.append((kind, m.group(kind)))
+            pos = m.end()
+        else:
+            tokens.append(("error", ch))
+            pos += 1
+    return tokens
+
+
+def _word_char(ch):
+    return ch.isalnum() or ch in "._"
+
+
+class ExpressionEditor:
+    def __init__(self, text=""):
+        self._before = []
+        self._after = []
+        self._len_before = 0
+        self._len_after = 0
+        self._undo = []
+        self._redo = []
+        self._coalesce = False
+        self._split = False
+        self._compiled = {}
+        if text:
+            self._replace(0, 0, text)
+
+    # -- state ------------------------------------------------------------
+
+    @property
+    def text(self):
+        return "".join(t for k, t in self._before) + "".join(t for k, t in reversed(self._after))
+
+    @property
+    def cursor(self):
+        return self._len_before
+
+    def __len__(self):
+        return self._len_before + self._len_after
+
+    def tokens(self):
+        # Lexed tokens without whitespace; the token under the cursor is
+        # stored as two halves, which are joined here.
+        out = list(self._before)
+        after = reversed(self._after)
+        if self._split:
+            kind, text = out.pop()
+            out.append((kind, text + next(after)[1]))
+        out.extend(after)
+        return [t for t in out if t[0] != "space"]
+
+    # -- cursor -----------------------------------------------------------
+
+    def _join(self):
+        if self._split:
+            kind, left = self._before.pop()
+            right = self._after.pop()[1]
+            self._before.append((kind, left + right))
+            self._len_before += len(right)
+            self._len_after -= len(right)
+            self._split = False
+
+    def set_cursor(self, pos):
+        pos = max(0, min(pos, len(self)))
+        if pos == self._len_before:
+            return
+        before, after = self._before, self._after
+        self._join()
+        while self._len_before > pos:
+            token = before.pop()
+            self._len_before -= len(token[1])
+            self._len_after += len(token[1])
+            after.append(token)
+        while self._len_before < pos:
+            token = after.pop()
+            self._len_after -= len(token[1])
+            self._len_before += len(token[1])
+            before.append(token)
+        if self._len_before > pos:
+            # The cursor is inside a token: keep its two halves on each side.
+            kind, text = before.pop()
+            cut = len(text) - (self._len_before - pos)
+            before.append((kind, text[:cut]))
+            after.append((kind, text[cut:]))
+            self._len_before = pos
+            self._len_after += len(text) - cut
+            self._split = True
+        self._coalesce = False
+
+    # -- editing ----------------------------------------------------------
+
+    def _replace(self, start, end, text):
+        self.set_cursor(end)
+        removed = []
+        while self._len_before > start:
+            kind, tok = self._before.pop()
+            cut = max(len(tok) - (self._len_before - start), 0)
+            removed.append(tok[cut:])
+            self._len_before -= len(tok) - cut
+            if cut:
+                self._before.append((kind, tok[:cut]))
+        removed = "".join(reversed(removed))
+
+        left = []
+        for _ in range(WINDOW):
+            if not self._before:
+                break
+            token = self._before.pop()
+            self._len_before -= len(token[1])
+            left.append(token[1])
+        right = []
+        for _ in range(WINDOW):
+            if not self._after:
+                break
+            token = self._after.pop()
+            self._len_after -= len(token[1])
+            right.append(token[1])
+        left = "".join(reversed(left))
+        window = left + text + "".join(right)
+        cursor = len(left) + len(text)
+
+        tokens = lex(window)
+        # An edit can merge the window's last token with the following ones
+        # (e.g. "1" typed before "e-5"): extend the window until its end is
+        # still a token boundary.
+        while self._after:
+            probe = window + "".join(t for k, t in self._after[-1:-WINDOW - 1:-1])
+            if self._boundary(lex(probe), len(window)):
+                break
+            token = self._after.pop()
+            self._len_after -= len(token[1])
+            window += token[1]
+            tokens = lex(window)
+        offset = 0
+        i = 0
+        while i < len(tokens) and offset + len(tokens[i][1]) <= cursor:
+            self._before.append(tokens[i])
+            offset += len(tokens[i][1])
+            i += 1
+        self._split = i < len(tokens) and offset < cursor
+        if self._split:
+            kind, tok = tokens[i]
+            self._before.append((kind, tok[:cursor - offset]))
+            tokens[i] = (kind, tok[cursor - offset:])
+        self._len_before += cursor
+        self._len_after += len(window) - cursor
+        self._after.extend(reversed(tokens[i:]))
+        return Change(start, removed, text)
+
+    @staticmethod
+    def _boundary(tokens, pos):
+        offset = 0
+        for kind, text in tokens:
+            if offset >= pos:
+                break
+            offset += len(text)
+        return offset == pos
+
+    def replace(self, start, end, text):
+        start, end = max(0, min(start, end)), min(max(start, end), len(self))
+        if start == end and not text:
+            return None
+        cursor = self.cursor
+        coalesce = self._coalesce
+        change = self._replace(start, end, text)
+        self._record(change, cursor, coalesce)
+        return change
+
+    def _record(self, change, cursor, coalesce):
+        self._redo.clear()
+        last = self._undo[-1] if self._undo else None
+        # Consecutive characters of one number or name are undone together.
+        if coalesce and last is not None and not change.removed and not last[0].removed \
+                and len(change.inserted) == 1 and _word_char(change.inserted) \
+                and last[0].inserted and _word_char(last[0].inserted[-1]) \
+                and change.start == last[0].start + len(last[0].inserted):
+            self._undo[-1] = (Change(last[0].start, "", last[0].inserted + change.inserted), last[1])
+        else:
+            self._undo.append((change, cursor))
+            if len(self._undo) > MAX_UNDO:
+                del self._undo[0]
+        self._coalesce = True
+
+    def insert(self, text):
+        return self.replace(self.cursor, self.cursor, text)
+
+    def delete_back(self, count=1):
+        return self.replace(self.cursor - count, self.cursor, "")
+
+    def delete_forward(self, count=1):
+        return self.replace(self.cursor, self.cursor + count, "")
+
+    def set_text(self, text):
+        return self.replace(0, len(self), text)
+
+    def clear(self):
+        return self.set_text("")
+
+    # -- undo / redo ------------------------------------------------------
+
+    def can_undo(self):
+        return bool(self._undo)
+
+    def can_redo(self):
+        return bool(self._redo)
+
+    def undo(self):
+        if not self._undo:
+            return None
+        change, cursor = self._undo.pop()
+        inverse = self._replace(change.start, change.start + len(change.inserted), change.removed)
+        self._redo.append((change, cursor))
+        self.set_cursor(cursor)
+        return inverse
+
+    def redo(self):
+        if not self._redo:
+            return None
+        change, cursor = self._redo.pop()
+        applied = self._replace(change.start, change.start + len(change.removed), change.inserted)
+        self._undo.append((change, cursor))
+        return applied
+
+    # -- preview ----------------------------------------------------------
+
+    def terms(self):
+        # Splits at the binary + and - of the top level: [(sign, tokens), ...].
+        terms = []
+        current = []
+        sign = "+"
+        depth = 0
+        previous = None
+        for token in self.tokens():
+            kind, text = token
+            if kind == "error":
+                return None
+            if text == "(":
+                depth += 1
+            elif text == ")":
+                depth -= 1
+            elif depth == 0 and text in ("+", "-") and previous is not None \
+                    and (previous[0] in ("number", "name") or previous[1] == ")"):
+                terms.append((sign, tuple(current)))
+                current = []
+                sign = text
+                previous = token
+                continue
+            current.append(token)
+            previous = token
+        terms.append((sign, tuple(current)))
+        return terms
+
+    def preview(self, env=None, backend="float"):
+        # Value of the expression as typed so far, or None if it is incomplete
+        # or invalid. The default backend computes with floats only, so a
+        # preview can never start a huge exact integer computation.
+        terms = self.terms()
+        if not terms:
+            return None
+        env = env if env is not None else {}
+        # Only the current terms are kept, so the cache follows the text.
+        compiled, self._compiled = self._compiled, {}
+        try:
+            value = None
+            for sign, tokens in terms:
+                fn = compiled.get((backend, tokens))
+                if fn is None:
+                    fn = compile_tokens(tokens, backend)
+                self._compiled[backend, tokens] = fn
+                term = fn(env)
+                if value is None:
+                    value = term
+                elif sign == "+":
+                    value = value + term
+                else:
+                    value = value - term
+            return value
+        except Exception:
+            return None
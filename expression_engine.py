@@ -0,0 +1,394 @@
+import math
+import operator
+import re
+from functools import lru_cache
+
+import instrumentation
+
+# Tokenizer / parser / compiler for calculator expressions.
+# Expressions are parsed once into a small AST, compiled into nested closures
+# and cached by their normalized text, so evaluating the same formula again
+# only costs the closure calls.
+
+TOKEN_RE = re.compile(r"""
+    (?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][+-]?\d+)?)
+  | (?P<name>[A-Za-z_][A-Za-z_0-9]*)
+  | (?P<op>\*\*|//|[-+*/%^(),])
+""", re.VERBOSE)
+
+BINARY_OPS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '*': operator.mul,
+    '/': operator.truediv,
+    '//': operator.floordiv,
+    '%': operator.mod,
+    '**': operator.pow,
+    '^': operator.pow,
+}
+
+UNARY_OPS = {
+    '+': operator.pos,
+    '-': operator.neg,
+}
+
+BACKENDS = {
+    "math": {
+        "functions": {
+            'sin': math.sin, 'cos': math.cos, 'tan': math.tan,
+            'sinh': math.sinh, 'cosh': math.cosh, 'tanh': math.tanh,
+            'exp': math.exp, 'sqrt': math.sqrt,
+            'log': math.log10, 'ln': math.log,
+            'floor': math.floor, 'abs': abs,
+        },
+        "constants": {'pi': math.pi, 'e': math.e},
+    },
+}
+
+
+def _numpy_backend():
+    import numpy as np
+    return {
+        "functions": {
+            'sin': np.sin, 'cos': np.cos, 'tan': np.tan,
+            'sinh': np.sinh, 'cosh': np.cosh, 'tanh': np.tanh,
+            'exp': np.exp, 'sqrt': np.sqrt,
+            'log': np.log10, 'ln': np.log,
+            'floor': np.floor, 'abs': np.abs,
+        },
+        "constants": {'pi': np.pi, 'e': np.e},
+    }
+
+
+def _mpmath_backend():
+    # Arbitrary precision: literals become mpf at the working precision of the
+    # call (mpmath.workdps), so cached closures follow precision changes.
+    import mpmath
+    return {
+        "functions": {
+            'sin': mpmath.sin, 'cos': mpmath.cos, 'tan': mpmath.tan,
+            'sinh': mpmath.sinh, 'cosh': mpmath.cosh, 'tanh': mpmath.tanh,
+            'exp': mpmath.exp, 'sqrt': mpmath.sqrt,
+            'log': mpmath.log10, 'ln': mpmath.ln,
+            'floor': mpmath.floor, 'abs': abs,
+        },
+        "constants": {'pi': mpmath.mp.pi, 'e': mpmath.mp.e},
+        "operators": {'//': lambda a, b: mpmath.floor(a / b)},
+        "number": mpmath.mpf,
+    }
+
+
+def _float_backend():
+    # Like "math" but every literal is a float, and floor() (an int in math)
+    # too: results overflow to an error instead of building huge exact
+    # integers (used for live previews).
+    functions = dict(BACKENDS["math"]["functions"], floor=lambda v: float(math.floor(v)))
+    return dict(BACKENDS["math"], functions=functions, number=float)
+
+
+# Backends whose libraries are only imported the first time they are used.
+BACKEND_FACTORIES = {
+    "numpy": _numpy_backend,
+    "mpmath": _mpmath_backend,
+    "float": _float_backend,
+}
+
+
+def get_backend(name):
+    backend = BACKENDS.get(name)
+    if backend is None:
+        backend = BACKENDS[name] = BACKEND_FACTORIES[name]()
+    return backend
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+class Num:
+    __slots__ = ("value", "text")
+
+    def __init__(self, value, text=None):
+        self.value = value
+        self.text = text if text is not None else repr(value)
+
+    def __repr__(self):
+        return f"Num({self.value!r})"
+
+
+class Name:
+    __slots__ = ("id",)
+
+    def __init__(self, id):
+        self.id = id
+
+    def __repr__(self):
+        return f"Name({self.id!r})"
+
+
+class UnaryOp:
+    __slots__ = ("op", "operand")
+
+    def __init__(self, op, operand):
+        self.op = op
+        self.operand = operand
+
+    def __repr__(self):
+        return f"UnaryOp({self.op!r}, {self.operand!r})"
+
+
+class BinOp:
+    __slots__ = ("op", "left", "right")
+
+    def __init__(self, op, left, right):
+        self.op = op
+        self.left = left
+        self.right = right
+
+    def __repr__(self):
+        return f"BinOp({self.op!r}, {self.left!r}, {self.right!r})"
+
+
+class Call:
+    __slots__ = ("func", "args")
+
+    def __init__(self, func, args):
+        self.func = func
+        self.args = args
+
+    def __repr__(self):
+        return f"Call({self.func!r}, {self.args!r})"
+
+
+def normalize(text):
+    return " ".join(text.split())
+
+
+def tokenize(text):
+    tokens = []
+    pos = 0
+    while pos < len(text):
+        if text[pos].isspace():
+            pos += 1
+            continue
+        m = TOKEN_RE.match(text, pos)
+        if not m:
+            raise ExpressionError(f"invalid character {text[pos]!r} at position {pos}")
+        kind = m.lastgroup
+        tokens.append((kind, m.group(kind)))
+        pos = m.end()
+    return tokens
+
+
+class Parser:
+    # Precedence follows Python: +,- < *,/,//,% < unary +,- < ** (right-assoc)
+
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def peek(self):
+        if self.pos < len(self.tokens):
+            return self.tokens[self.pos]
+        return (None, None)
+
+    def advance(self):
+        tok = self.peek()
+        self.pos += 1
+        return tok
+
+    def expect(self, value):
+        kind, tok = self.advance()
+        if tok != value:
+            raise ExpressionError(f"expected {value!r}, got {tok or 'end of input'!r}")
+
+    def parse(self):
+        if not self.tokens:
+            raise ExpressionError("empty expression")
+        node = self.parse_sum()
+        if self.pos < len(self.tokens):
+            raise ExpressionError(f"unexpected {self.peek()[1]!r}")
+        return node
+
+    def parse_sum(self):
+        node = self.parse_product()
+        while self.peek()[1] in ('+', '-'):
+            op = self.advance()[1]
+            node = BinOp(op, node, self.parse_product())
+        return node
+
+    def parse_product(self):
+        node = self.parse_unary()
+        while self.peek()[1] in ('*', '/', '//', '%'):
+            op = self.advance()[1]
+            node = BinOp(op, node, self.parse_unary())
+        return node
+
+    def parse_unary(self):
+        if self.peek()[1] in ('+', '-'):
+            op = self.advance()[1]
+            return UnaryOp(op, self.parse_unary())
+        return self.parse_power()
+
+    def parse_power(self):
+        node = self.parse_atom()
+        if self.peek()[1] in ('**', '^'):
+            op = self.advance()[1]
+            node = BinOp(op, node, self.parse_unary())
+        return node
+
+    def parse_atom(self):
+        kind, tok = self.advance()
+        if kind == "number":
+            if any(c in tok for c in ".eE"):
+                return Num(float(tok), tok)
+            return Num(int(tok), tok)
+        if kind == "name":
+            if self.peek()[1] == '(':
+                self.advance()
+                args = []
+                if self.peek()[1] != ')':
+                    args.append(self.parse_sum())
+                    while self.peek()[1] == ',':
+                        self.advance()
+                        args.append(self.parse_sum())
+                self.expect(')')
+                return Call(tok, args)
+            return Name(tok)
+        if tok == '(':
+            node = self.parse_sum()
+            self.expect(')')
+            return node
+        raise ExpressionError(f"unexpected {tok or 'end of input'!r}")
+
+
+def parse(text):
+    return Parser(tokenize(text)).parse()
+
+
+def _compile(node, backend):
+    functions = backend["functions"]
+    constants = backend["constants"]
+
+    if isinstance(node, Num):
+        number = backend.get("number")
+        if number is not None:
+            text = node.text
+            return lambda env: number(text)
+        value = node.value
+        return lambda env: value
+
+    if isinstance(node, Name):
+        name = node.id
+        if name in constants:
+            value = constants[name]
+            return lambda env: value
+
+        def lookup(env):
+            try:
+                return env[name]
+            except KeyError:
+                raise NameError(f"name '{name}' is not defined") from None
+        return lookup
+
+    if isinstance(node, UnaryOp):
+        fn = UNARY_OPS[node.op]
+        operand = _compile(node.operand, backend)
+        return lambda env: fn(operand(env))
+
+    if isinstance(node, BinOp):
+        fn = backend.get("operators", {}).get(node.op) or BINARY_OPS[node.op]
+        left = _compile(node.left, backend)
+        right = _compile(node.right, backend)
+        return lambda env: fn(left(env), right(env))
+
+    if isinstance(node, Call):
+        args = [_compile(arg, backend) for arg in node.args]
+        name = node.func
+        if name in functions:
+            fn = functions[name]
+            if len(args) == 1:
+                arg, = args
+                return lambda env: fn(arg(env))
+            return lambda env: fn(*[a(env) for a in args])
+
+        def call(env):
+            try:
+                fn = env[name]
+            except KeyError:
+                raise NameError(f"name '{name}' is not defined") from None
+            return fn(*[a(env) for a in args])
+        return call
+
+    raise ExpressionError(f"cannot compile {node!r}")
+
+
+def free_names(node, backend="math"):
+    constants = get_backend(backend)["constants"]
+    names = set()
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, Name):
+            if node.id not in constants:
+                names.add(node.id)
+        elif isinstance(node, UnaryOp):
+            stack.append(node.operand)
+        elif isinstance(node, BinOp):
+            stack.extend((node.left, node.right))
+        elif isinstance(node, Call):
+            stack.extend(node.args)
+    return names
+
+
+class CompiledExpression:
+    __slots__ = ("text", "tree", "names", "_fn")
+
+    def __init__(self, text, tree, names, fn):
+        self.text = text
+        self.tree = tree
+        self.names = names
+        self._fn = fn
+
+    def __call__(self, env=None):
+        return self._fn(env if env is not None else {})
+
+    def __repr__(self):
+        return f"CompiledExpression({self.text!r})"
+
+
+@lru_cache(maxsize=512)
+def _compile_normalized(text, backend):
+    # Only runs on a cache miss, so this times parsing plus compilation.
+    with instrumentation.timed("parse"):
+        tree = parse(text)
+        fn = _compile(tree, get_backend(backend))
+    return CompiledExpression(text, tree, frozenset(free_names(tree, backend)), fn)
+
+
+def compile_expression(text, backend="math"):
+    return _compile_normalized(normalize(text), backend)
+
+
+@lru_cache(maxsize=2048)
+def compile_tokens(tokens, backend="math"):
+    # For callers that already hold the token list (the input line editor):
+    # tokens is a tuple of (kind, text) pairs as returned by tokenize().
+    with instrumentation.timed("parse"):
+        tree = Parser(list(tokens)).parse()
+        fn = _compile(tree, get_backend(backend))
+    text = " ".join(tok for kind, tok in tokens)
+    return CompiledExpression(text, tree, frozenset(free_names(tree, backend)), fn)
+
+
+def evaluate(text, env=None, backend="math"):
+    return compile_expression(text, backend)(env)
+
+
+def cache_info():
+    return _compile_normalized.cache_info()
+
+
+def clear_cache():
+    _compile_normalized.cache_clear()
+    compile_tokens.cache_clear()
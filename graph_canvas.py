@@ -0,0 +1,278 @@
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolbar2Tk
+
+import instrumentation
+import plot_sampler
+
+# Matplotlib canvas embedded in a Tk container. Curves are kept by expression
+# text so overlaying a new function never recomputes the existing ones (a
+# curve re-plotted after the workspace changed is sampled again); after a
+# zoom or pan only the part of the x range that was not sampled yet (or that
+# is now too coarse) is evaluated, and line data is swapped in place and
+# blitted instead of rebuilding the figure. Parameter sweeps (curve families,
+# heatmaps, contours) and data histograms are drawn as static artists and are
+# not resampled.
+
+
+class Curve:
+    def __init__(self, text, f, line, version=None):
+        self.text = text
+        self.f = f
+        self.line = line
+        self.version = version
+        self.x = np.empty(0)
+        self.y = np.empty(0)
+
+    @property
+    def covered(self):
+        if self.x.size == 0:
+            return None
+        return self.x[0], self.x[-1]
+
+    def points_in(self, xmin, xmax):
+        return int(np.searchsorted(self.x, xmax) - np.searchsorted(self.x, xmin))
+
+
+class GraphCanvas:
+    def __init__(self, container, budget=20000, min_points=256, resample_delay=80):
+        self.container = container
+        self.budget = budget
+        self.min_points = min_points
+        self.resample_delay = resample_delay
+        self.curves = {}
+        self._static = []
+        self._colorbar = None
+        self._marks = {}
+        self._pending = None
+        self._background = None
+        self._updating = False
+
+        self.figure = Figure(figsize=(6, 4), dpi=100)
+        self.ax = self.figure.add_subplot(111)
+        self.ax.axhline(0, color='black', linewidth=0.5)
+        self.ax.axvline(0, color='black', linewidth=0.5)
+        self.ax.grid(True)
+        self.ax.set_xlabel("x")
+        self.ax.set_ylabel("f(x)")
+        self.ax.set_autoscale_on(False)
+
+        self.canvas = FigureCanvasTkAgg(self.figure, master=container)
+        self.toolbar = NavigationToolbar2Tk(self.canvas, container, pack_toolbar=False)
+        self.toolbar.pack(side="bottom", fill="x")
+        self.canvas.get_tk_widget().pack(side="top", fill="both", expand=True)
+
+        self.canvas.mpl_connect("draw_event", self._on_draw)
+        self.ax.callbacks.connect("xlim_changed", self._on_xlim_changed)
+
+    # -- curves -----------------------------------------------------------
+
+    def prepare(self, text, xmin, xmax, env=None, f=None):
+        # Safe to call from a worker thread: compiles (unless f is given) and
+        # samples a curve that is not plotted yet (or was plotted with other
+        # definitions) without touching matplotlib.
+        version = getattr(env, "version", None)
+        curve = self.curves.get(text)
+        if curve is not None and curve.version == version:
+            return None
+        with instrumentation.timed("plot.sample"):
+            if f is None:
+                f = plot_sampler.make_vector_function(text, env=env)
+            x, y = plot_sampler.sample_function(f, xmin, xmax, budget=self.budget)
+        return f, x, y, version
+
+    def set_function(self, text, xmin=None, xmax=None, prepared=None, env=None):
+        if self._static:
+            self.clear()
+        if xmin is not None and xmax is not None and (xmin, xmax) != tuple(self.ax.get_xlim()):
+            self._updating = True
+            try:
+                self.ax.set_xlim(xmin, xmax)
+            finally:
+                self._updating = False
+        xmin, xmax = self.ax.get_xlim()
+
+        first = not self.curves
+        if prepared is None:
+            prepared = self.prepare(text, xmin, xmax, env)
+        if prepared is None:
+            curve = self.curves[text]
+        else:
+            old = self.curves.get(text)
+            if old is not None:
+                old.line.remove()
+            f, x, y, version = prepared
+            line, = self.ax.plot(x, y, label=f"f(x) = {text}", animated=True)
+            curve = self.curves[text] = Curve(text, f, line, version)
+            curve.x, curve.y = x, y
+
+        for c in self.curves.values():
+            self._refresh(c, xmin, xmax)
+        if first:
+            self.ax.set_ylim(*plot_sampler.view_limits(curve.x, curve.y))
+        self.ax.legend(handles=[c.line for c in self.curves.values()])
+        self.canvas.draw_idle()
+        return curve
+
+    def remove_function(self, text):
+        curve = self.curves.pop(text, None)
+        if curve is not None:
+            curve.line.remove()
+            self._redraw_legend()
+
+    def clear(self):
+        for curve in self.curves.values():
+            curve.line.remove()
+        self.curves.clear()
+        if self._colorbar is not None:
+            self._colorbar.remove()
+            self._colorbar = None
+        for artist in self._static:
+            artist.remove()
+        self._static.clear()
+        for artist in self._marks.values():
+            artist.remove()
+        self._marks.clear()
+        self.ax.set_title("")
+        self.ax.set_ylabel("f(x)")
+        self._redraw_legend()
+
+    # -- marks ------------------------------------------------------------
+
+    def mark_points(self, kind, xs, ys, marker="o", color="red"):
+        # Points found by the solver (roots, extrema); a new set of the same
+        # kind replaces the previous one.
+        old = self._marks.pop(kind, None)
+        if old is not None:
+            old.remove()
+        if len(xs):
+            self._marks[kind], = self.ax.plot(xs, ys, linestyle="none", marker=marker, color=color,
+                                              markersize=6, zorder=5)
+        self.canvas.draw_idle()
+
+    # -- sweeps -----------------------------------------------------------
+
+    def _set_limits(self, xmin, xmax, ymin, ymax):
+        self._updating = True
+        try:
+            self.ax.set_xlim(xmin, xmax)
+            self.ax.set_ylim(ymin, ymax)
+        finally:
+            self._updating = False
+
+    def show_family(self, text, x, labels, ys, max_legend=12):
+        self.clear()
+        lines = self.ax.plot(x, ys.T, linewidth=1)
+        for line, label in zip(lines, labels):
+            line.set_label(label)
+        self._static.extend(lines)
+        self._set_limits(x[0], x[-1], *plot_sampler.view_limits(None, ys.ravel()))
+        self.ax.set_title(f"{text} ({len(lines)} courbes)")
+        if len(lines) <= max_legend:
+            self.ax.legend(handles=lines, fontsize="small")
+        self.canvas.draw_idle()
+
+    def show_map(self, text, x, y, z, y_name="y", contour=False, levels=20):
+        # z has shape (len(x), len(y)).
+        self.clear()
+        z = np.ma.masked_invalid(z.T)
+        if contour:
+            mappable = self.ax.contourf(x, y, z, levels=levels)
+            self._static.append(mappable)
+            self._static.append(self.ax.contour(x, y, z, levels=levels, colors="black",
+                                                linewidths=0.4))
+        else:
+            mappable = self.ax.pcolormesh(x, y, z, shading="auto")
+            self._static.append(mappable)
+        self._colorbar = self.figure.colorbar(mappable, ax=self.ax)
+        self._set_limits(x[0], x[-1], y[0], y[-1])
+        self.ax.set_ylabel(y_name)
+        self.ax.set_title(f"f(x, {y_name}) = {text}")
+        self.canvas.draw_idle()
+
+    def show_histogram(self, title, counts, edges):
+        self.clear()
+        self._static.append(self.ax.stairs(counts, edges, fill=True, alpha=0.7))
+        self._set_limits(edges[0], edges[-1], 0, max(int(counts.max()), 1) * 1.05)
+        self.ax.set_ylabel("effectif")
+        self.ax.set_title(title)
+        self.canvas.draw_idle()
+
+    def _redraw_legend(self):
+        legend = self.ax.get_legend()
+        if legend is not None:
+            legend.remove()
+        if self.curves:
+            self.ax.legend(handles=[c.line for c in self.curves.values()])
+        self.canvas.draw_idle()
+
+    # -- sampling ---------------------------------------------------------
+
+    def _refresh(self, curve, xmin, xmax):
+        span = xmax - xmin
+        covered = curve.covered
+        if covered is None or curve.points_in(xmin, xmax) < self.min_points \
+                or xmax < covered[0] or xmin > covered[1] \
+                or curve.x.size > 4 * self.budget:
+            # Nothing usable in view (first plot, deep zoom, or pan far away),
+            # or the cache has grown too large from repeated pans.
+            x, y = plot_sampler.sample_function(curve.f, xmin, xmax, budget=self.budget)
+        else:
+            pieces = [(curve.x, curve.y)]
+            lo, hi = covered
+            if xmin < lo:
+                budget = max(int(self.budget * (lo - xmin) / span), 64)
+                pieces.insert(0, self._sample_piece(curve, xmin, lo, budget, seam="right"))
+            if xmax > hi:
+                budget = max(int(self.budget * (xmax - hi) / span), 64)
+                pieces.append(self._sample_piece(curve, hi, xmax, budget, seam="left"))
+            if len(pieces) == 1:
+                return False
+            x = np.concatenate([p[0] for p in pieces])
+            y = np.concatenate([p[1] for p in pieces])
+        curve.x, curve.y = x, y
+        curve.line.set_data(x, y)
+        return True
+
+    def _sample_piece(self, curve, a, b, budget, seam):
+        x, y = plot_sampler.sample_function(curve.f, a, b, budget=budget, initial=min(budget, 128))
+        # Put a NaN between the new piece and the cached samples so asymptote
+        # breaks at the seam are not bridged; x stays sorted.
+        if seam == "right":
+            return np.append(x, x[-1]), np.append(y, np.nan)
+        return np.insert(x, 0, x[0]), np.insert(y, 0, np.nan)
+
+    def _on_xlim_changed(self, ax):
+        if self._updating:
+            return
+        if self._pending is not None:
+            self.container.after_cancel(self._pending)
+        self._pending = self.container.after(self.resample_delay, self._resample_view)
+
+    def _resample_view(self):
+        self._pending = None
+        xmin, xmax = self.ax.get_xlim()
+        with instrumentation.timed("plot.resample"):
+            changed = [c for c in self.curves.values() if self._refresh(c, xmin, xmax)]
+        if changed:
+            self._blit()
+
+    # -- blitting ---------------------------------------------------------
+
+    def _on_draw(self, event):
+        with instrumentation.timed("widget.plot_draw"):
+            self._background = self.canvas.copy_from_bbox(self.figure.bbox)
+            self._draw_lines()
+
+    def _draw_lines(self):
+        for curve in self.curves.values():
+            self.ax.draw_artist(curve.line)
+
+    def _blit(self):
+        if self._background is None:
+            self.canvas.draw_idle()
+            return
+        with instrumentation.timed("widget.plot_blit"):
+            self.canvas.restore_region(self._background)
+            self._draw_lines()
+            self.canvas.blit(self.figure.bbox)
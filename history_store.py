@@ -0,0 +1,159 @@
+import os
+import sqlite3
+import time
+from array import array
+from bisect import bisect_left
+
+# Persistent calculation history in an append-only SQLite table. The view
+# fetches just the rows it displays, by position in id order (several
+# instances may share the file, so ids are not assumed contiguous): a page is
+# read with LIMIT/OFFSET from whichever end of the table is nearer, so the
+# usual case, the last rows, costs the same whatever the history size. The row
+# count is kept up to date by triggers (COUNT(*) reads the whole table), and
+# each append drops the rows beyond the cap.
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".scientific_calculator", "history.sqlite3")
+DEFAULT_CAP = 100000
+
+
+class HistoryStore:
+    def __init__(self, path=DEFAULT_PATH, cap=DEFAULT_CAP):
+        self.cap = cap
+        self.conn = self._connect(path)
+        self.session = self._setup()
+        self._trim()
+        self.conn.commit()
+
+    def _setup(self):
+        # One transaction, so instances started together do not race. Returns
+        # the id of the new session.
+        conn = self.conn
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("""CREATE TABLE IF NOT EXISTS history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            session INTEGER NOT NULL,
+            ts REAL NOT NULL,
+            expression TEXT NOT NULL,
+            result TEXT NOT NULL)""")
+        conn.execute("""CREATE TABLE IF NOT EXISTS sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            started REAL NOT NULL)""")
+        if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'history_count'").fetchone() is None:
+            conn.execute("CREATE TABLE history_count (n INTEGER NOT NULL)")
+            conn.execute("INSERT INTO history_count SELECT COUNT(*) FROM history")
+            conn.execute("CREATE TRIGGER history_added AFTER INSERT ON history "
+                         "BEGIN UPDATE history_count SET n = n + 1; END")
+            conn.execute("CREATE TRIGGER history_removed AFTER DELETE ON history "
+                         "BEGIN UPDATE history_count SET n = n - 1; END")
+        return conn.execute("INSERT INTO sessions (started) VALUES (?)", (time.time(),)).lastrowid
+
+    @staticmethod
+    def _connect(path):
+        if path != ":memory:":
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+                conn = sqlite3.connect(path)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                return conn
+            except (OSError, sqlite3.Error):
+                pass
+        # Read-only or unavailable location: keep the history for this session only.
+        return sqlite3.connect(":memory:")
+
+    def first_id(self):
+        return self.conn.execute("SELECT MIN(id) FROM history").fetchone()[0]
+
+    def _trim(self):
+        # Keeps the newest `cap` rows.
+        excess = self.count() - self.cap
+        if excess > 0:
+            self.conn.execute(
+                "DELETE FROM history WHERE id IN (SELECT id FROM history ORDER BY id LIMIT ?)", (excess,))
+
+    def append(self, expression, result):
+        cur = self.conn.execute(
+            "INSERT INTO history (session, ts, expression, result) VALUES (?, ?, ?, ?)",
+            (self.session, time.time(), str(expression), str(result)))
+        self._trim()
+        self.conn.commit()
+        return cur.lastrowid
+
+    def count(self):
+        return self.conn.execute("SELECT n FROM history_count").fetchone()[0]
+
+    def rows(self, start, stop):
+        # Rows [start, stop) in chronological order as (id, session, expression, result).
+        total = self.count()
+        start, stop = max(start, 0), min(stop, total)
+        if stop <= start:
+            return []
+        if start <= total - stop:
+            return self.conn.execute(
+                "SELECT id, session, expression, result FROM history "
+                "ORDER BY id LIMIT ? OFFSET ?", (stop - start, start)).fetchall()
+        rows = self.conn.execute(
+            "SELECT id, session, expression, result FROM history "
+            "ORDER BY id DESC LIMIT ? OFFSET ?", (stop - start, total - stop)).fetchall()
+        rows.reverse()
+        return rows
+
+    def search(self, text):
+        return SearchResult(self, text)
+
+    def matching_ids(self, text, after, ids):
+        # Appends to `ids` the ids greater than `after` whose expression or
+        # result contains `text`; returns the last id that was looked at.
+        last = self.conn.execute("SELECT MAX(id) FROM history").fetchone()[0]
+        if last is None or last <= after:
+            return after
+        pattern = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        cur = self.conn.execute(
+            "SELECT id FROM history WHERE id > ? AND id <= ? AND "
+            "(expression LIKE ? ESCAPE '\\' OR result LIKE ? ESCAPE '\\') ORDER BY id",
+            (after, last, pattern, pattern))
+        for (row_id,) in cur:
+            ids.append(row_id)
+        return last
+
+    def fetch_ids(self, ids):
+        if not ids:
+            return []
+        marks = ",".join("?" * len(ids))
+        return self.conn.execute(
+            f"SELECT id, session, expression, result FROM history WHERE id IN ({marks}) ORDER BY id",
+            list(ids)).fetchall()
+
+    def clear(self):
+        self.conn.execute("DELETE FROM history")
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+
+class SearchResult:
+    # Same count()/rows() interface as HistoryStore, over the matching ids.
+    # update() adds the rows appended since, without running the search again.
+
+    def __init__(self, store, text):
+        self.store = store
+        self.text = text
+        self.ids = array("q")
+        self.last_id = 0
+        self.update()
+
+    def update(self):
+        self.last_id = self.store.matching_ids(self.text, self.last_id, self.ids)
+        # Rows trimmed (or cleared) from the front of the history.
+        first = self.store.first_id()
+        if first is None:
+            del self.ids[:]
+        elif self.ids and self.ids[0] < first:
+            del self.ids[:bisect_left(self.ids, first)]
+
+    def count(self):
+        return len(self.ids)
+
+    def rows(self, start, stop):
+        return self.store.fetch_ids(self.ids[max(start, 0):stop])
@@ -0,0 +1,113 @@
+import tkinter as tk
+from tkinter import ttk
+
+import instrumentation
+
+# Virtualized history list: only the rows that fit in the widget are fetched
+# from the source and drawn, so the cost of a refresh does not depend on how
+# many entries the history holds. A source is anything with count() and
+# rows(start, stop) -> [(id, session, expression, result), ...].
+
+
+class HistoryView(tk.Frame):
+    def __init__(self, master, source, bg, fg, search_bg, **kwargs):
+        super().__init__(master, bg=bg, **kwargs)
+        self.store = source
+        self.source = source
+        self.top = 0
+        self.follow = True
+
+        self.search_var = tk.StringVar()
+        self.search_entry = tk.Entry(self, textvariable=self.search_var, bg=search_bg, fg=fg,
+                                     insertbackground=fg, bd=0)
+        self.search_entry.grid(row=0, column=0, columnspan=2, sticky="ew", padx=2, pady=(0, 2))
+        # Keep the calculator's window-wide key bindings out of the search box.
+        self.search_entry.bindtags((str(self.search_entry), "Entry", "all"))
+        self.search_entry.bind("<Return>", lambda event: self.apply_search())
+        self.search_entry.bind("<Escape>", lambda event: self.clear_search())
+
+        self.text = tk.Text(self, width=10, bg=search_bg, fg=fg, bd=0, wrap="none",
+                            state="disabled", cursor="arrow")
+        self.text.grid(row=1, column=0, sticky="nswe")
+        self.text.tag_configure("session", foreground="#888899")
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self.on_scrollbar)
+        self.scrollbar.grid(row=1, column=1, sticky="ns")
+        self.rowconfigure(1, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        self.text.bind("<Configure>", lambda event: self.render())
+        self.text.bind("<MouseWheel>", self.on_wheel)
+        self.text.bind("<Button-4>", lambda event: self.scroll_rows(-3))
+        self.text.bind("<Button-5>", lambda event: self.scroll_rows(3))
+
+    def configure_colors(self, bg, fg, search_bg):
+        self.configure(bg=bg)
+        self.search_entry.configure(bg=search_bg, fg=fg, insertbackground=fg)
+        self.text.configure(bg=search_bg, fg=fg)
+
+    def visible_rows(self):
+        line_height = max(self.text.tk.call("font", "metrics", self.text.cget("font"), "-linespace"), 1)
+        return max(self.text.winfo_height() // line_height, 1)
+
+    # -- scrolling --------------------------------------------------------
+
+    def scroll_to(self, top):
+        total = self.source.count()
+        self.top = max(0, min(top, total - self.visible_rows()))
+        self.follow = self.top >= total - self.visible_rows()
+        self.render()
+
+    def scroll_rows(self, delta):
+        self.scroll_to(self.top + delta)
+
+    def on_wheel(self, event):
+        self.scroll_rows(-3 if event.delta > 0 else 3)
+
+    def on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * self.source.count()))
+        elif action == "scroll":
+            step = self.visible_rows() if unit == "pages" else 1
+            self.scroll_rows(int(amount) * step)
+
+    # -- content ----------------------------------------------------------
+
+    def refresh(self):
+        # New entries were appended: add the matching ones to the search
+        # results (if a search is active) and stay at the bottom if we were there.
+        if self.source is not self.store:
+            self.source.update()
+        self.render()
+
+    def render(self):
+        with instrumentation.timed("widget.history"):
+            self._render()
+
+    def _render(self):
+        total = self.source.count()
+        height = self.visible_rows()
+        if self.follow:
+            self.top = max(total - height, 0)
+        rows = self.source.rows(self.top, self.top + height)
+        self.text.configure(state="normal")
+        self.text.delete("1.0", "end")
+        current = getattr(self.store, "session", None)
+        for row_id, session, expression, result in rows:
+            # Entries reloaded from earlier sessions are dimmed.
+            tags = ("session",) if session != current else ()
+            self.text.insert("end", f"{expression} = {result}\n", tags)
+        self.text.configure(state="disabled")
+        if total:
+            self.scrollbar.set(self.top / total, min((self.top + height) / total, 1.0))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    def apply_search(self):
+        text = self.search_var.get().strip()
+        self.source = self.store.search(text) if text else self.store
+        self.follow = True
+        self.render()
+
+    def clear_search(self):
+        self.search_var.set("")
+        self.apply_search()
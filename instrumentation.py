@@ -0,0 +1,285 @@
+import io
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+
+# Opt-in timing instrumentation for the hot paths (parse, evaluate, symbolic
+# operations, plot sampling, widget updates), the hit rates of the lru_caches
+# and an on-demand cProfile capture of the last N operations. Disabled by
+# default: timed() then hands back a shared no-op context manager, so
+# instrumented code pays a global lookup and a call.
+#
+# Jobs run in the worker process pool record their timings (and profile)
+# there; the scheduler sends them back with the result and merge() folds them
+# into this process's data.
+
+log = logging.getLogger("scientific_calculator")
+
+SAMPLES = 512
+RECENT = 200
+
+enabled = False
+_lock = threading.Lock()
+_local = threading.local()
+_NULL = nullcontext()
+_samples = {}
+_totals = {}
+recent = deque(maxlen=RECENT)
+remote_caches = {}
+
+_profile_keep = 0
+_profiles = deque()
+
+# Caches are read from modules that are already imported, never imported for it.
+CACHE_SOURCES = {
+    "expression": ("expression_engine", "cache_info"),
+    "symbolic": ("symbolic", "cache_info"),
+}
+
+
+def enable(flag=True):
+    global enabled
+    enabled = flag
+
+
+def reset():
+    with _lock:
+        _samples.clear()
+        _totals.clear()
+        recent.clear()
+        remote_caches.clear()
+        _profiles.clear()
+
+
+def record(label, seconds, thread=None):
+    with _lock:
+        samples = _samples.get(label)
+        if samples is None:
+            samples = _samples[label] = deque(maxlen=SAMPLES)
+            _totals[label] = [0, 0.0, 0.0]
+        samples.append(seconds)
+        totals = _totals[label]
+        totals[0] += 1
+        totals[1] += seconds
+        totals[2] = max(totals[2], seconds)
+        recent.append((time.time(), label, seconds, thread or threading.current_thread().name))
+
+
+class _Timer:
+    __slots__ = ("label", "start", "profiler")
+
+    def __init__(self, label):
+        self.label = label
+        self.profiler = None
+
+    def __enter__(self):
+        depth = getattr(_local, "depth", 0)
+        _local.depth = depth + 1
+        # Only outermost operations are profiled; nested timers are part of them.
+        if _profile_keep and depth == 0:
+            import cProfile
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+                self.profiler = profiler
+            except ValueError:
+                # Another profiler is active on this thread (or interpreter).
+                pass
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.start
+        _local.depth -= 1
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler.create_stats()
+            _keep_profile(self.label, elapsed, self.profiler.stats)
+        record(self.label, elapsed)
+        return False
+
+
+def timed(label):
+    if not enabled:
+        return _NULL
+    return _Timer(label)
+
+
+def timed_call(label, fn, *args):
+    # Times a job on the pool thread that runs it.
+    with timed(label):
+        return fn(*args)
+
+
+# -- profiling ------------------------------------------------------------
+
+class _Captured:
+    # What pstats.Stats.add() expects from a profiler, for stats dicts that
+    # were captured elsewhere (another thread or a worker process).
+
+    def __init__(self, stats):
+        self.stats = stats
+
+    def create_stats(self):
+        pass
+
+
+def start_profiling(operations):
+    # Profile each of the next operations, keeping the last `operations` ones.
+    global _profile_keep
+    with _lock:
+        _profile_keep = operations
+        _profiles.clear()
+    enable()
+
+
+def stop_profiling():
+    global _profile_keep
+    _profile_keep = 0
+
+
+def is_profiling():
+    return bool(_profile_keep)
+
+
+def _keep_profile(label, elapsed, stats):
+    with _lock:
+        _profiles.append((label, elapsed, stats))
+        while len(_profiles) > _profile_keep:
+            _profiles.popleft()
+
+
+def profiled_operations():
+    with _lock:
+        return [(label, elapsed) for label, elapsed, stats in _profiles]
+
+
+def profile_report(sort="cumulative", limit=40):
+    with _lock:
+        captured = list(_profiles)
+    if not captured:
+        return "Aucune opération profilée."
+    # pstats (and the typing module it pulls in) is only imported when needed.
+    import pstats
+    stream = io.StringIO()
+    stats = pstats.Stats(stream=stream)
+    for label, elapsed, data in captured:
+        stats.add(_Captured(data))
+    stream.write(f"{len(captured)} opération(s) : "
+                 + ", ".join(f"{label} {elapsed * 1000:.1f} ms" for label, elapsed, data in captured)
+                 + "\n")
+    stats.sort_stats(sort).print_stats(limit)
+    return stream.getvalue()
+
+
+def dump_profile(path):
+    with _lock:
+        captured = list(_profiles)
+    if not captured:
+        return False
+    import pstats
+    stats = pstats.Stats()
+    for label, elapsed, data in captured:
+        stats.add(_Captured(data))
+    stats.dump_stats(path)
+    return True
+
+
+# -- worker processes ---------------------------------------------------------
+
+def run_traced(label, profile, fn, *args):
+    # Runs in a worker process: times (and optionally profiles) the job there
+    # and returns (result, report) for merge() in the GUI process.
+    global _profile_keep
+    enable()
+    reset()
+    _profile_keep = 1 if profile else 0
+    try:
+        with timed(label):
+            result = fn(*args)
+    finally:
+        _profile_keep = 0
+        enable(False)
+    with _lock:
+        report = {
+            "samples": [(label, seconds, thread) for ts, label, seconds, thread in recent],
+            "caches": cache_stats(),
+            "profiles": list(_profiles),
+            "pid": os.getpid(),
+        }
+    return result, report
+
+
+def merge(report):
+    thread = f"process {report['pid']}"
+    for label, seconds, _ in report["samples"]:
+        record(label, seconds, thread)
+    with _lock:
+        for name, info in report["caches"].items():
+            remote_caches[f"{name} (processus)"] = info
+        for item in report["profiles"]:
+            _profiles.append(item)
+            while len(_profiles) > _profile_keep:
+                _profiles.popleft()
+
+
+# -- reporting ------------------------------------------------------------
+
+def _cache_entry(info):
+    return {"hits": info.hits, "misses": info.misses, "size": info.currsize, "max": info.maxsize}
+
+
+def cache_stats():
+    stats = {}
+    for name, (module_name, attr) in CACHE_SOURCES.items():
+        module = sys.modules.get(module_name)
+        if module is None:
+            continue
+        info = getattr(module, attr)()
+        if isinstance(info, dict):
+            for sub, sub_info in info.items():
+                stats[f"{name}.{sub}"] = _cache_entry(sub_info)
+        else:
+            stats[name] = _cache_entry(info)
+    return stats
+
+
+def _percentile(sorted_values, q):
+    pos = (len(sorted_values) - 1) * q
+    lo = int(pos)
+    hi = min(lo + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (pos - lo)
+
+
+def timing_stats():
+    with _lock:
+        items = [(label, sorted(samples), list(_totals[label])) for label, samples in _samples.items()]
+    stats = {}
+    for label, samples, (n, total, worst) in items:
+        stats[label] = {
+            "count": n,
+            "mean_ms": total / n * 1000,
+            "p50_ms": _percentile(samples, 0.5) * 1000,
+            "p95_ms": _percentile(samples, 0.95) * 1000,
+            "max_ms": worst * 1000,
+        }
+    return stats
+
+
+def snapshot():
+    with _lock:
+        events = [{"time": ts, "label": label, "ms": seconds * 1000, "thread": thread}
+                  for ts, label, seconds, thread in recent]
+        caches = dict(remote_caches)
+    caches.update(cache_stats())
+    return {"enabled": enabled, "timings": timing_stats(), "caches": caches, "recent": events}
+
+
+def export_json(path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snapshot(), f, indent=2, ensure_ascii=False)
@@ -0,0 +1,154 @@
+import multiprocessing
+import os
+import threading
+import time
+from collections import namedtuple
+
+import instrumentation
+import quadrature
+import symbolic
+
+# Definite integrals with a time limit. sympy.integrate runs in a separate
+# worker process; when it misses the deadline (or returns an unevaluated
+# Integral) the worker is killed and the integral is computed numerically with
+# adaptive Gauss–Kronrod quadrature instead.
+
+IntegralResult = namedtuple("IntegralResult", ["value", "method", "error"])
+
+SYMBOLIC = "symbolique"
+NUMERICAL = "numérique (Gauss–Kronrod)"
+READY = "ready"
+STARTUP_TIMEOUT = 60.0
+
+
+def _watch_parent(parent):
+    # A parent killed with SIGTERM (a server pool restart) cannot stop this
+    # process, and sympy.integrate may run for hours: exit when it is gone.
+    while os.getppid() == parent:
+        time.sleep(1.0)
+    os._exit(0)
+
+
+def _worker_main(conn, parent):
+    threading.Thread(target=_watch_parent, args=(parent,), daemon=True).start()
+    # sympy is imported by now (with this module): from here on the parent
+    # times requests.
+    conn.send(READY)
+    while True:
+        try:
+            request = conn.recv()
+        except EOFError:
+            return
+        if request is None:
+            return
+        text, a, b = request
+        try:
+            conn.send((True, symbolic.definite_integral(text, a, b)))
+        except Exception as e:
+            conn.send((False, f"{type(e).__name__}: {e}"))
+
+
+class SymbolicWorker:
+    # One long-lived process, restarted only after it had to be killed.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._process = None
+        self._conn = None
+
+    def _start(self):
+        ctx = multiprocessing.get_context("spawn")
+        parent, child = ctx.Pipe()
+        self._process = ctx.Process(target=_worker_main, args=(child, os.getpid()), daemon=True)
+        self._process.start()
+        child.close()
+        self._conn = parent
+        # Spawning and importing sympy take 0.6 s or more; that is not counted
+        # in a request's timeout, or a short one would never let sympy answer.
+        try:
+            ready = parent.poll(STARTUP_TIMEOUT) and parent.recv() == READY
+        except (EOFError, OSError):
+            ready = False
+        if not ready:
+            self._kill()
+            raise ValueError("le processus de calcul symbolique n'a pas démarré")
+
+    def _kill(self):
+        if self._process is not None:
+            self._process.terminate()
+            self._process.join(1)
+            self._conn.close()
+        self._process = None
+        self._conn = None
+
+    def start(self):
+        with self._lock:
+            if self._process is None or not self._process.is_alive():
+                self._start()
+
+    def definite_integral(self, text, a, b, timeout):
+        with self._lock:
+            if self._process is None or not self._process.is_alive():
+                self._start()
+            try:
+                self._conn.send((text, a, b))
+                if not self._conn.poll(timeout):
+                    self._kill()
+                    raise TimeoutError(f"intégration symbolique > {timeout} s")
+                ok, payload = self._conn.recv()
+            except (EOFError, OSError) as e:
+                self._kill()
+                raise ValueError(f"le processus de calcul s'est arrêté: {e}") from e
+        if not ok:
+            raise ValueError(payload)
+        return payload
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                try:
+                    self._conn.send(None)
+                except OSError:
+                    pass
+            self._kill()
+
+
+_worker = SymbolicWorker()
+
+
+def _is_number(value):
+    return getattr(value, "is_number", False) and not value.has(symbolic.sp.Integral)
+
+
+def numerical_integral(text, a, b):
+    f = lambda xs: symbolic.function_values(text, xs)
+    with instrumentation.timed("integral.numerical"):
+        value, error = quadrature.integrate(f, float(a), float(b))
+    return IntegralResult(value, NUMERICAL, error)
+
+
+def definite_integral(text, a, b, timeout=5.0):
+    symbolic.parse_function(text)
+    try:
+        with instrumentation.timed("integral.symbolic"):
+            value = _worker.definite_integral(text, a, b, timeout)
+    except (TimeoutError, ValueError) as e:
+        instrumentation.log.debug("symbolic integral of %r failed (%s), using quadrature", text, e)
+        return numerical_integral(text, a, b)
+    if _is_number(value):
+        return IntegralResult(value, SYMBOLIC, 0.0)
+    if value.free_symbols:
+        # e.g. f(x) contains other symbols: nothing to compute numerically.
+        return IntegralResult(value, SYMBOLIC, None)
+    return numerical_integral(text, a, b)
+
+
+def restart():
+    # A fresh worker (empty sympy caches), started now instead of by the next
+    # integral.
+    _worker.close()
+    _worker.start()
+
+
+def shutdown():
+    _worker.close()
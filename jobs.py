@@ -0,0 +1,187 @@
+import multiprocessing
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, CancelledError
+from functools import partial
+
+import instrumentation
+from instrumentation import log
+
+# Runs slow work off the Tk main thread. Jobs are submitted under a key
+# ("evaluate", "symbolic", "plot", ...); submitting a new job with the same key
+# supersedes the previous one, whose result is then dropped. Callbacks always
+# run on the Tk thread: worker completions are pushed to a queue that is
+# drained with master.after().
+#
+# Pure-Python work (sympy, waiting on the integration worker) goes to a thread
+# pool. Work that can hold the GIL for a long time inside C code (huge integer
+# arithmetic, math.factorial) goes to a process pool, which is killed and
+# recreated when such a job is cancelled while running.
+#
+# With instrumentation enabled, each job is timed where it runs ("job.<key>")
+# and from submission to callback ("latency.<key>"); process jobs send their
+# timings back with the result.
+
+
+class Job:
+    __slots__ = ("key", "future", "on_done", "on_error", "in_process", "cancelled",
+                 "traced", "submitted")
+
+    def __init__(self, key, future, on_done, on_error, in_process, traced=False):
+        self.key = key
+        self.future = future
+        self.on_done = on_done
+        self.on_error = on_error
+        self.in_process = in_process
+        self.cancelled = False
+        self.traced = traced
+        self.submitted = time.perf_counter()
+
+
+class JobScheduler:
+    def __init__(self, master, max_threads=2, max_processes=1, poll_ms=20, on_busy=None):
+        self.master = master
+        self.max_processes = max_processes
+        self.poll_ms = poll_ms
+        self.on_busy = on_busy
+        self._threads = ThreadPoolExecutor(max_workers=max_threads, thread_name_prefix="calc-job")
+        self._processes = None
+        self._jobs = {}
+        self._completed = queue.Queue()
+        self._polling = False
+
+    # -- public API -------------------------------------------------------
+
+    def submit(self, key, fn, *args, on_done=None, on_error=None, in_process=False):
+        self._drop(key)
+        executor = self._process_pool() if in_process else self._threads
+        traced = instrumentation.enabled
+        if traced and in_process:
+            future = executor.submit(partial(instrumentation.run_traced, f"job.{key}",
+                                             instrumentation.is_profiling(), fn), *args)
+        elif traced:
+            future = executor.submit(instrumentation.timed_call, f"job.{key}", fn, *args)
+        else:
+            future = executor.submit(fn, *args)
+        log.debug("job %s submitted (%s)", key, "process" if in_process else "thread")
+        job = Job(key, future, on_done, on_error, in_process, traced)
+        self._jobs[key] = job
+        future.add_done_callback(lambda f, job=job: self._completed.put(job))
+        self._set_busy(True)
+        self._schedule_poll()
+        return job
+
+    def cancel(self, key):
+        dropped = self._drop(key)
+        if dropped and not self._jobs:
+            self._set_busy(False)
+        return dropped
+
+    def cancel_all(self):
+        for key in list(self._jobs):
+            self.cancel(key)
+
+    def is_busy(self, key=None):
+        if key is None:
+            return bool(self._jobs)
+        return key in self._jobs
+
+    def start_processes(self):
+        # Spawning is slow; call this once the UI is idle to pre-warm the pool.
+        self._process_pool().submit(int)
+
+    def shutdown(self):
+        self.cancel_all()
+        self._threads.shutdown(wait=False, cancel_futures=True)
+        if self._processes is not None:
+            self._kill_processes()
+
+    # -- internals --------------------------------------------------------
+
+    def _drop(self, key):
+        job = self._jobs.pop(key, None)
+        if job is None:
+            return False
+        job.cancelled = True
+        if not job.future.cancel() and job.in_process and job.future.running():
+            log.debug("job %s cancelled while running, killing the process pool", key)
+            self._kill_processes()
+        return True
+
+    def _process_pool(self):
+        if self._processes is None:
+            self._processes = ProcessPoolExecutor(
+                max_workers=self.max_processes,
+                mp_context=multiprocessing.get_context("spawn"))
+        return self._processes
+
+    def _kill_processes(self):
+        pool, self._processes = self._processes, None
+        if pool is None:
+            return
+        terminate = getattr(pool, "terminate_workers", None)
+        if terminate is not None:
+            terminate()
+        else:
+            for process in list((pool._processes or {}).values()):
+                process.terminate()
+            pool.shutdown(wait=False, cancel_futures=True)
+        # Jobs still queued on the dead pool must be resubmitted by their owner;
+        # mark them cancelled so their callbacks are skipped.
+        for key, job in list(self._jobs.items()):
+            if job.in_process:
+                job.cancelled = True
+                del self._jobs[key]
+
+    def _set_busy(self, busy):
+        if self.on_busy is not None:
+            self.on_busy(busy)
+
+    def _schedule_poll(self):
+        if not self._polling:
+            self._polling = True
+            self.master.after(self.poll_ms, self._poll)
+
+    def _poll(self):
+        self._polling = False
+        try:
+            while True:
+                try:
+                    job = self._completed.get_nowait()
+                except queue.Empty:
+                    break
+                if job.cancelled or self._jobs.get(job.key) is not job:
+                    continue
+                del self._jobs[job.key]
+                self._finish(job)
+        finally:
+            if self._jobs:
+                self._schedule_poll()
+            else:
+                self._set_busy(False)
+
+    def _finish(self, job):
+        # A failing callback (e.g. a plot finishing after its window was
+        # closed) is logged and must not strand the other completions.
+        try:
+            result = job.future.result()
+        except CancelledError:
+            return
+        except Exception as e:
+            log.debug("job %s failed: %r", job.key, e)
+            if job.on_error is not None:
+                try:
+                    job.on_error(e)
+                except Exception:
+                    log.exception("error callback of job %s failed", job.key)
+            return
+        if job.traced:
+            if job.in_process:
+                result, report = result
+                instrumentation.merge(report)
+            instrumentation.record(f"latency.{job.key}", time.perf_counter() - job.submitted)
+        if job.on_done is not None:
+            try:
+                job.on_done(result)
+            except Exception:
+                log.exception("callback of job %s failed", job.key)
@@ -0,0 +1,74 @@
+import importlib
+import sys
+import threading
+import time
+
+# Heavy optional libraries (sympy, numpy, matplotlib) are imported on first use
+# instead of at startup. Every load is timed so the app can print a startup
+# report similar to `python -X importtime`.
+
+# One lock per module name: a background prewarm of sympy does not hold up
+# the main thread loading something else (two imports of the same package
+# still wait for each other in Python's own import lock).
+_locks = {}
+_locks_guard = threading.Lock()
+_modules = {}
+import_times = {}
+startup_marks = []
+_t0 = time.perf_counter()
+
+
+def _lock(name):
+    with _locks_guard:
+        return _locks.setdefault(name, threading.RLock())
+
+
+def load(name):
+    module = _modules.get(name)
+    if module is not None:
+        return module
+    with _lock(name):
+        if name in _modules:
+            return _modules[name]
+        before = len(sys.modules)
+        start = time.perf_counter()
+        module = importlib.import_module(name)
+        elapsed = time.perf_counter() - start
+        import_times[name] = (elapsed, len(sys.modules) - before,
+                              threading.current_thread().name)
+        _modules[name] = module
+        return module
+
+
+def is_loaded(name):
+    return name in _modules
+
+
+def prewarm(names, on_done=None):
+    def worker():
+        for name in names:
+            try:
+                load(name)
+            except ImportError:
+                pass
+        if on_done is not None:
+            on_done()
+    thread = threading.Thread(target=worker, name="prewarm", daemon=True)
+    thread.start()
+    return thread
+
+
+def mark(label):
+    startup_marks.append((label, time.perf_counter() - _t0))
+
+
+def report():
+    lines = ["startup:"]
+    for label, t in startup_marks:
+        lines.append(f"  {t * 1000:9.1f} ms  {label}")
+    lines.append("lazy imports:")
+    lines.append(f"  {'ms':>9}  {'modules':>7}  {'thread':<10} name")
+    for name, (elapsed, count, thread) in sorted(import_times.items(),
+                                                 key=lambda item: -item[1][0]):
+        lines.append(f"  {elapsed * 1000:9.1f}  {count:7d}  {thread:<10} {name}")
+    return "\n".join(lines)
@@ -0,0 +1,277 @@
+import hashlib
+import itertools
+import os
+import re
+import tempfile
+
+import numpy as np
+
+from calculator_core import evaluate_expression
+
+# Matrix mode: parsing typed matrices, loading large ones from disk, and the
+# linear-algebra operations behind the "Matrices" section. Files are memory
+# mapped (.npy directly; CSV is converted once, chunk by chunk, into a cached
+# .npy in the temp dir) so a big system is never held as Python lists.
+
+CHUNK_ROWS = 65536
+CACHE_DIR = os.path.join(tempfile.gettempdir(), "scientific_calculator_matrices")
+OPERATORS = "+-*/^%"
+
+
+def _split_top_level(row, separator):
+    parts, start, depth = [], 0, 0
+    for i, ch in enumerate(row):
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == separator and depth == 0:
+            parts.append(row[start:i])
+            start = i + 1
+    parts.append(row[start:])
+    return parts
+
+
+def _starts_entry(previous, word):
+    # Whether a space between `previous` and `word` separates two entries.
+    if previous[-1] in OPERATORS + "(":
+        return False
+    if word[0] in OPERATORS:
+        # As in MATLAB, "1 -2" is two entries and "1 - 2" one.
+        return word[0] in "+-" and len(word) > 1
+    return word[0] not in ")!"
+
+
+def _split_entries(row):
+    # Commas separate entries when the row has any (outside parentheses);
+    # otherwise spaces do, except inside parentheses and around operators, so
+    # "1 - 2" and "sin(pi / 2)" are single entries.
+    parts = _split_top_level(row, ",")
+    if len(parts) > 1:
+        return [part.strip() for part in parts if part.strip()]
+    words = row.split()
+    if not words:
+        return []
+    entries = [words[0]]
+    depth = words[0].count("(") - words[0].count(")")
+    for word in words[1:]:
+        if depth == 0 and _starts_entry(entries[-1], word):
+            entries.append(word)
+        else:
+            entries[-1] += " " + word
+        depth += word.count("(") - word.count(")")
+    return entries
+
+
+def parse_matrix(text):
+    # "1 2; 3 4", one row per line, or "[[1, 2], [3, 4]]"; entries may be
+    # expressions (pi/2, sqrt(2), ...).
+    text = text.strip()
+    if text.startswith("["):
+        text = re.sub(r"\]\s*,\s*\[", ";", text).replace("[", "").replace("]", "")
+    rows = [row for row in re.split(r"[;\n]", text) if row.strip()]
+    if not rows:
+        raise ValueError("matrice vide")
+    values = []
+    for row in rows:
+        entries = _split_entries(row)
+        values.append([float(evaluate_expression(e)) for e in entries])
+    width = len(values[0])
+    if any(len(row) != width for row in values):
+        raise ValueError("toutes les lignes doivent avoir le même nombre de colonnes")
+    return np.array(values)
+
+
+def _data_lines(f):
+    return (line for line in f if line.strip())
+
+
+def csv_to_npy(path, target, delimiter=","):
+    # Two passes over the file: count the rows, then fill a memory-mapped
+    # .npy one chunk of rows at a time (np.loadtxt parses each chunk in C).
+    with open(path, encoding="utf-8") as f:
+        lines = _data_lines(f)
+        first = next(lines, None)
+        if first is None:
+            raise ValueError("fichier vide")
+        cols = len(first.split(delimiter))
+        try:
+            [float(v) for v in first.split(delimiter)]
+            header = False
+        except ValueError:
+            header = True
+        rows = sum(1 for _ in lines) + (not header)
+    if not rows:
+        raise ValueError("aucune ligne de données")
+    out = np.lib.format.open_memmap(target, mode="w+", dtype=float, shape=(rows, cols))
+    with open(path, encoding="utf-8") as f:
+        lines = _data_lines(f)
+        if header:
+            next(lines)
+        start = 0
+        while True:
+            chunk = list(itertools.islice(lines, CHUNK_ROWS))
+            if not chunk:
+                break
+            out[start:start + len(chunk)] = np.loadtxt(chunk, delimiter=delimiter, ndmin=2)
+            start += len(chunk)
+    out.flush()
+    del out
+
+
+def _cache_path(path):
+    stat = os.stat(path)
+    key = f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    return os.path.join(CACHE_DIR, hashlib.sha1(key.encode()).hexdigest() + ".npy")
+
+
+def load_matrix(path):
+    # Returns a read-only memory-mapped array.
+    if path.lower().endswith(".npy"):
+        array = np.load(path, mmap_mode="r")
+    else:
+        target = _cache_path(path)
+        if not os.path.exists(target):
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            delimiter = ";" if path.lower().endswith(".ssv") else ","
+            partial = target + ".part"
+            try:
+                csv_to_npy(path, partial, delimiter)
+            except BaseException:
+                if os.path.exists(partial):
+                    os.remove(partial)
+                raise
+            os.replace(partial, target)
+        array = np.load(target, mmap_mode="r")
+    if array.ndim == 1:
+        array = array.reshape(-1, 1)
+    if array.ndim != 2:
+        raise ValueError(f"un tableau à {array.ndim} dimensions n'est pas une matrice")
+    return array
+
+
+# -- operations ------------------------------------------------------------
+
+def _square(a, name):
+    if a.ndim != 2 or a.shape[0] != a.shape[1]:
+        raise ValueError(f"{name} demande une matrice carrée (reçu {a.shape[0]}×{a.shape[1]})")
+
+
+def multiply(a, b):
+    if a.shape[1] != b.shape[0]:
+        raise ValueError(f"dimensions incompatibles : {a.shape[0]}×{a.shape[1]} · {b.shape[0]}×{b.shape[1]}")
+    return a @ b
+
+
+def inverse(a):
+    _square(a, "l'inverse")
+    return np.linalg.inv(a)
+
+
+def determinant(a):
+    # From the log-determinant, so large matrices do not overflow halfway.
+    _square(a, "le déterminant")
+    sign, logdet = np.linalg.slogdet(a)
+    if sign == 0:
+        return 0.0
+    return float(sign * np.exp(logdet)) if logdet < 709 else float(sign * np.inf)
+
+
+def solve(a, b):
+    # Square systems are solved exactly; others in the least-squares sense.
+    if a.shape[0] != b.shape[0]:
+        raise ValueError(f"A a {a.shape[0]} lignes mais b en a {b.shape[0]}")
+    if a.shape[0] == a.shape[1]:
+        return np.linalg.solve(a, b)
+    return np.linalg.lstsq(a, b, rcond=None)[0]
+
+
+def eigen(a):
+    # Symmetric matrices get real eigenvalues in ascending order.
+    _square(a, "les valeurs propres")
+    if np.allclose(a, a.T):
+        return dict(zip(("valeurs propres", "vecteurs propres"), np.linalg.eigh(a)))
+    return dict(zip(("valeurs propres", "vecteurs propres"), np.linalg.eig(a)))
+
+
+def qr(a):
+    return dict(zip(("Q", "R"), np.linalg.qr(a)))
+
+
+def svd(a):
+    u, s, vt = np.linalg.svd(a, full_matrices=False)
+    return {"U": u, "valeurs singulières": s, "Vᵀ": vt}
+
+
+def cholesky(a):
+    _square(a, "Cholesky")
+    return {"L": np.linalg.cholesky(a)}
+
+
+def lu(a):
+    # Doolittle with partial pivoting: P·A = L·U (numpy has no LU of its own).
+    _square(a, "LU")
+    n = a.shape[0]
+    u = np.array(a, dtype=float)
+    l = np.eye(n)
+    perm = np.arange(n)
+    for k in range(n - 1):
+        p = k + int(np.argmax(np.abs(u[k:, k])))
+        if p != k:
+            u[[k, p], k:] = u[[p, k], k:]
+            l[[k, p], :k] = l[[p, k], :k]
+            perm[[k, p]] = perm[[p, k]]
+        if u[k, k] == 0:
+            continue
+        factors = u[k + 1:, k] / u[k, k]
+        l[k + 1:, k] = factors
+        u[k + 1:, k:] -= np.outer(factors, u[k, k:])
+    return {"P": np.eye(n)[perm], "L": l, "U": u}
+
+
+# name: (function, number of operands, label)
+OPERATIONS = {
+    "A×B": (multiply, 2, "A·B"),
+    "inv": (inverse, 1, "A⁻¹"),
+    "det": (determinant, 1, "det(A)"),
+    "solve": (solve, 2, "A·x = B"),
+    "eig": (eigen, 1, "eig(A)"),
+    "LU": (lu, 1, "LU(A)"),
+    "QR": (qr, 1, "QR(A)"),
+    "SVD": (svd, 1, "SVD(A)"),
+    "chol": (cholesky, 1, "Cholesky(A)"),
+}
+
+
+def run(name, a, b=None):
+    fn, operands, label = OPERATIONS[name]
+    if a is None or (operands == 2 and b is None):
+        raise ValueError("définissez d'abord " + ("A et B" if operands == 2 else "A"))
+    with np.errstate(all="ignore"):
+        return label, fn(a, b) if operands == 2 else fn(a)
+
+
+def shape_text(value):
+    value = np.asarray(value)
+    if value.ndim == 1:
+        return f"vecteur de {value.shape[0]}"
+    return f"matrice {value.shape[0]}×{value.shape[1]}"
+
+
+def format_value(value, precision=6, edge=4):
+    if isinstance(value, dict):
+        return "\n\n".join(f"{name} ({shape_text(v)}) :\n{format_value(v, precision, edge)}"
+                           for name, v in value.items())
+    if np.isscalar(value):
+        return f"{value:.{precision + 4}g}" if isinstance(value, float) else str(value)
+    # Large arrays are summarized by their corners (edge rows/columns).
+    return np.array2string(np.asarray(value), precision=precision, suppress_small=True,
+                           threshold=200, edgeitems=edge, max_line_width=120)
+
+
+def summary(value):
+    if isinstance(value, dict):
+        return ", ".join(f"{name} : {shape_text(v)}" for name, v in value.items())
+    if np.isscalar(value):
+        return format_value(value)
+    return shape_text(value)
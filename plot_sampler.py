@@ -0,0 +1,134 @@
+from collections import ChainMap
+
+import numpy as np
+
+from expression_engine import compile_expression
+
+# Adaptive, fully vectorized sampling of y = f(x) for plotting.
+# Starts from a coarse uniform grid and repeatedly bisects the intervals where
+# the curve bends (middle point far from the chord of its neighbours) or where
+# it enters/leaves its domain, until the point budget is spent. Jumps that
+# survive refinement are treated as asymptotes and broken with NaN.
+
+
+def check_names(compiled, variables, env=None):
+    env = env if env is not None else {}
+    unknown = [name for name in compiled.names if name not in variables and name not in env]
+    if unknown:
+        raise NameError(f"name '{sorted(unknown)[0]}' is not defined")
+
+
+def as_real(y, shape):
+    # Complex results (sqrt of a negative, ...) are outside the real domain.
+    y = np.asarray(y)
+    if np.iscomplexobj(y):
+        y = np.where(np.abs(y.imag) < 1e-12, y.real, np.nan)
+    return np.array(np.broadcast_to(y.astype(float, copy=False), shape))
+
+
+def make_vector_function(text, variable="x", env=None):
+    # env: any mapping (a dict, or a workspace Scope with user variables and functions).
+    compiled = compile_expression(text, backend="numpy")
+    check_names(compiled, {variable}, env)
+    base_env = env if env is not None else {}
+
+    def f(x):
+        scope = ChainMap({variable: x}, base_env)
+        with np.errstate(all="ignore"):
+            return as_real(compiled(scope), np.shape(x))
+    return f
+
+
+def robust_span(y, x=None):
+    # 1st-99th percentile range; with x, points are weighted by the width they
+    # cover so clusters of refined samples near a pole do not dominate.
+    finite = np.isfinite(y)
+    if not finite.any():
+        return 0.0, 0.0, 1.0
+    if x is None:
+        lo, hi = np.percentile(y[finite], [1, 99])
+    else:
+        weights = np.gradient(x)[finite]
+        order = np.argsort(y[finite])
+        cdf = np.cumsum(weights[order])
+        cdf /= cdf[-1]
+        ys = y[finite][order]
+        lo, hi = ys[np.searchsorted(cdf, [0.01, 0.99]).clip(0, len(ys) - 1)]
+    span = hi - lo
+    if span <= 0:
+        span = max(abs(hi), 1.0)
+    return lo, hi, span
+
+
+def _interval_scores(x, y, yscale):
+    n = len(x)
+    dev = np.zeros(n)
+    with np.errstate(all="ignore"):
+        x0, x1, x2 = x[:-2], x[1:-1], x[2:]
+        y0, y1, y2 = y[:-2], y[1:-1], y[2:]
+        predicted = y0 + (y2 - y0) * (x1 - x0) / (x2 - x0)
+        inner = np.abs(y1 - predicted) / yscale
+    dev[1:-1] = np.where(np.isfinite(inner), inner, 0.0)
+    scores = np.maximum(dev[:-1], dev[1:])
+    finite = np.isfinite(y)
+    # Domain edges and poles: one side finite, the other not.
+    scores[finite[:-1] != finite[1:]] = np.inf
+    return scores
+
+
+def sample_function(f, xmin, xmax, budget=20000, initial=512, tol=2e-3, max_rounds=16):
+    if not xmin < xmax:
+        raise ValueError("x min doit être inférieur à x max")
+    budget = max(int(budget), 16)
+    x = np.linspace(xmin, xmax, min(initial, budget))
+    y = f(x)
+    min_width = (xmax - xmin) * 1e-12
+
+    for _ in range(max_rounds):
+        remaining = budget - len(x)
+        if remaining <= 0:
+            break
+        lo, hi, yscale = robust_span(y, x)
+        scores = _interval_scores(x, y, yscale)
+        widths = np.diff(x)
+        scores[widths < min_width] = 0.0
+        candidates = np.flatnonzero(scores > tol)
+        if candidates.size == 0:
+            break
+        if candidates.size > remaining:
+            worst = np.argpartition(scores[candidates], -remaining)[-remaining:]
+            candidates = np.sort(candidates[worst])
+        xm = 0.5 * (x[candidates] + x[candidates + 1])
+        ym = f(xm)
+        x = np.insert(x, candidates + 1, xm)
+        y = np.insert(y, candidates + 1, ym)
+
+    return x, break_asymptotes(x, y)
+
+
+def break_asymptotes(x, y, jump=1.0):
+    lo, hi, span = robust_span(y, x)
+    with np.errstate(all="ignore"):
+        dy = np.abs(np.diff(y))
+        flips = np.sign(y[:-1]) != np.sign(y[1:])
+    breaks = np.flatnonzero((dy > jump * span) & flips & np.isfinite(dy))
+    if breaks.size == 0:
+        return y
+    y = y.copy()
+    # Blank the endpoint that lies further outside the robust range.
+    left_far = np.abs(y[breaks]) > np.abs(y[breaks + 1])
+    y[np.where(left_far, breaks, breaks + 1)] = np.nan
+    return y
+
+
+def view_limits(x, y, margin=0.1, clip=1.0):
+    lo, hi, span = robust_span(y, x)
+    finite = y[np.isfinite(y)]
+    if finite.size == 0:
+        return -1.0, 1.0
+    ymin = max(finite.min(), lo - clip * span)
+    ymax = min(finite.max(), hi + clip * span)
+    if ymin == ymax:
+        ymin, ymax = ymin - 1.0, ymax + 1.0
+    pad = (ymax - ymin) * margin
+    return ymin - pad, ymax + pad
@@ -0,0 +1,135 @@
+import tkinter as tk
+from tkinter import ttk, simpledialog, filedialog, messagebox
+
+import instrumentation
+
+# Sidebar panel showing the instrumentation data: per-operation timings,
+# cache hit rates and the recent operations, refreshed while it is visible.
+# Showing the panel turns instrumentation on; hiding it turns it back off
+# unless the app was started with --instrument.
+
+
+class ProfilerPanel(tk.Frame):
+    def __init__(self, master, bg, fg, refresh_ms=500, keep_enabled=False, **kwargs):
+        super().__init__(master, bg=bg, **kwargs)
+        self.refresh_ms = refresh_ms
+        self.keep_enabled = keep_enabled
+        self._after = None
+        self._report = None
+
+        self.title = tk.Label(self, text="Profilage", bg=bg, fg=fg, font=("Arial", 11, "bold"), anchor="w")
+        self.title.pack(fill="x", padx=6, pady=(6, 2))
+        self.table = ttk.Treeview(self, columns=("n", "p50", "p95"), height=8)
+        self.table.heading("#0", text="opération")
+        self.table.heading("n", text="n")
+        self.table.heading("p50", text="p50 ms")
+        self.table.heading("p95", text="p95 ms")
+        self.table.column("#0", width=100)
+        for column in ("n", "p50", "p95"):
+            self.table.column(column, width=48, anchor="e")
+        self.table.pack(fill="x", padx=6)
+
+        self.caches = tk.Label(self, text="", bg=bg, fg=fg, justify="left", anchor="w",
+                               font=("Consolas", 9))
+        self.caches.pack(fill="x", padx=6, pady=4)
+        self.recent = tk.Label(self, text="", bg=bg, fg=fg, justify="left", anchor="w",
+                               font=("Consolas", 9))
+        self.recent.pack(fill="x", padx=6)
+
+        buttons = tk.Frame(self, bg=bg)
+        buttons.pack(fill="x", padx=6, pady=6)
+        for text, command in (("Profiler…", self.start_profile), ("Rapport", self.show_report),
+                              ("Exporter…", self.export), ("Réinitialiser", self.reset)):
+            tk.Button(buttons, text=text, command=command, bd=0).pack(fill="x", pady=1)
+
+    def show(self):
+        instrumentation.enable()
+        self.pack(side="bottom", fill="x")
+        self.refresh()
+
+    def hide(self):
+        if self._after is not None:
+            self.after_cancel(self._after)
+            self._after = None
+        self.pack_forget()
+        if not self.keep_enabled:
+            instrumentation.enable(False)
+            instrumentation.stop_profiling()
+
+    def toggle(self):
+        if self.winfo_ismapped():
+            self.hide()
+        else:
+            self.show()
+
+    def configure_colors(self, bg, fg):
+        self.configure(bg=bg)
+        for label in (self.title, self.caches, self.recent):
+            label.configure(bg=bg, fg=fg)
+
+    def refresh(self):
+        self._after = self.after(self.refresh_ms, self.refresh)
+        stats = instrumentation.timing_stats()
+        self.table.delete(*self.table.get_children())
+        for label, s in sorted(stats.items(), key=lambda item: -item[1]["p95_ms"]):
+            self.table.insert("", "end", text=label,
+                              values=(s["count"], f"{s['p50_ms']:.2f}", f"{s['p95_ms']:.2f}"))
+        lines = []
+        for name, c in sorted(instrumentation.snapshot()["caches"].items()):
+            total = c["hits"] + c["misses"]
+            if total:
+                lines.append(f"{name}: {c['hits']}/{total} ({c['hits'] / total:.0%})")
+        self.caches.configure(text="cache\n" + "\n".join(lines) if lines else "")
+        recent = list(instrumentation.recent)[-5:]
+        self.recent.configure(text="\n".join(f"{label} {seconds * 1000:.1f} ms"
+                                             for ts, label, seconds, thread in reversed(recent)))
+        if instrumentation.is_profiling():
+            done = len(instrumentation.profiled_operations())
+            self.title.configure(text=f"Profilage ({done} op. profilées)")
+        else:
+            self.title.configure(text="Profilage")
+
+    def start_profile(self):
+        n = simpledialog.askinteger("Profiler", "Profiler les N dernières opérations :",
+                                    initialvalue=10, minvalue=1, maxvalue=1000, parent=self)
+        if n:
+            instrumentation.start_profiling(n)
+
+    def show_report(self):
+        # A single report window, refreshed and raised on each request.
+        if self._report is None or not self._report.winfo_exists():
+            win = tk.Toplevel(self)
+            win.title("Rapport de profil")
+            win.geometry("900x500")
+            self._report = tk.Text(win, wrap="none", font=("Consolas", 9))
+            self._report.pack(fill="both", expand=True)
+        text = self._report
+        text.configure(state="normal")
+        text.delete("1.0", "end")
+        text.insert("1.0", instrumentation.profile_report())
+        text.configure(state="disabled")
+        text.winfo_toplevel().lift()
+
+    def export(self):
+        path = filedialog.asksaveasfilename(parent=self, title="Exporter les mesures",
+                                            defaultextension=".json",
+                                            filetypes=[("JSON", "*.json"), ("pstats", "*.prof")])
+        if not path:
+            return
+        try:
+            if path.endswith(".prof"):
+                if not instrumentation.dump_profile(path):
+                    messagebox.showinfo("Profil", "Aucune opération profilée.", parent=self)
+            else:
+                instrumentation.export_json(path)
+        except OSError as e:
+            messagebox.showerror("Erreur", str(e), parent=self)
+
+    def reset(self):
+        instrumentation.reset()
+        self.refresh_now()
+
+    def refresh_now(self):
+        if self._after is not None:
+            self.after_cancel(self._after)
+        self.refresh()
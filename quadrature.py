@@ -0,0 +1,90 @@
+import numpy as np
+
+# Adaptive Gauss–Kronrod (G7/K15) quadrature, vectorized with NumPy: every
+# round evaluates the integrand once on the nodes of all intervals that still
+# need work, then bisects the ones whose error estimate is too large.
+
+XGK = np.array([
+    0.991455371120812639206854697526329,
+    0.949107912342758524526189684047851,
+    0.864864423359769072789712788640926,
+    0.741531185599394439863864773280788,
+    0.586087235467691130294144845693013,
+    0.405845151377397166906606412076961,
+    0.207784955007898467600689403773245,
+    0.000000000000000000000000000000000,
+])
+WGK = np.array([
+    0.022935322010529224963732008058970,
+    0.063092092629978553290700663189204,
+    0.104790010322250183839876322541518,
+    0.140653259715525918745189590510238,
+    0.169004726639267902826583426598550,
+    0.190350578064785409913256402421014,
+    0.204432940075298892414161999234649,
+    0.209482141084727828012999174891714,
+])
+WG = np.array([
+    0.129484966168869693270611432679082,
+    0.279705391489276667901467771423780,
+    0.381830050505118944950369775488975,
+    0.417959183673469387755102040816327,
+])
+
+# Full symmetric node/weight vectors on [-1, 1].
+NODES = np.concatenate([-XGK[:-1], [0.0], XGK[-2::-1]])
+KRONROD_WEIGHTS = np.concatenate([WGK[:-1], [WGK[-1]], WGK[-2::-1]])
+GAUSS_WEIGHTS = np.zeros(15)
+GAUSS_WEIGHTS[1:14:2] = np.concatenate([WG[:-1], [WG[-1]], WG[-2::-1]])
+
+
+class QuadratureError(ArithmeticError):
+    pass
+
+
+def _gauss_kronrod(f, a, b):
+    center = 0.5 * (a + b)
+    half = 0.5 * (b - a)
+    x = center[:, None] + half[:, None] * NODES[None, :]
+    with np.errstate(all="ignore"):
+        y = np.broadcast_to(np.asarray(f(x.ravel()), dtype=float), (x.size,)).reshape(x.shape)
+    kronrod = half * (y @ KRONROD_WEIGHTS)
+    gauss = half * (y @ GAUSS_WEIGHTS)
+    return kronrod, np.abs(kronrod - gauss)
+
+
+def integrate(f, a, b, tol=1e-10, rtol=1e-10, max_intervals=20000):
+    if a == b:
+        return 0.0, 0.0
+    sign = 1.0
+    if a > b:
+        a, b, sign = b, a, -1.0
+    lo = np.array([a], dtype=float)
+    hi = np.array([b], dtype=float)
+    done_value = 0.0
+    done_error = 0.0
+    total_intervals = 1
+
+    while lo.size:
+        values, errors = _gauss_kronrod(f, lo, hi)
+        if not (np.all(np.isfinite(values)) and np.all(np.isfinite(errors))):
+            raise QuadratureError("l'intégrande n'est pas fini sur l'intervalle")
+        estimate = done_value + values.sum()
+        budget = max(tol, rtol * abs(estimate))
+        # Each interval may use a share of the error budget proportional to its width.
+        share = budget * (hi - lo) / (b - a)
+        converged = errors <= share
+        done_value += values[converged].sum()
+        done_error += errors[converged].sum()
+        lo, hi = lo[~converged], hi[~converged]
+        if not lo.size:
+            break
+        if total_intervals + lo.size > max_intervals:
+            done_value += values[~converged].sum()
+            done_error += errors[~converged].sum()
+            break
+        mid = 0.5 * (lo + hi)
+        lo, hi = np.concatenate([lo, mid]), np.concatenate([mid, hi])
+        total_intervals += lo.size // 2
+
+    return float(sign * done_value), float(done_error)
@@ -1,130 +1,195 @@
+import lazy_imports
 import tkinter as tk
-from tkinter import ttk, simpledialog, messagebox
+from tkinter import ttk, simpledialog, messagebox, filedialog
+import argparse
+import io
+import logging
+import os
 import math
-import sympy as sp
+import multiprocessing
+import sys
 from functools import partial
-import matplotlib.pyplot as plt
-import numpy as np
-import re
+import base_convert
+import instrumentation
+import unit_registry
+from instrumentation import log
+from calculator_core import (BASES, evaluate_expression, evaluate_for_display, round_result,
+                             convert_units, convert_base, resolve_base, factorial_of)
+from jobs import JobScheduler
+from history_store import HistoryStore, DEFAULT_PATH as DEFAULT_HISTORY_PATH, DEFAULT_CAP as DEFAULT_HISTORY_CAP
+from history_view import HistoryView
+from profiler_panel import ProfilerPanel
+from workspace import Workspace, parse_definition
+from expression_editor import ExpressionEditor
+from theme import ThemeRegistry
+
+# Buttons of the "Matrices" section (operands, then operations of matrix_ops).
+MATRIX_OPERANDS = ('A', 'B')
+MATRIX_OPERATIONS = ('A×B', 'inv', 'det', 'solve', 'eig', 'LU', 'QR', 'SVD', 'chol')
+
+# Sections of the calculator panel, in order. A string is a button sent to
+# on_click; a (label, method) pair is a wide button opening a window. The
+# buttons of a section are only built when it is first expanded.
+SECTIONS = [
+    ("Trigonometry", ['sin', 'cos', 'tan', 'sinh', 'cosh', 'tanh']),
+    ("Advanced Math", ['∂f(x)', '∫f(x)', 'solve', 'fact', 'sqrt', 'exp', 'log', 'ln']),
+    ("Constants & Other", ['pi', 'e', 'floor', 'abs', 'prec']),
+    ("Variables", ['def', 'var', ',', 'vars']),
+    ("Matrices", list(MATRIX_OPERANDS + MATRIX_OPERATIONS)),
+    ("Statistics", [("Statistiques (fichier ou colonne)", "open_statistics_window")]),
+    ("Conversions", [("Binary/Octal/Hex Converter", "open_bin_oct_hex_converter")]),
+]
 
 class ScientificCalculator:
-    def __init__(self, master):
+    def __init__(self, master, history_path=DEFAULT_HISTORY_PATH, history_cap=DEFAULT_HISTORY_CAP,
+                 instrument=False):
         self.master = master
         master.title("Scientific Calculator")
         master.geometry("1050x700")
-        self.theme = "dark"
-        self.expression = ""
+        self.themes = ThemeRegistry("dark")
+        self.editor = ExpressionEditor()
+        self._message = False
+        self._preview_after = None
         self.input_text = tk.StringVar()
 
-        self.bg_dark = "#1e1e2e"
-        self.bg_light = "#ffffff"
-        self.fg_light = "#ffffff"
-        self.fg_dark = "#000000"
-        self.accent_color = "#00bcd4"
         self.last_result = None
+        self.last_text = ""
+        self.last_exact = True
+        self.precision = 0
+        self.instrument = instrument
+        self.workspace = Workspace()
+        self.matrices = {name: None for name in MATRIX_OPERANDS}
+        self.profiler_panel = None
+        self.windows = {}
+        self.graph = None
         self.should_clear_on_next_input = False 
 
-        master.configure(bg=self.bg_dark)
+        self.themes.register(master, "window")
         master.rowconfigure(0, weight=1)
         master.columnconfigure(1, weight=1)
         master.columnconfigure(2, weight=2)
 
-        self.sidebar_frame = tk.Frame(master, bg="#2e2e2e", width=200)
+        self.sidebar_frame = self.themes.register(tk.Frame(master, width=200), "sidebar")
         self.sidebar_frame.pack(side='left', fill='y')
-        self.theme_btn = tk.Button(self.sidebar_frame, text="⛅ Toggle Theme",
-                                   bg=self.accent_color, fg=self.fg_light, relief="ridge",
-                                   font=("Arial", 12, "bold"), bd=0,
-                                   anchor="w", padx=20,
-                                   command=self.toggle_theme)
+        self.theme_btn = self.themes.register(
+            tk.Button(self.sidebar_frame, text="⛅ Toggle Theme", relief="ridge",
+                      font=("Arial", 12, "bold"), bd=0, anchor="w", padx=20,
+                      command=self.toggle_theme), "accent")
         self.theme_btn.pack(fill="x", pady=(8,4), padx=0)
         self.sidebar_items = [
             "\U0001F4C8 Graphique", "\U0001F4E6 Volume", "\U0001F4CF Longueur", "\u2696\ufe0f Poids",
             "🌡Température", 
             "\u26a1 Énergie", "\U0001F9F1 Surface", "\U0001F680 Vitesse",
-            "\u23F0 Heure", "\U0001F4BE Données", "\U0001F4CA Pression", "\U0001F50C Puissance"
+            "\u23F0 Heure", "\U0001F4BE Données", "\U0001F4CA Pression", "\U0001F50C Puissance",
+            "\u23F1 Profilage"
         ]
         for name in self.sidebar_items:
-            btn = tk.Button(self.sidebar_frame, text=name, bg="#2e2e2e", fg="white",
+            btn = tk.Button(self.sidebar_frame, text=name,
                             bd=0, anchor="w", padx=20, font=("Arial", 12),
                             command=partial(self.sidebar_action, name))
-            btn.pack(fill="x", pady=2)
+            self.themes.register(btn, "sidebar_item").pack(fill="x", pady=2)
 
-        right_frame = tk.Frame(master, bg=self.bg_dark)
+        right_frame = self.themes.register(tk.Frame(master), "frame")
         right_frame.pack(side="right", fill="both", expand=True)
         right_frame.rowconfigure(0, weight=0)
         right_frame.rowconfigure(1, weight=1)
         right_frame.columnconfigure(0, weight=1)
         right_frame.columnconfigure(1, weight=1)
 
-        self.input_frame = tk.Frame(right_frame, height=54, bg=self.bg_dark)
+        self.input_frame = self.themes.register(tk.Frame(right_frame, height=54), "frame")
         self.input_frame.grid(row=0, column=0, sticky="ew", columnspan=2)
         self.input_frame.columnconfigure(0, weight=1)
         self.input_field = tk.Entry(
             self.input_frame, font=('arial', 20, 'bold'),
             textvariable=self.input_text, width=35,
-            bg="#2e2e3e", fg=self.fg_light,
             bd=0, justify="right"
         )
-        self.input_field.grid(row=0, column=0, ipady=10, padx=15, pady=9, sticky="ew")
+        self.themes.register(self.input_field, "screen")
+        self.input_field.grid(row=0, column=0, ipady=10, padx=15, pady=(9, 0), sticky="ew")
+        self.preview_label = self.themes.register(
+            tk.Label(self.input_frame, text="", anchor="e", font=('arial', 11)), "muted")
+        self.preview_label.grid(row=1, column=0, padx=15, sticky="ew")
+        self.input_field.bind("<KeyPress>", self.on_entry_key)
+        self.input_field.bind("<<Paste>>", self.on_paste)
+        self.input_field.bind("<<Cut>>", self.on_cut)
+        self.busy_label = self.themes.register(
+            tk.Label(self.input_frame, text="", width=2, font=('arial', 16)), "busy")
+        self.busy_label.grid(row=0, column=1, padx=(0, 10))
+        self.jobs = JobScheduler(master, on_busy=self.set_busy)
 
-        self.history = tk.Text(right_frame, width=10, bg="#2e2e3e", fg=self.fg_light, state='disabled')
+        self.history_store = HistoryStore(history_path, history_cap)
+        palette = self.themes.palette
+        self.history = HistoryView(right_frame, self.history_store, bg=palette["bg"],
+                                   fg=palette["fg"], search_bg=palette["screen"])
+        self.themes.on_change(lambda p: self.history.configure_colors(p["bg"], p["fg"], p["screen"]))
         self.history.grid(row=1, column=1, sticky="nswe", padx=(4,6), pady=(0,3))
 
-        calc_frame = tk.Frame(right_frame, bg=self.bg_dark)
+        calc_frame = self.themes.register(tk.Frame(right_frame), "frame")
         calc_frame.grid(row=1, column=0, sticky="nswe", padx=(0,6), pady=(0,3))
         calc_frame.rowconfigure(0, weight=1)
         calc_frame.columnconfigure(0, weight=1)
-        canvas = tk.Canvas(calc_frame, bg=self.bg_dark, highlightthickness=0)
+        canvas = self.themes.register(tk.Canvas(calc_frame, highlightthickness=0), "frame")
         canvas.pack(side="left", fill="both", expand=True)
         v_scrollbar = ttk.Scrollbar(calc_frame, orient="vertical", command=canvas.yview)
         canvas.configure(yscrollcommand=v_scrollbar.set)
         v_scrollbar.pack(side="right", fill="y")
-        self.scrollable_frame = tk.Frame(canvas, bg=self.bg_dark)
+        self.scrollable_frame = self.themes.register(tk.Frame(canvas), "frame")
         canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
         self.scrollable_frame.bind(
             "<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all"))
         )
 
         self.section_map = {}
-        self.create_section("Trigonometry", ['sin', 'cos', 'tan', 'sinh', 'cosh', 'tanh'])
-        self.create_section("Advanced Math", ['∂f(x)', '∫f(x)', 'fact', 'sqrt', 'exp', 'log', 'ln'])
-        self.create_section("Constants & Other", ['pi', 'e', 'floor', 'abs'])
-        self.create_section("Conversions", ['bin/oct/hex'])
+        self.section_headers = {}
+        self.section_functions = {}
+        for title, functions in SECTIONS:
+            self.create_section(title, functions)
 
         self.create_basic_calculator()
 
         master.bind('<Return>', lambda event: self.on_click('='))
         master.bind('<BackSpace>', lambda event: self.on_click('CE'))
-        for key in '0123456789+-*/().':
+        master.bind('<Escape>', lambda event: self.jobs.cancel_all())
+        master.bind('<Control-z>', lambda event: self.undo())
+        master.bind('<Control-y>', lambda event: self.redo())
+        master.bind('<Control-Z>', lambda event: self.redo())
+        master.protocol("WM_DELETE_WINDOW", self.on_close)
+        for key in '0123456789+-*/().,':
             master.bind(key, lambda event, ch=key: self.on_click(ch))
 
-    def create_section(self, title, functions, buttons_per_row=6):
+    def create_section(self, title, functions):
+        # Only the header is built here; see build_section.
         btn = tk.Button(self.scrollable_frame, text=f"\u25B6 {title}",
-                        bg=self.accent_color, fg=self.fg_light, relief="flat", anchor="w", font=("Arial", 12, "bold"),
+                        relief="flat", anchor="w", font=("Arial", 12, "bold"),
                         command=partial(self.toggle_section, title))
-        btn.pack(fill="x", padx=10, pady=2)
-        frame = tk.Frame(self.scrollable_frame, bg=self.bg_dark)
-        setattr(self, f"{title}_frame", frame)
+        self.themes.register(btn, "accent").pack(fill="x", padx=10, pady=2)
+        self.section_headers[title] = btn
+        self.section_functions[title] = functions
+
+    def build_section(self, title, buttons_per_row=6):
+        frame = self.themes.register(tk.Frame(self.scrollable_frame), "frame")
         self.section_map[title] = frame
-        if title == "Conversions":
-            convert_btn = tk.Button(frame, text="Binary/Octal/Hex Converter", width=24, height=2,
-                                    bg="#333344", fg=self.fg_light, relief="flat",
-                                    command=self.open_bin_oct_hex_converter)
-            convert_btn.pack(padx=10, pady=4, fill="x")
-        else:
-            for i, func in enumerate(functions):
-                if i % buttons_per_row == 0:
-                    row = tk.Frame(frame, bg=self.bg_dark)
-                    row.pack(pady=2)
-                tk.Button(row, text=func, width=8, height=2,
-                          bg="#333344", fg=self.fg_light, relief="flat",
-                          command=lambda f=func: self.on_click(f)).pack(side="left", padx=5)
-        frame.pack_forget()
+        functions = self.section_functions[title]
+        for i, func in enumerate(functions):
+            if isinstance(func, tuple):
+                label, method = func
+                btn = tk.Button(frame, text=label, width=24, height=2, relief="flat",
+                                command=getattr(self, method))
+                self.themes.register(btn, "key").pack(padx=10, pady=4, fill="x")
+                continue
+            if i % buttons_per_row == 0:
+                row = self.themes.register(tk.Frame(frame), "frame")
+                row.pack(pady=2)
+            btn = tk.Button(row, text=func, width=8, height=2, relief="flat",
+                            command=lambda f=func: self.on_click(f))
+            self.themes.register(btn, "key").pack(side="left", padx=5)
+        log.debug("section %s built (%d buttons)", title, len(functions))
+        return frame
 
     def create_basic_calculator(self):
-        frame = tk.Frame(self.scrollable_frame, bg=self.bg_dark)
+        frame = self.themes.register(tk.Frame(self.scrollable_frame), "frame")
         frame.pack(pady=20, fill="both", expand=True)
-        center_wrapper = tk.Frame(frame, bg=self.bg_dark)
+        center_wrapper = self.themes.register(tk.Frame(frame), "frame")
         center_wrapper.grid(row=0, column=0)
         frame.grid_rowconfigure(0, weight=1)
         frame.grid_columnconfigure(0, weight=1)
@@ -136,18 +201,38 @@ class ScientificCalculator:
         ]
         for r, row_vals in enumerate(calc_buttons):
             for c, val in enumerate(row_vals):
-                btn = tk.Button(center_wrapper, text=val, width=6, height=2,
-                                bg="#333344", fg=self.fg_light, relief="flat",
+                btn = tk.Button(center_wrapper, text=val, width=6, height=2, relief="flat",
                                 font=("Arial", 14, "bold"),
                                 command=lambda v=val: self.on_click(v))
-                btn.grid(row=r, column=c, padx=8, pady=8)
+                self.themes.register(btn, "key").grid(row=r, column=c, padx=8, pady=8)
 
     def toggle_section(self, section_name):
-        frame = self.section_map[section_name]
+        frame = self.section_map.get(section_name)
+        if frame is None:
+            frame = self.build_section(section_name)
         if frame.winfo_ismapped():
             frame.pack_forget()
         else:
-            frame.pack(fill="x", padx=20)
+            frame.pack(fill="x", padx=20, after=self.section_headers[section_name])
+
+    # -- windows ----------------------------------------------------------
+    # One Toplevel per kind of window: opening it again raises the existing one.
+
+    def raise_window(self, key):
+        win = self.windows.get(key)
+        if win is None or not win.winfo_exists():
+            return None
+        win.deiconify()
+        win.lift()
+        win.focus_set()
+        return win
+
+    def new_window(self, key, title, geometry):
+        win = tk.Toplevel(self.master)
+        win.title(title)
+        win.geometry(geometry)
+        self.windows[key] = win
+        return win
 
     def sidebar_action(self, name):
         if "Graphique" in name:
@@ -174,163 +259,151 @@ class ScientificCalculator:
             self.open_conversion_window("pressure")
         elif "Puissance" in name:
             self.open_conversion_window("power")
+        elif "Profilage" in name:
+            self.toggle_profiler()
         else:
-            self.input_text.set(f"{name} coming soon...")
+            self.show_message(f"{name} coming soon...")
+
+    def toggle_profiler(self):
+        if self.profiler_panel is None:
+            palette = self.themes.palette
+            self.profiler_panel = ProfilerPanel(self.sidebar_frame, bg=palette["sidebar"], fg=palette["fg"],
+                                                keep_enabled=self.instrument)
+            self.themes.on_change(lambda p: self.profiler_panel.configure_colors(p["sidebar"], p["fg"]))
+        self.profiler_panel.toggle()
 
     def toggle_theme(self):
-        if self.theme == "light":
-            self.theme = "dark"
-            bg = self.bg_dark
-            fg = self.fg_light
-            screen_bg = "#2e2e3e"
-            sidebar_bg = "#2e2e2e"
-        else:
-            self.theme = "light"
-            bg = self.bg_light
-            fg = self.fg_dark
-            screen_bg = "#eeeeee"
-            sidebar_bg = "#e0e0e0"
-        self.master.configure(bg=bg)
-        self.input_frame.configure(bg=bg)
-        self.input_field.configure(bg=screen_bg, fg=fg)
-        self.history.configure(bg=bg, fg=fg)
-        self.theme_btn.configure(bg=self.accent_color, fg=self.fg_light)
-        for idx, btnname in enumerate(self.section_map):
-            btn = self.scrollable_frame.winfo_children()[idx]
-            btn.configure(bg=self.accent_color, fg=self.fg_light, anchor="w")
-        self.sidebar_frame.configure(bg=sidebar_bg)
-        for child in self.sidebar_frame.winfo_children():
-            if isinstance(child, tk.Button):
-                child.configure(bg=sidebar_bg, fg=fg, anchor="w", padx=20)
-        for widget in self.scrollable_frame.winfo_children():
-            if isinstance(widget, (tk.Button, tk.LabelFrame, tk.Frame)):
-                try:
-                    widget.configure(bg=bg, fg=fg)
-                except:
-                    pass
-            for child in widget.winfo_children():
-                if isinstance(child, tk.Button):
-                    child.configure(bg=bg, fg=self.fg_light if bg == self.bg_dark else fg)
+        log.debug("theme %s (%d widgets)", self.themes.toggle(), len(self.themes))
 
     def open_graph_window(self):
-        graph_win = tk.Toplevel(self.master)
-        graph_win.title("Tracer une fonction")
-        graph_win.geometry("420x170")
+        if self.raise_window("graph"):
+            return
+        graph_win = self.new_window("graph", "Tracer une fonction", "760x640")
         tk.Label(graph_win, text="Entrez une fonction f(x):").pack(pady=5)
         func_entry = tk.Entry(graph_win, width=40)
         func_entry.pack(pady=5)
+        domain_frame = tk.Frame(graph_win)
+        domain_frame.pack(pady=5)
+        tk.Label(domain_frame, text="x min :").pack(side="left")
+        xmin_entry = tk.Entry(domain_frame, width=8)
+        xmin_entry.insert(0, "-10")
+        xmin_entry.pack(side="left", padx=(0, 8))
+        tk.Label(domain_frame, text="x max :").pack(side="left")
+        xmax_entry = tk.Entry(domain_frame, width=8)
+        xmax_entry.insert(0, "10")
+        xmax_entry.pack(side="left", padx=(0, 8))
+        tk.Label(domain_frame, text="Points max :").pack(side="left")
+        budget_entry = tk.Entry(domain_frame, width=8)
+        budget_entry.insert(0, "20000")
+        budget_entry.pack(side="left")
+        sweep_frame = tk.Frame(graph_win)
+        sweep_frame.pack(pady=5)
+        tk.Label(sweep_frame, text="Mode :").pack(side="left")
+        modes = ["Courbe", "Famille de courbes", "Carte de chaleur", "Contour"]
+        mode_box = ttk.Combobox(sweep_frame, values=modes, width=18, state="readonly")
+        mode_box.current(0)
+        mode_box.pack(side="left", padx=(0, 8))
+        tk.Label(sweep_frame, text="Paramètres :").pack(side="left")
+        params_entry = tk.Entry(sweep_frame, width=28)
+        params_entry.pack(side="left")
+        tk.Label(graph_win, text="ex. f(x) = a*sin(b*x) avec a=0:2:5, b=1;2  ·  carte f(x, y) avec y=-5:5:200",
+                 fg="#666666").pack()
+
+        buttons = tk.Frame(graph_win)
+        buttons.pack(pady=5)
+        plot_frame = tk.Frame(graph_win)
+        plot_frame.pack(fill="both", expand=True)
+        graph = lazy_imports.load("graph_canvas").GraphCanvas(plot_frame)
 
         def plot():
-            user_input = func_entry.get().replace('^', '**')
-
-            user_input = re.sub(r'\bln\s*\(', '@L#N@(', user_input)
-            user_input = re.sub(r'\blog\s*\(', '@L#O#G@(', user_input)
-            user_input = re.sub(r'\bexp\s*\(', '@E#X#P@(', user_input)
-
-            user_input = re.sub(r'\bsqrt\s*\(', 'np.sqrt(', user_input)
-            user_input = re.sub(r'\bsin\s*\(', 'np.sin(', user_input)
-            user_input = re.sub(r'\bcos\s*\(', 'np.cos(', user_input)
-            user_input = re.sub(r'\btan\s*\(', 'np.tan(', user_input)
-            user_input = re.sub(r'\bsinh\s*\(', 'np.sinh(', user_input)
-            user_input = re.sub(r'\bcosh\s*\(', 'np.cosh(', user_input)
-            user_input = re.sub(r'\btanh\s*\(', 'np.tanh(', user_input)
-            user_input = re.sub(r'\babs\s*\(', 'np.abs(', user_input)
-            user_input = re.sub(r'\bpi\b', 'np.pi', user_input)
-            user_input = re.sub(r'\be\b', 'np.e', user_input)
-
-            user_input = user_input.replace('@L#N@(', 'np.log(')
-            user_input = user_input.replace('@L#O#G@(', 'np.log10(')
-            user_input = user_input.replace('@E#X#P@(', 'np.exp(')
-
-            
-            print("TO EVAL:", user_input)
-
-            
-            if re.search(r'np\.log10\(|np\.log\(', user_input):
-                x = np.linspace(0.001, 10, 400)
-            elif re.search(r'np\.sqrt\(', user_input):
-                x = np.linspace(0, 10, 400)
-            else:
-                x = np.linspace(-10, 10, 400)
             try:
-                context = {"np": np, "x": x}
-                y = eval(user_input, {"__builtins__": {}}, context)
-                y = np.array(y)
-                valid = np.isfinite(y)
-                if not np.any(valid):
-                    messagebox.showinfo("Domaine invalide", "Aucune valeur valide à tracer (essayez une autre fonction ou domaine)")
-                    return
-                plt.figure("Graphique de f(x)")
-                plt.clf()
-                plt.plot(x[valid], y[valid], label=f"f(x) = {func_entry.get()}")
-                plt.axhline(0, color='black', linewidth=0.5)
-                plt.axvline(0, color='black', linewidth=0.5)
-                plt.grid(True)
-                plt.legend()
-                plt.xlabel("x")
-                plt.ylabel("f(x)")
-                plt.tight_layout()
-                plt.show()
+                xmin = evaluate_expression(xmin_entry.get())
+                xmax = evaluate_expression(xmax_entry.get())
+                if not xmin < xmax:
+                    raise ValueError("x min doit être inférieur à x max")
+                graph.budget = int(budget_entry.get())
             except Exception as e:
-                messagebox.showerror(
-                    "Erreur",
-                    "Fonction invalide: {}\n\nExemples valides:\nx**2, sin(x), ln(x), exp(x), sqrt(x)\n\nError: {}".format(str(e))
-                )
+                show_plot_error(e)
+                return
+            text = func_entry.get().strip()
+            mode = mode_box.get()
+            params = params_entry.get().strip()
+            env = self.workspace.scope("numpy")
+            log.debug("plot %r on [%s, %s] (%s %s)", text, xmin, xmax, mode, params)
+            if mode != modes[0]:
+                plot_sweep(text, xmin, xmax, mode, params, env)
+                return
 
+            def done(prepared):
+                np = lazy_imports.load("numpy")
+                curve = graph.set_function(text, xmin, xmax, prepared, env)
+                if not np.any(np.isfinite(curve.y)):
+                    graph.remove_function(curve.text)
+                    messagebox.showinfo("Domaine invalide", "Aucune valeur valide à tracer (essayez une autre fonction ou domaine)")
+            self.jobs.submit("plot", graph.prepare, text, xmin, xmax, env,
+                             on_done=done, on_error=show_plot_error)
+
+        def plot_sweep(text, xmin, xmax, mode, params, env):
+            # The whole grid is evaluated in one vectorized call on a worker thread.
+            def family():
+                sweep = lazy_imports.load("sweep")
+                np = lazy_imports.load("numpy")
+                axes = sweep.parse_axes(params)
+                if not axes:
+                    raise ValueError("aucun paramètre (ex. a=0:2:5)")
+                curves = math.prod(len(axis) for axis in axes)
+                x = np.linspace(xmin, xmax, max(200, min(2000, graph.budget // curves)))
+                return (x,) + tuple(sweep.curve_family(text, x, axes, env=env))
 
-        tk.Button(graph_win, text="Afficher", command=plot).pack(pady=10)
+            def heatmap():
+                sweep = lazy_imports.load("sweep")
+                np = lazy_imports.load("numpy")
+                axes = sweep.parse_axes(params, default_count=200)
+                if len(axes) != 1:
+                    raise ValueError("une carte demande un seul paramètre (ex. y=-5:5:200)")
+                y = axes[0]
+                x = np.linspace(xmin, xmax, max(100, min(1000, graph.budget // len(y))))
+                return x, y, sweep.evaluate_grid(text, [sweep.Axis("x", x), y], env)
+
+            if mode == modes[1]:
+                self.jobs.submit("plot", family, on_error=show_plot_error,
+                                 on_done=lambda r: graph.show_family(text, *r))
+            else:
+                self.jobs.submit("plot", heatmap, on_error=show_plot_error,
+                                 on_done=lambda r: graph.show_map(text, r[0], r[1].values, r[2], r[1].name,
+                                                                  contour=mode == modes[3]))
+
+        def show_plot_error(e):
+            messagebox.showerror(
+                "Erreur",
+                "Fonction invalide: {}\n\nExemples valides:\nx**2, sin(x), ln(x), exp(x), sqrt(x)\n\nError: {}".format(func_entry.get(), str(e))
+            )
+
+        tk.Button(buttons, text="Afficher", command=plot).pack(side="left", padx=5)
+        tk.Button(buttons, text="Effacer", command=graph.clear).pack(side="left", padx=5)
+        func_entry.bind('<Return>', lambda event: plot())
+        self.graph = graph
+
+    def graph_canvas(self):
+        # The graph window's canvas, opening the window if it is not shown.
+        self.open_graph_window()
+        return self.graph
 
     def open_conversion_window(self, conv_type):
-        units = {
-            "length": {"mètre": 1.0, "kilomètre": 1000.0, "centimètre": 0.01,
-                       "pouce": 0.0254, "pied": 0.3048, "yard": 0.9144, "mile": 1609.34},
-            "volume": {"litre": 1.0, "millilitre": 0.001, "gallon (US)": 3.78541,
-                       "pinte (US)": 0.473176, "mètre cube": 1000.0},
-            "weight": {"kilogramme": 1.0, "gramme": 0.001, "tonne": 1000.0,
-                       "livre": 0.453592, "once": 0.0283495},
-            "temperature": {"Celsius": None, "Fahrenheit": None, "Kelvin": None},
-            "energy": {"joule": 1.0, "kilojoule": 1000.0, "calorie": 4.184,
-                       "kilocalorie": 4184.0, "watt-heure": 3600.0, "kilowatt-heure": 3.6e6},
-            "area": {"m²": 1.0, "cm²": 0.0001, "km²": 1e6, "pouce²": 0.00064516,
-                     "pied²": 0.092903, "acre": 4046.86},
-            "speed": {"m/s": 1.0, "km/h": 0.277778, "mph": 0.44704, "nœud": 0.514444},
-            "time": {"seconde": 1.0, "minute": 60.0, "heure": 3600.0, "jour": 86400.0},
-            "data": {
-                "bit": 1.0,
-                "octet": 8.0,
-                "kilobit": 1e3,
-                "kilobyte": 8e3,
-                "megabit": 1e6,
-                "megabyte": 8e6,
-                "gigabit": 1e9,
-                "gigabyte": 8e9,
-                "terabit": 1e12,
-                "terabyte": 8e12,
-                "petabit": 1e15,
-                "petabyte": 8e15,
-                "exabit": 1e18,
-                "exabyte": 8e18,
-                "zettabit": 1e21,
-                "zettabyte": 8e21,
-                "yottabit": 1e24,
-                "yottabyte": 8e24
-            },
-            "pressure": {"pascal": 1.0, "bar": 1e5, "atmosphère": 101325.0, "psi": 6894.76},
-            "power": {"watt": 1.0, "kilowatt": 1000.0, "cheval vapeur": 735.5, "horsepower (US)": 745.7}
-        }
-        win = tk.Toplevel(self.master)
-        win.title(f"Conversion de {conv_type.capitalize()}")
-        win.geometry("400x250")
+        if self.raise_window(f"conversion:{conv_type}"):
+            return
+        units = unit_registry.category(conv_type).units
+        win = self.new_window(f"conversion:{conv_type}", f"Conversion de {conv_type.capitalize()}", "400x250")
         tk.Label(win, text="Valeur :").pack(pady=5)
         val_entry = tk.Entry(win)
         val_entry.pack()
         tk.Label(win, text="De :").pack(pady=5)
-        from_unit = ttk.Combobox(win, values=list(units[conv_type].keys()))
+        from_unit = ttk.Combobox(win, values=units)
         from_unit.current(0)
         from_unit.pack()
         tk.Label(win, text="À :").pack(pady=5)
-        to_unit = ttk.Combobox(win, values=list(units[conv_type].keys()))
-        to_unit.current(1 if len(units[conv_type].keys()) > 1 else 0)
+        to_unit = ttk.Combobox(win, values=units)
+        to_unit.current(1 if len(units) > 1 else 0)
         to_unit.pack()
         result_label = tk.Label(win, text="", font=("Arial", 12))
         result_label.pack(pady=10)
@@ -339,217 +412,746 @@ class ScientificCalculator:
                 value = float(val_entry.get())
                 from_u = from_unit.get()
                 to_u = to_unit.get()
-                if conv_type == "temperature":
-                    result = self.convert_temperature(value, from_u, to_u)
-                else:
-                    base = value * units[conv_type][from_u]
-                    result = base / units[conv_type][to_u]
+                with instrumentation.timed("convert.units"):
+                    result = convert_units(value, conv_type, from_u, to_u)
                 result_label.config(text=f"{value} {from_u} = {result:.4f} {to_u}")
             except Exception:
                 result_label.config(text="Erreur de conversion.")
         tk.Button(win, text="Convertir", command=convert).pack(pady=10)
 
     def open_bin_oct_hex_converter(self):
-        win = tk.Toplevel(self.master)
-        win.title("Binary/Octal/Hex Converter")
-        win.geometry("450x230")
+        if self.raise_window("base"):
+            return
+        win = self.new_window("base", "Binary/Octal/Hex Converter", "450x290")
         tk.Label(win, text="Valeur de départ :").pack(pady=5)
         val_entry = tk.Entry(win)
         val_entry.pack()
-        tk.Label(win, text="Base de départ :").pack(pady=5)
-        from_base = ttk.Combobox(win, values=["Binary", "Octal", "Decimal", "Hexadecimal"])
+        tk.Label(win, text="Base de départ (ou 2 à 36) :").pack(pady=5)
+        from_base = ttk.Combobox(win, values=list(BASES))
         from_base.current(2)
         from_base.pack()
-        tk.Label(win, text="Base de sortie :").pack(pady=5)
-        to_base = ttk.Combobox(win, values=["Binary", "Octal", "Decimal", "Hexadecimal"])
+        tk.Label(win, text="Base de sortie (ou 2 à 36) :").pack(pady=5)
+        to_base = ttk.Combobox(win, values=list(BASES))
         to_base.current(0)
         to_base.pack()
         result_label = tk.Label(win, text="", font=("Arial", 12))
         result_label.pack(pady=10)
         def convert():
             try:
-                value = val_entry.get().strip()
-                if not value:
-                    raise ValueError("Entrée vide")
-                base_dict = {"Binary": 2, "Octal": 8, "Decimal": 10, "Hexadecimal": 16}
-                f_base = base_dict[from_base.get()]
-                t_base = base_dict[to_base.get()]
-                dec_val = int(value, f_base)
-                if t_base == 2:
-                    out = bin(dec_val)
-                elif t_base == 8:
-                    out = oct(dec_val)
-                elif t_base == 10:
-                    out = str(dec_val)
-                elif t_base == 16:
-                    out = hex(dec_val)
-                else:
-                    out = str(dec_val)
+                out = convert_base(val_entry.get(), from_base.get(), to_base.get())
+                if len(out) > 60:
+                    win.clipboard_clear()
+                    win.clipboard_append(out)
+                    out = f"{out[:20]}…{out[-20:]} ({len(out)} caractères, copié)"
                 result_label.config(text=f"Résultat : {out}")
             except Exception as e:
                 result_label.config(text=f"Erreur : {e}")
-        tk.Button(win, text="Convertir", command=convert).pack(pady=10)
 
-    def convert_temperature(self, value, from_unit, to_unit):
-        if from_unit == to_unit:
-            return value
-        if from_unit == "Celsius":
-            temp_c = value
-        elif from_unit == "Fahrenheit":
-            temp_c = (value - 32) * 5/9
-        elif from_unit == "Kelvin":
-            temp_c = value - 273.15
-        else:
-            raise ValueError("Unité inconnue")
-        if to_unit == "Celsius":
-            return temp_c
-        elif to_unit == "Fahrenheit":
-            return temp_c * 9/5 + 32
-        elif to_unit == "Kelvin":
-            return temp_c + 273.15
+        def convert_file():
+            source = filedialog.askopenfilename(parent=win, title="Valeurs à convertir (une par ligne)")
+            if not source:
+                return
+            target = filedialog.asksaveasfilename(parent=win, title="Enregistrer le résultat")
+            if not target:
+                return
+            try:
+                f_base, t_base = resolve_base(from_base.get()), resolve_base(to_base.get())
+            except ValueError as e:
+                result_label.config(text=f"Erreur : {e}")
+                return
+
+            def work():
+                with open(source, encoding="utf-8") as src, open(target, "w", encoding="utf-8") as dst:
+                    return base_convert.convert_file(src, dst, f_base, t_base, prefix=True)
+            result_label.config(text="Conversion du fichier…")
+            self.jobs.submit("base-file", work,
+                             on_done=lambda errors: result_label.config(
+                                 text=f"Fichier converti ({errors} erreur(s))"),
+                             on_error=lambda e: result_label.config(text=f"Erreur : {e}"))
+
+        buttons = tk.Frame(win)
+        buttons.pack(pady=10)
+        tk.Button(buttons, text="Convertir", command=convert).pack(side="left", padx=5)
+        tk.Button(buttons, text="Convertir un fichier…", command=convert_file).pack(side="left", padx=5)
+
+    # -- solver -----------------------------------------------------------
+
+    def open_solver_window(self):
+        if self.raise_window("solver"):
+            return
+        win = self.new_window("solver", "Résolution", "520x440")
+        tk.Label(win, text="Fonction f(x) ou équation, ex. x^3 - 2*x - 5 ou cos(x) = x :").pack(pady=5)
+        func_entry = tk.Entry(win, width=40)
+        func_entry.pack(pady=5)
+        domain = tk.Frame(win)
+        domain.pack(pady=5)
+        entries = {}
+        for label, key, default, width in (("a :", "a", "-10", 8), ("b :", "b", "10", 8),
+                                           ("Itérations max :", "iterations", "100", 5),
+                                           ("Délai (s) :", "timeout", "5", 4)):
+            tk.Label(domain, text=label).pack(side="left")
+            entry = tk.Entry(domain, width=width)
+            entry.insert(0, default)
+            entry.pack(side="left", padx=(0, 8))
+            entries[key] = entry
+        mark = tk.BooleanVar(value=True)
+        tk.Checkbutton(win, text="Marquer sur le graphique", variable=mark).pack()
+        result_label = tk.Label(win, text="", font=("Consolas", 10), justify="left")
+        result_label.pack(pady=8)
+
+        # button: (solver function, history name, marker, color)
+        operations = {"Racines": ("find_roots", "racines", "o", "red"),
+                      "Extrema": ("find_extrema", "extrema", "^", "green"),
+                      "Minimum": ("minimize", "minimum", "v", "blue")}
+
+        def run(button):
+            function, name, marker, color = operations[button]
+            try:
+                text = func_entry.get().strip()
+                a = float(evaluate_expression(entries["a"].get()))
+                b = float(evaluate_expression(entries["b"].get()))
+                if not a < b:
+                    raise ValueError("a doit être inférieur à b")
+                iterations = int(entries["iterations"].get())
+                timeout = float(evaluate_expression(entries["timeout"].get()))
+            except Exception as e:
+                result_label.config(text=f"Erreur : {e}")
+                return
+            env = self.workspace.scope("numpy")
+            # The curve is sampled on the worker too, from the solver's f.
+            graph = self.graph_canvas() if mark.get() else None
+
+            def work():
+                solver = lazy_imports.load("solver")
+                problem = solver.Problem(text, env)
+                solution = getattr(solver, function)(problem, a, b, max_iterations=iterations,
+                                                     timeout=timeout)
+                prepared = graph.prepare(problem.text, a, b, env, problem.vector) if graph else None
+                return problem.text, solution, prepared
+
+            def done(payload):
+                plotted, solution, prepared = payload
+                points = solution.points
+                if name == "racines":
+                    shown = [f"x = {p.x:.12g}" for p in points]
+                else:
+                    shown = [f"{p.kind} en x = {p.x:.12g}, f = {p.fx:.12g}" for p in points]
+                lines = [f"{len(points)} {name} ({solution.method})" if name != "minimum"
+                         else f"minimum ({solution.method})"]
+                lines += shown[:12]
+                if len(shown) > 12:
+                    lines.append(f"… ({len(shown)} au total)")
+                if not solution.complete:
+                    lines.append("délai dépassé : résultats partiels")
+                self.add_to_history(f"{name}({text}) sur [{a:g}, {b:g}]",
+                                    "; ".join(shown[:10]) + (" …" if len(shown) > 10 else "") or "aucun")
+                if win.winfo_exists():
+                    result_label.config(text="\n".join(lines))
+                if graph is not None:
+                    # Reopened if it was closed meanwhile; the samples do not depend on it.
+                    canvas = self.graph_canvas()
+                    canvas.set_function(plotted, a, b, prepared, env)
+                    canvas.mark_points(name, [p.x for p in points], [p.fx for p in points], marker, color)
+
+            def failed(e):
+                if win.winfo_exists():
+                    result_label.config(text=f"Erreur : {e}")
+            result_label.config(text="Calcul…")
+            log.debug("solver %s %r on [%s, %s]", function, text, a, b)
+            self.jobs.submit("solver", work, on_done=done, on_error=failed)
+
+        buttons = tk.Frame(win)
+        buttons.pack(pady=5)
+        for button in operations:
+            tk.Button(buttons, text=button, command=partial(run, button)).pack(side="left", padx=5)
+        func_entry.bind('<Return>', lambda event: run("Racines"))
+
+    # -- statistics -------------------------------------------------------
+    # Files are streamed in chunks (data_stats), never loaded whole: one pass
+    # for the statistics, quantiles and regression, a second one for the
+    # histogram once the range is known.
+
+    def open_statistics_window(self):
+        if self.raise_window("statistics"):
+            return
+        win = self.new_window("statistics", "Statistiques", "560x520")
+        tk.Label(win, text="Valeurs (une par ligne, ou colonnes CSV) ou fichier :").pack(pady=5)
+        text = tk.Text(win, height=8, font=("Consolas", 11))
+        text.pack(fill="both", expand=True, padx=10)
+        source = {"path": None, "range": None}
+        file_label = tk.Label(win, text="", fg="#666666")
+        file_label.pack()
+        options = tk.Frame(win)
+        options.pack(pady=5)
+        tk.Label(options, text="Colonne :").pack(side="left")
+        column_entry = tk.Entry(options, width=10)
+        column_entry.insert(0, "0")
+        column_entry.pack(side="left", padx=(0, 8))
+        tk.Label(options, text="x (régression) :").pack(side="left")
+        x_entry = tk.Entry(options, width=10)
+        x_entry.pack(side="left", padx=(0, 8))
+        tk.Label(options, text="Classes :").pack(side="left")
+        bins_entry = tk.Entry(options, width=5)
+        bins_entry.insert(0, "30")
+        bins_entry.pack(side="left")
+        result_label = tk.Label(win, text="", font=("Consolas", 10), justify="left")
+        result_label.pack(pady=8)
+
+        def choose_file():
+            path = filedialog.askopenfilename(parent=win, title="Données",
+                                              filetypes=[("Données", "*.csv *.txt *.dat"),
+                                                         ("Tous les fichiers", "*.*")])
+            if path:
+                source["path"], source["range"] = path, None
+                file_label.config(text=os.path.basename(path))
+
+        def data():
+            # Read on the Tk thread; returns the name of the data and a
+            # function opening it, to be called on the worker thread.
+            column = column_entry.get().strip() or "0"
+            path = source["path"]
+            if path:
+                name = column if column != "0" else os.path.basename(path)
+                return name, column, lambda: open(path, encoding="utf-8")
+            pasted = text.get("1.0", "end")
+            if not pasted.strip():
+                raise ValueError("aucune donnée (collez des valeurs ou choisissez un fichier)")
+            return (column if column != "0" else "données"), column, lambda: io.StringIO(pasted)
+
+        def failed(e):
+            if win.winfo_exists():
+                result_label.config(text=f"Erreur : {e}")
+
+        def compute():
+            try:
+                name, column, opener = data()
+            except ValueError as e:
+                failed(e)
+                return
+            x_column = x_entry.get().strip()
+
+            def work():
+                data_stats = lazy_imports.load("data_stats")
+                with opener() as f:
+                    stats, sketch, reg = data_stats.summarize(
+                        data_stats.read_columns(f, [column, x_column] if x_column else [column]))
+                q1, median, q3, p99 = sketch.quantiles([0.25, 0.5, 0.75, 0.99])
+                lines = [f"n = {stats.count}" + (f" ({stats.skipped} ignorée(s))" if stats.skipped else ""),
+                         f"moyenne = {stats.mean:.10g}",
+                         f"écart-type = {stats.std:.10g}  variance = {stats.variance:.10g}",
+                         f"min = {stats.min:.10g}  max = {stats.max:.10g}",
+                         f"Q1 ≈ {q1:.6g}  médiane ≈ {median:.6g}  Q3 ≈ {q3:.6g}  P99 ≈ {p99:.6g}"]
+                entries = [(f"stats({name})", f"n = {stats.count}, moyenne = {stats.mean:.10g}, "
+                                              f"écart-type = {stats.std:.10g}"),
+                           (f"quantiles({name})", f"Q1 ≈ {q1:.6g}, médiane ≈ {median:.6g}, "
+                                                  f"Q3 ≈ {q3:.6g}, P99 ≈ {p99:.6g}")]
+                if reg is not None:
+                    fit = f"y = {reg.slope:.10g}·x + {reg.intercept:.10g}, r = {reg.r:.6g}"
+                    lines.append(fit)
+                    entries.append((f"régression({name} ~ {x_column})", fit))
+                return (stats.min, stats.max), lines, entries
+
+            def done(payload):
+                value_range, lines, entries = payload
+                source["range"] = (name, column, value_range)
+                for expression, result in entries:
+                    self.add_to_history(expression, result)
+                if win.winfo_exists():
+                    result_label.config(text="\n".join(lines))
+            result_label.config(text="Calcul…")
+            log.debug("statistics of %s", name)
+            self.jobs.submit("statistics", work, on_done=done, on_error=failed)
+
+        def show_histogram():
+            try:
+                name, column, opener = data()
+                bins = int(bins_entry.get())
+                if bins < 1:
+                    raise ValueError("nombre de classes invalide")
+            except ValueError as e:
+                failed(e)
+                return
+            known = source["range"]
+            known = known[2] if known and known[:2] == (name, column) and source["path"] else None
+
+            def work():
+                data_stats = lazy_imports.load("data_stats")
+                value_range = known
+                if value_range is None:
+                    with opener() as f:
+                        stats = data_stats.summarize(data_stats.read_columns(f, [column]))[0]
+                    value_range = stats.min, stats.max
+                with opener() as f:
+                    return data_stats.histogram(data_stats.read_columns(f, [column]), *value_range, bins)
+
+            def done(payload):
+                counts, edges = payload
+                self.graph_canvas().show_histogram(f"Histogramme de {name} ({counts.sum()} valeurs)",
+                                                   counts, edges)
+            self.jobs.submit("statistics", work, on_done=done, on_error=failed)
+
+        buttons = tk.Frame(win)
+        buttons.pack(pady=8)
+        tk.Button(buttons, text="Fichier…", command=choose_file).pack(side="left", padx=5)
+        tk.Button(buttons, text="Calculer", command=compute).pack(side="left", padx=5)
+        tk.Button(buttons, text="Histogramme", command=show_histogram).pack(side="left", padx=5)
+
+    # -- matrices ---------------------------------------------------------
+    # A and B are NumPy arrays; matrices loaded from .npy/CSV files stay
+    # memory-mapped. Operations run on a worker thread (NumPy releases the GIL).
+
+    def open_matrix_editor(self, name):
+        if self.raise_window(f"matrix:{name}"):
+            return
+        win = self.new_window(f"matrix:{name}", f"Matrice {name}", "480x360")
+        tk.Label(win, text="Lignes séparées par « ; » ou un retour à la ligne, ex. 1 2; 3 4 :").pack(pady=5)
+        text = tk.Text(win, height=10, font=("Consolas", 11))
+        text.pack(fill="both", expand=True, padx=10)
+        status = tk.Label(win, text="", font=("Arial", 10))
+        status.pack(pady=4)
+        current = self.matrices[name]
+        if current is not None:
+            if current.size <= 400 and not isinstance(current, lazy_imports.load("numpy").memmap):
+                text.insert("1.0", "\n".join(" ".join(f"{v:g}" for v in row) for row in current))
+            else:
+                status.config(text=f"{name} : {current.shape[0]}×{current.shape[1]}")
+
+        def set_matrix(matrix, source=""):
+            self.matrices[name] = matrix
+            self.show_message(f"{name} : {matrix.shape[0]}×{matrix.shape[1]}{source}")
+
+        def validate():
+            try:
+                set_matrix(lazy_imports.load("matrix_ops").parse_matrix(text.get("1.0", "end")))
+            except Exception as e:
+                status.config(text=f"Erreur : {e}")
+                return
+            win.destroy()
+
+        def load():
+            path = filedialog.askopenfilename(parent=win, title=f"Charger la matrice {name}",
+                                              filetypes=[("Matrices", "*.npy *.csv *.txt"),
+                                                         ("Tous les fichiers", "*.*")])
+            if not path:
+                return
+            status.config(text="Chargement…")
+
+            def done(matrix):
+                set_matrix(matrix, " (fichier mappé en mémoire)")
+                if win.winfo_exists():
+                    win.destroy()
+
+            def failed(e):
+                if win.winfo_exists():
+                    status.config(text=f"Erreur : {e}")
+            self.jobs.submit("matrix-load", lambda: lazy_imports.load("matrix_ops").load_matrix(path),
+                             on_done=done, on_error=failed)
+
+        buttons = tk.Frame(win)
+        buttons.pack(pady=8)
+        tk.Button(buttons, text="Valider", command=validate).pack(side="left", padx=5)
+        tk.Button(buttons, text="Charger .npy/CSV…", command=load).pack(side="left", padx=5)
+
+    def matrix_operation(self, operation):
+        a, b = self.matrices["A"], self.matrices["B"]
+
+        def work():
+            return lazy_imports.load("matrix_ops").run(operation, a, b)
+
+        def done(payload):
+            label, value = payload
+            matrix_ops = lazy_imports.load("matrix_ops")
+            summary = matrix_ops.summary(value)
+            self.add_to_history(label, summary)
+            if isinstance(value, float):
+                text = f"{round_result(value)}"
+                self.remember(value, text, True)
+                self.show_message(f"{label} = {text}")
+                self.should_clear_on_next_input = True
+            else:
+                self.show_message(f"{label} : {summary}")
+                self.show_matrix_result(label, value)
+        log.debug("matrix %s", operation)
+        self.jobs.submit("matrix", work, on_done=done, on_error=self.show_error)
+
+    def show_matrix_result(self, label, value):
+        matrix_ops = lazy_imports.load("matrix_ops")
+        # A new result replaces the content of the result window.
+        win = self.raise_window("matrix-result")
+        if win is None:
+            win = self.new_window("matrix-result", label, "700x420")
         else:
-            raise ValueError("Unité inconnue")
+            win.title(label)
+            for child in win.winfo_children():
+                child.destroy()
+        text = tk.Text(win, wrap="none", font=("Consolas", 10))
+        text.insert("1.0", matrix_ops.format_value(value))
+        text.configure(state="disabled")
+        text.pack(fill="both", expand=True)
+        if isinstance(value, dict):
+            return
+        np = lazy_imports.load("numpy")
+        matrix = value.reshape(-1, 1) if value.ndim == 1 else value
+
+        def use_as(name):
+            self.matrices[name] = matrix
+            self.show_message(f"{name} ← {label}")
+
+        def save():
+            path = filedialog.asksaveasfilename(parent=win, title="Enregistrer la matrice",
+                                                defaultextension=".npy", filetypes=[("NumPy", "*.npy")])
+            if path:
+                try:
+                    np.save(path, matrix)
+                except OSError as e:
+                    messagebox.showerror("Erreur", str(e), parent=win)
+
+        buttons = tk.Frame(win)
+        buttons.pack(pady=6)
+        for name in MATRIX_OPERANDS:
+            tk.Button(buttons, text=f"→ {name}", command=partial(use_as, name)).pack(side="left", padx=5)
+        tk.Button(buttons, text="Enregistrer .npy…", command=save).pack(side="left", padx=5)
 
     def add_to_history(self, expression, result):
-        self.history.config(state='normal')
-        self.history.insert('end', f"{expression} = {result}\n")
-        self.history.config(state='disabled')
-        self.history.see('end')
+        self.history_store.append(expression, result)
+        self.history.refresh()
+
+    def on_close(self):
+        self.jobs.shutdown()
+        self.history_store.close()
+        self.master.destroy()
+
+    def set_busy(self, busy):
+        self.busy_label.configure(text="\u23F3" if busy else "")
+        self.master.configure(cursor="watch" if busy else "")
+
+    def scope(self, backend=None):
+        # Names the evaluator can see: ans plus the user's variables and functions.
+        if backend is None:
+            backend = "mpmath" if self.precision else "math"
+        return self.workspace.scope(backend, self.answer_env())
+
+    def define(self, text):
+        try:
+            definition = parse_definition(text)
+            if definition is None:
+                raise ValueError("attendu : nom = expression ou f(x, a, ...) = expression")
+        except ValueError as e:
+            self.show_error(e)
+            return
+        if definition.kind == "function":
+            self.workspace.define_function(definition.name, definition.params, definition.body)
+            shown = f"{definition.name}({', '.join(definition.params)}) = {definition.body}"
+            self.editor.clear()
+            self.show_message(shown)
+            self.add_to_history(shown, "définie")
+            return
+
+        def done(payload):
+            result, text, exact = payload
+            self.workspace.set_variable(definition.name, result)
+            self.editor.clear()
+            self.show_message(f"{definition.name} = {text}")
+            self.add_to_history(f"{definition.name} = {definition.body}", text)
+            self.should_clear_on_next_input = True
+        self.jobs.submit("evaluate", evaluate_for_display, definition.body, 0, self.scope("math"),
+                         in_process=True, on_done=done, on_error=self.show_error)
+
+    def answer_env(self):
+        if self.last_result is None or isinstance(self.last_result, str):
+            return None
+        return {"ans": self.last_result}
+
+    def remember(self, result, text, exact):
+        self.last_result = result
+        self.last_text = text
+        self.last_exact = exact
+        # Abbreviated integers cannot be typed back in; refer to them by name.
+        self.editor.set_text(text if exact else "ans")
+
+    def show_result(self, expression, payload):
+        result, text, exact = payload
+        self.remember(result, text, exact)
+        with instrumentation.timed("widget.result"):
+            self.show_message(text)
+            self.add_to_history(expression, text)
+        self.should_clear_on_next_input = True
+
+    def show_error(self, e):
+        self.editor.clear()
+        self.show_message(f"Error: {e}")
+        self.should_clear_on_next_input = False
+
+    def show_invalid(self, e):
+        self.editor.clear()
+        self.show_message("Invalid input")
+
+    # -- input line -------------------------------------------------------
+    # The ExpressionEditor holds the expression; the Entry mirrors it and is
+    # patched with each edit's Change instead of being rewritten. Results and
+    # errors are shown in the Entry as a message; the next edit restores the
+    # expression.
+
+    @property
+    def expression(self):
+        return self.editor.text
+
+    def show_message(self, text):
+        self.input_text.set(text)
+        self._message = True
+        self.update_preview()
+
+    def set_expression(self, text):
+        self.editor.set_text(text)
+        self._message = False
+        self.input_text.set(text)
+        self.input_field.icursor("end")
+        self.schedule_preview()
+
+    def apply_change(self, change):
+        if self._message:
+            self._message = False
+            self.input_text.set(self.editor.text)
+        elif change is not None:
+            self.input_field.delete(change.start, change.start + len(change.removed))
+            self.input_field.insert(change.start, change.inserted)
+        self.input_field.icursor(self.editor.cursor)
+        self.schedule_preview()
+
+    def _selection(self):
+        if self._message or not self.input_field.selection_present():
+            return None
+        return int(self.input_field.index("sel.first")), int(self.input_field.index("sel.last"))
+
+    def edit(self, action, *args):
+        # Applies an ExpressionEditor edit at the Entry's cursor (or selection).
+        selection = self._selection()
+        if selection is not None:
+            change = self.editor.replace(*selection, args[0] if args else "")
+        else:
+            if not self._message:
+                self.editor.set_cursor(int(self.input_field.index("insert")))
+            change = getattr(self.editor, action)(*args)
+        self.apply_change(change)
+
+    def insert_text(self, text):
+        self.edit("insert", text)
+
+    def undo(self):
+        self.apply_change(self.editor.undo())
+        return "break"
+
+    def redo(self):
+        self.apply_change(self.editor.redo())
+        return "break"
+
+    def on_entry_key(self, event):
+        # Keys typed in the Entry go through the editor too, so the two never drift apart.
+        if event.keysym in ("Return", "KP_Enter"):
+            self.on_click('=')
+        elif event.keysym == "BackSpace":
+            self.on_click('CE')
+        elif event.keysym == "Delete":
+            self.edit("delete_forward")
+        elif event.char and event.char.isprintable() and not event.state & 0x4:
+            if self.should_clear_on_next_input:
+                self.set_expression("")
+                self.should_clear_on_next_input = False
+            self.insert_text(event.char)
+        else:
+            return None
+        return "break"
+
+    def on_paste(self, event):
+        try:
+            text = self.master.clipboard_get()
+        except tk.TclError:
+            return "break"
+        self.insert_text(" ".join(text.split()))
+        return "break"
+
+    def on_cut(self, event):
+        selection = self._selection()
+        if selection is not None:
+            self.master.clipboard_clear()
+            self.master.clipboard_append(self.expression[selection[0]:selection[1]])
+            self.edit("delete_back")
+        return "break"
+
+    def schedule_preview(self, delay=120):
+        if self._preview_after is not None:
+            self.master.after_cancel(self._preview_after)
+        self._preview_after = self.master.after(delay, self.update_preview)
+
+    def update_preview(self):
+        self._preview_after = None
+        value = None
+        if not self._message and len(self.editor):
+            value = self.editor.preview(self.workspace.float_scope(self.answer_env()))
+        if value is None:
+            self.preview_label.configure(text="")
+        else:
+            self.preview_label.configure(text=f"= {round_result(value)}")
 
     def on_click(self, char):
         if self.should_clear_on_next_input and char not in ['=', 'ans', 'C', 'CE']:
-            self.expression = ""
-            self.input_text.set("")
+            self.set_expression("")
             self.should_clear_on_next_input = False
 
         if char == '=':
-            try:
-                expr = self.expression
-                
-                expr = expr.replace('sinh', '@S!N#H@')
-                expr = expr.replace('cosh', '@C!O#S#H@')
-                expr = expr.replace('tanh', '@T!A#N#H@')
-                expr = expr.replace('sin', '@S!I#N@')
-                expr = expr.replace('cos', '@C!O#S@')
-                expr = expr.replace('tan', '@T!A#N@')
-                expr = re.sub(r'\bexp\s*\(', '@E#X#P@(', expr)
-
-                
-                expr = expr.replace('@S!N#H@', 'math.sinh')
-                expr = expr.replace('@C!O#S#H@', 'math.cosh')
-                expr = expr.replace('@T!A#N#H@', 'math.tanh')
-                expr = expr.replace('@S!I#N@', 'math.sin')
-                expr = expr.replace('@C!O#S@', 'math.cos')
-                expr = expr.replace('@T!A#N@', 'math.tan')
-                expr = expr.replace('@E#X#P@', 'math.exp')
-
-                
-                expr = expr.replace('sqrt', 'math.sqrt')
-                expr = expr.replace('log', 'math.log10')
-                expr = expr.replace('ln', 'math.log')
-                expr = expr.replace('floor', 'math.floor')
-                expr = expr.replace('abs', 'abs')
-                expr = expr.replace('pi', str(math.pi))
-                expr = re.sub(r'\be\b', str(math.e), expr)
-
-                print('EXPR TO EVAL:', expr)
-                result = eval(expr, {"math": math, "abs": abs})
-
-                def is_very_close(val, tol=1e-8):
-                        nearest = round(val)
-                        return abs(val - nearest) < tol
-
-                if isinstance(result, float) and is_very_close(result):
-                        result = int(round(result)) 
-                elif isinstance(result, float):
-                    # Optionally, also round all floats to a certain precision for display
-                    result = round(result, 8)      
-                     
-                def is_close(val, target, tol=1e-8):
-                    return abs(val - target) < tol
-                if is_close(result, 0.0):
-                    result = 0.0
-                elif is_close(result, 1.0):
-                    result = 1.0
-                elif is_close(result, -1.0):
-                    result = -1.0
-
-                self.last_result = result  
-                self.input_text.set(str(result))
-                self.add_to_history(self.expression, result)
-                self.expression = str(result)
-                self.should_clear_on_next_input = True
-            except Exception as e:
-                self.input_text.set(f"Error: {e}")
-                self.expression = ""
-                self.should_clear_on_next_input = False
+            expression = self.expression
+            if "=" in expression:
+                # Typed definition such as "a = 2" or "f(x, a) = a*x".
+                self.define(expression)
+                return
+            log.debug("evaluate %r (precision %s)", expression, self.precision)
+            self.jobs.submit("evaluate", evaluate_for_display, expression, self.precision,
+                             self.scope(), in_process=True,
+                             on_done=partial(self.show_result, expression),
+                             on_error=self.show_error)
 
         elif char == 'C':
-            self.expression = ""
-            self.input_text.set("")
+            self.jobs.cancel("evaluate")
+            self.set_expression("")
             self.should_clear_on_next_input = False
 
         elif char == 'ans':
             if self.last_result is not None:
-                self.expression += str(self.last_result)
-                self.input_text.set(self.expression)
+                self.insert_text(self.last_text if self.last_exact else "ans")
 
         elif char == 'CE':
-            self.expression = self.expression[:-1]
-            self.input_text.set(self.expression)
+            self.edit("delete_back")
 
         elif char == 'exp':
-            self.expression += 'exp'
-            self.input_text.set(self.expression)
+            self.insert_text('exp')
 
         elif char == '∂f(x)':
             func_str = simpledialog.askstring("Input", "Enter a function f(x):")
             x_val = simpledialog.askfloat("Input", "Enter a value for x:")
-            try:
-                x = sp.symbols('x')
-                f = sp.sympify(func_str)
-                df = sp.diff(f, x)
-                result = df.subs(x, x_val)
-                self.input_text.set(f"f'({x_val}) = {result}")
-                self.expression = ""
+
+            def derivative():
+                symbolic = lazy_imports.load("symbolic")
+                return round_result(symbolic.derivative_at(func_str, x_val))
+
+            def done(result):
+                self.editor.clear()
+                self.show_message(f"f'({x_val}) = {result}")
                 self.add_to_history(f"f'({x_val})", result)
-            except Exception:
-                self.input_text.set("Invalid input")
-                self.expression = ""
+            self.jobs.submit("symbolic", derivative, on_done=done, on_error=self.show_invalid)
 
         elif char == '∫f(x)':
             func_str = simpledialog.askstring("Input", "Enter a function f(x):")
             a = simpledialog.askfloat("Lower Bound", "Enter the lower bound:")
             b = simpledialog.askfloat("Upper Bound", "Enter the upper bound:")
-            try:
-                x = sp.symbols('x')
-                f = sp.sympify(func_str)
-                integral = sp.integrate(f, (x, a, b))
-                self.input_text.set(f"∫[{a},{b}] = {integral}")
-                self.expression = ""
-                self.add_to_history(f"∫[{a},{b}] f(x)", integral)
-            except Exception:
-                self.input_text.set("Invalid input")
-                self.expression = ""
+
+            def integrate():
+                integration = lazy_imports.load("integration")
+                return integration.definite_integral(func_str, a, b)
+
+            def done(integral):
+                if integral.method == lazy_imports.load("integration").SYMBOLIC:
+                    shown = f"{integral.value}"
+                else:
+                    shown = f"{integral.value} (± {integral.error:.1e}, {integral.method})"
+                self.editor.clear()
+                self.show_message(f"∫[{a},{b}] = {shown}")
+                self.add_to_history(f"∫[{a},{b}] f(x)", shown)
+            self.jobs.submit("symbolic", integrate, on_done=done, on_error=self.show_invalid)
+
+        elif char == 'solve':
+            self.open_solver_window()
 
         elif char == 'fact':
-            try:
-                val = int(eval(self.expression, {"math": math}))
-                result = math.factorial(val)
-                self.input_text.set(str(result))
-                self.expression = str(result)
-                self.add_to_history(f"{val}!", result)
-            except Exception:
-                self.input_text.set("Error")
-                self.expression = ""
+            def done(payload):
+                val, result, text, exact = payload
+                self.remember(result, text, exact)
+                self.show_message(text)
+                self.add_to_history(f"{val}!", text)
+
+            def failed(e):
+                self.editor.clear()
+                self.show_message("Error")
+            self.jobs.submit("evaluate", factorial_of, self.expression, self.scope("math"),
+                             in_process=True, on_done=done, on_error=failed)
+
+        elif char == 'def':
+            text = simpledialog.askstring(
+                "Définition", "Variable ou fonction, ex. a = 2.5 ou f(x, a, b) = a*sin(b*x) :")
+            if text:
+                self.define(text)
+
+        elif char == 'var':
+            names = ", ".join(self.workspace.variables) or "aucune"
+            functions = ", ".join(f"{fn.name}({', '.join(fn.params)})"
+                                  for fn in self.workspace.functions.values()) or "aucune"
+            text = simpledialog.askstring(
+                "Insérer", f"Variables : {names}\nFonctions : {functions}\n\nNom ou appel à insérer :")
+            if text:
+                self.insert_text(text.strip())
+
+        elif char == 'vars':
+            lines = self.workspace.listing()
+            messagebox.showinfo("Variables et fonctions",
+                                "\n".join(lines) if lines else "Aucune définition (bouton def).")
+
+        elif char == 'prec':
+            digits = simpledialog.askinteger(
+                "Précision", "Nombre de chiffres significatifs (0 = double précision) :",
+                initialvalue=self.precision, minvalue=0, maxvalue=100000)
+            if digits is not None:
+                self.precision = digits
+                self.editor.clear()
+                self.show_message(f"Précision : {digits} chiffres" if digits else "Précision : double")
+
+        elif char in MATRIX_OPERANDS:
+            self.open_matrix_editor(char)
+
+        elif char in MATRIX_OPERATIONS:
+            self.matrix_operation(char)
 
         else:
-            self.expression += str(char)
-            self.input_text.set(self.expression)
+            self.insert_text(str(char))
 
 
-if __name__ == "__main__":
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Scientific Calculator")
+    parser.add_argument("--startup-report", action="store_true",
+                        help="print startup and lazy import timings to stderr")
+    parser.add_argument("--no-prewarm", action="store_true",
+                        help="do not import sympy/numpy/matplotlib in the background")
+    parser.add_argument("--history", default=DEFAULT_HISTORY_PATH,
+                        help="history database file (':memory:' to disable persistence)")
+    parser.add_argument("--history-cap", type=int, default=DEFAULT_HISTORY_CAP,
+                        help="maximum number of history entries kept")
+    parser.add_argument("--instrument", action="store_true",
+                        help="collect timings from startup (see the Profilage panel)")
+    parser.add_argument("--debug", action="store_true", help="log debug messages to stderr")
+    args = parser.parse_args(argv)
+    if args.debug:
+        logging.basicConfig(level=logging.DEBUG, format="%(asctime)s %(threadName)s %(message)s")
+    if args.instrument:
+        instrumentation.enable()
+
+    lazy_imports.mark("modules imported")
     root = tk.Tk()
-    app = ScientificCalculator(root)
+    app = ScientificCalculator(root, args.history, args.history_cap, args.instrument)
+    lazy_imports.mark("window built")
+
+    def on_idle():
+        lazy_imports.mark("keypad interactive")
+        if args.startup_report:
+            print(lazy_imports.report(), file=sys.stderr)
+        if not args.no_prewarm:
+            app.jobs.start_processes()
+            on_done = None
+            if args.startup_report:
+                on_done = lambda: print(lazy_imports.report(), file=sys.stderr)
+            lazy_imports.prewarm(["numpy", "sympy", "symbolic", "matplotlib"], on_done)
+    root.after_idle(on_idle)
     root.mainloop()
 
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
+
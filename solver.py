@@ -0,0 +1,291 @@
+import math
+import time
+from collections import namedtuple
+
+import numpy as np
+
+import instrumentation
+import lazy_imports
+from plot_sampler import make_vector_function
+
+# Roots, extrema and minimum of f(x) on an interval [a, b]. f is compiled
+# once for NumPy, sampled on a uniform grid in a single vectorized call, and
+# every sign change of the samples is a bracket refined with Brent's method;
+# when sympy can differentiate the expression (and the derivative agrees with
+# f numerically), Newton steps are tried first inside the bracket. Extrema
+# are the roots of f' when it is known, otherwise Brent minimizations around
+# the local minima/maxima of the samples. Every refinement has an iteration
+# limit and the whole search a time limit; results found before the deadline
+# are returned with complete=False.
+
+Root = namedtuple("Root", ["x", "fx", "iterations"])
+Extremum = namedtuple("Extremum", ["x", "fx", "kind", "iterations"])
+Solution = namedtuple("Solution", ["points", "complete", "method"])
+
+MINIMUM = "minimum"
+MAXIMUM = "maximum"
+GOLDEN = 0.5 * (3 - math.sqrt(5))
+
+
+class Problem:
+    # f as a vector function and as scalar functions, and f' when available.
+
+    def __init__(self, text, env=None, use_derivative=True):
+        lhs, sep, rhs = text.partition("=")
+        # An equation g(x) = h(x) is solved as g(x) - (h(x)) = 0.
+        self.text = f"{lhs.strip()} - ({rhs.strip()})" if sep else text.strip()
+        self.vector = make_vector_function(self.text, env=env)
+        self.derivative = self._derivative() if use_derivative else None
+
+    def f(self, x):
+        return float(self.vector(np.float64(x)))
+
+    def _derivative(self):
+        try:
+            symbolic = lazy_imports.load("symbolic")
+            symbolic.derivative_values(self.text, np.zeros(1))
+        except Exception:
+            return None
+
+        def df(x):
+            return float(symbolic.derivative_values(self.text, np.float64(x)))
+        # The engine and sympy read some names differently (log, ^): keep the
+        # derivative only if it matches finite differences of f.
+        for x in (0.3137, -1.7412, 2.9183):
+            h = 1e-6 * max(1.0, abs(x))
+            fd = (self.f(x + h) - self.f(x - h)) / (2 * h)
+            d = df(x)
+            if not (math.isfinite(fd) and math.isfinite(d)):
+                continue
+            if abs(d - fd) > 1e-4 * (abs(fd) + 1):
+                return None
+        return df
+
+    def derivative_values(self, x):
+        return lazy_imports.load("symbolic").derivative_values(self.text, x)
+
+    @property
+    def method(self):
+        return "Brent/Newton" if self.derivative is not None else "Brent"
+
+
+def _expired(deadline):
+    return deadline is not None and time.perf_counter() > deadline
+
+
+def find_root(f, a, b, fa=None, fb=None, df=None, xtol=1e-14, max_iterations=100):
+    # Brent's method (zeroin) on a bracket where f changes sign. With df, a
+    # Newton step from the best point is used whenever it stays inside the
+    # bracket and shrinks it at least as fast as bisection would.
+    fa = f(a) if fa is None else fa
+    fb = f(b) if fb is None else fb
+    if fa == 0:
+        return Root(a, 0.0, 0)
+    if fb == 0:
+        return Root(b, 0.0, 0)
+    if (fa > 0) == (fb > 0):
+        raise ValueError("f ne change pas de signe sur l'intervalle")
+    c, fc = a, fa
+    d = e = b - a
+    for iteration in range(1, max_iterations + 1):
+        if (fb > 0) == (fc > 0):
+            c, fc = a, fa
+            d = e = b - a
+        if abs(fc) < abs(fb):
+            a, b, c = b, c, b
+            fa, fb, fc = fb, fc, fb
+        tol = 2 * np.finfo(float).eps * abs(b) + 0.5 * xtol
+        m = 0.5 * (c - b)
+        if abs(m) <= tol or fb == 0:
+            return Root(b, fb, iteration)
+        step = None
+        if df is not None:
+            slope = df(b)
+            if slope and math.isfinite(slope):
+                newton = -fb / slope
+                if 0 < newton / m < 1 and abs(newton) < 0.5 * abs(e):
+                    step = newton
+        if step is None and abs(e) >= tol and abs(fa) > abs(fb):
+            # Inverse quadratic interpolation, or secant with two points.
+            s = fb / fa
+            if a == c:
+                p, q = 2 * m * s, 1 - s
+            else:
+                q, r = fa / fc, fb / fc
+                p = s * (2 * m * q * (q - r) - (b - a) * (r - 1))
+                q = (q - 1) * (r - 1) * (s - 1)
+            if p > 0:
+                q = -q
+            p = abs(p)
+            if 2 * p < min(3 * m * q - abs(tol * q), abs(e * q)):
+                step = p / q
+        if step is None:
+            d = e = m
+        else:
+            e, d = d, step
+        a, fa = b, fb
+        b += d if abs(d) > tol else math.copysign(tol, m)
+        fb = f(b)
+    return Root(b, fb, max_iterations)
+
+
+def find_minimum(f, a, b, xtol=1e-10, max_iterations=100):
+    # Brent's minimization: golden-section steps accelerated by parabolic
+    # interpolation. Returns (x, f(x), iterations).
+    x = w = v = a + GOLDEN * (b - a)
+    fx = fw = fv = f(x)
+    d = e = 0.0
+    for iteration in range(1, max_iterations + 1):
+        mid = 0.5 * (a + b)
+        tol = xtol * abs(x) + 1e-12
+        if abs(x - mid) <= 2 * tol - 0.5 * (b - a):
+            return x, fx, iteration
+        parabolic = False
+        if abs(e) > tol:
+            r = (x - w) * (fx - fv)
+            q = (x - v) * (fx - fw)
+            p = (x - v) * q - (x - w) * r
+            q = 2 * (q - r)
+            if q > 0:
+                p = -p
+            q = abs(q)
+            if abs(p) < abs(0.5 * q * e) and q * (a - x) < p < q * (b - x):
+                e, d = d, p / q
+                parabolic = True
+                if (x + d) - a < 2 * tol or b - (x + d) < 2 * tol:
+                    d = math.copysign(tol, mid - x)
+        if not parabolic:
+            e = (b if x < mid else a) - x
+            d = GOLDEN * e
+        u = x + (d if abs(d) >= tol else math.copysign(tol, d))
+        fu = f(u)
+        if fu <= fx:
+            if u < x:
+                b = x
+            else:
+                a = x
+            v, fv, w, fw, x, fx = w, fw, x, fx, u, fu
+        else:
+            if u < x:
+                a = u
+            else:
+                b = u
+            if fu <= fw or w == x:
+                v, fv, w, fw = w, fw, u, fu
+            elif fu <= fv or v == x or v == w:
+                v, fv = u, fu
+    return x, fx, max_iterations
+
+
+def _grid(problem, a, b, points):
+    if not a < b:
+        raise ValueError("a doit être inférieur à b")
+    x = np.linspace(a, b, points)
+    return x, problem.vector(x)
+
+
+def _dedupe(points, xtol):
+    out = []
+    for point in sorted(points, key=lambda p: p.x):
+        if out and point.x - out[-1].x <= xtol:
+            continue
+        out.append(point)
+    return out
+
+
+def find_roots(problem, a, b, points=20001, max_iterations=100, timeout=5.0):
+    with instrumentation.timed("solver.roots"):
+        deadline = time.perf_counter() + timeout if timeout else None
+        x, y = _grid(problem, a, b, points)
+        roots = [Root(float(x[i]), 0.0, 0) for i in np.flatnonzero(y == 0)]
+        s = np.sign(y)
+        # A pole on a grid point samples as inf, and its neighbours bracket
+        # it with opposite signs: only brackets with finite ends are refined.
+        finite = np.isfinite(y)
+        brackets = np.flatnonzero((s[:-1] * s[1:] < 0) & finite[:-1] & finite[1:])
+        # Roots where f touches zero without changing sign (x**2) show up as
+        # local minima of |f| between samples.
+        m = np.abs(y)
+        touches = 1 + np.flatnonzero((m[1:-1] < m[:-2]) & (m[1:-1] <= m[2:]) & (y[1:-1] != 0)
+                                     & (s[:-2] == s[2:]))
+        scale = float(np.median(m[np.isfinite(m)])) if np.isfinite(m).any() else 1.0
+        complete = True
+        for i in brackets:
+            if _expired(deadline):
+                complete = False
+                break
+            root = find_root(problem.f, float(x[i]), float(x[i + 1]), float(y[i]), float(y[i + 1]),
+                             problem.derivative, max_iterations=max_iterations)
+            # A sign change across a pole or a jump converges to where |f| is
+            # large: not a root.
+            if abs(root.fx) <= 1e-6 * max(abs(y[i]), abs(y[i + 1])):
+                roots.append(root)
+        for i in touches if complete else ():
+            if _expired(deadline):
+                complete = False
+                break
+            xm, fm, iterations = find_minimum(lambda t: abs(problem.f(t)), float(x[i - 1]),
+                                              float(x[i + 1]), max_iterations=max_iterations)
+            if fm <= 1e-9 * max(scale, 1.0):
+                roots.append(Root(xm, problem.f(xm), iterations))
+        return Solution(_dedupe(roots, 1e-9 * (b - a)), complete, problem.method)
+
+
+def find_extrema(problem, a, b, points=20001, max_iterations=100, timeout=5.0):
+    with instrumentation.timed("solver.extrema"):
+        deadline = time.perf_counter() + timeout if timeout else None
+        x, y = _grid(problem, a, b, points)
+        extrema = []
+        complete = True
+        if problem.derivative is not None:
+            dy = problem.derivative_values(x)
+            s = np.sign(dy)
+            # As in find_roots: f' == 0 on a grid point is an extremum when f'
+            # changes sign around it, and only brackets where f and f' are
+            # finite at both ends are refined.
+            finite = np.isfinite(y) & np.isfinite(dy)
+            on_grid = 1 + np.flatnonzero((dy[1:-1] == 0) & (s[:-2] * s[2:] < 0) & finite[1:-1])
+            for i in on_grid:
+                kind = MINIMUM if dy[i - 1] < 0 else MAXIMUM
+                extrema.append(Extremum(float(x[i]), float(y[i]), kind, 0))
+            brackets = np.flatnonzero((s[:-1] * s[1:] < 0) & finite[:-1] & finite[1:])
+            for i in brackets:
+                if _expired(deadline):
+                    complete = False
+                    break
+                root = find_root(problem.derivative, float(x[i]), float(x[i + 1]), float(dy[i]),
+                                 float(dy[i + 1]), max_iterations=max_iterations)
+                # A sign change of f' across a pole converges onto the pole.
+                if abs(root.fx) > 1e-6 * max(abs(dy[i]), abs(dy[i + 1])):
+                    continue
+                kind = MINIMUM if dy[i] < 0 else MAXIMUM
+                fx = problem.f(root.x)
+                if math.isfinite(fx):
+                    extrema.append(Extremum(root.x, fx, kind, root.iterations))
+        else:
+            interior = y[1:-1]
+            minima = 1 + np.flatnonzero((interior < y[:-2]) & (interior <= y[2:]))
+            maxima = 1 + np.flatnonzero((interior > y[:-2]) & (interior >= y[2:]))
+            for kind, indexes, sign in ((MINIMUM, minima, 1), (MAXIMUM, maxima, -1)):
+                for i in indexes:
+                    if _expired(deadline):
+                        complete = False
+                        break
+                    xm, fm, iterations = find_minimum(lambda t: sign * problem.f(t), float(x[i - 1]),
+                                                      float(x[i + 1]), max_iterations=max_iterations)
+                    extrema.append(Extremum(xm, sign * fm, kind, iterations))
+        return Solution(_dedupe(extrema, 1e-9 * (b - a)), complete, problem.method)
+
+
+def minimize(problem, a, b, points=20001, max_iterations=100, timeout=5.0):
+    # Global minimum on [a, b]: the lowest local minimum or an end point.
+    extrema = find_extrema(problem, a, b, points, max_iterations, timeout)
+    candidates = [e for e in extrema.points if e.kind == MINIMUM]
+    for end in (a, b):
+        fx = problem.f(end)
+        if math.isfinite(fx):
+            candidates.append(Extremum(end, fx, MINIMUM, 0))
+    if not candidates:
+        raise ValueError("f n'est définie nulle part sur l'intervalle")
+    best = min(candidates, key=lambda e: e.fx)
+    return Solution([best], extrema.complete, extrema.method)
@@ -0,0 +1,81 @@
+import itertools
+from collections import ChainMap
+
+import numpy as np
+
+from calculator_core import evaluate_expression
+from expression_engine import compile_expression
+from plot_sampler import as_real, check_names
+
+# Parameter sweeps. An expression of several variables is evaluated over the
+# Cartesian grid of their values in a single vectorized call: each axis is
+# passed as a sparse NumPy array shaped to broadcast against the others
+# (np.meshgrid(..., sparse=True)), so the grid is never materialized per
+# variable and user functions f(x, a, b) broadcast like the built-ins.
+
+MAX_POINTS = 4_000_000
+
+
+class Axis:
+    __slots__ = ("name", "values")
+
+    def __init__(self, name, values):
+        self.name = name
+        self.values = np.asarray(values, dtype=float).ravel()
+
+    def __len__(self):
+        return self.values.size
+
+    def __repr__(self):
+        return f"Axis({self.name!r}, {len(self)} valeurs)"
+
+
+def parse_axis(spec, default_count=5):
+    # "a=0:2:5" (start:stop:count), "a=0:2" (default_count values),
+    # "a=1;2;5" (list) or "a=3" (single value); bounds may be expressions.
+    name, sep, values = spec.partition("=")
+    name = name.strip()
+    if not sep or not name.isidentifier():
+        raise ValueError(f"paramètre invalide : {spec.strip()!r} (ex. a=0:2:5)")
+    if ":" in values:
+        parts = values.split(":")
+        if len(parts) not in (2, 3):
+            raise ValueError(f"intervalle invalide pour {name} (début:fin:nombre)")
+        start, stop = evaluate_expression(parts[0]), evaluate_expression(parts[1])
+        count = int(evaluate_expression(parts[2])) if len(parts) == 3 else default_count
+        if count < 1:
+            raise ValueError(f"nombre de valeurs invalide pour {name}")
+        return Axis(name, np.linspace(start, stop, count))
+    return Axis(name, [evaluate_expression(v) for v in values.split(";")])
+
+
+def parse_axes(text, default_count=5):
+    axes = [parse_axis(spec, default_count) for spec in text.split(",") if spec.strip()]
+    names = [axis.name for axis in axes]
+    if len(set(names)) != len(names):
+        raise ValueError("paramètre en double")
+    return axes
+
+
+def evaluate_grid(text, axes, env=None):
+    # Returns an array of shape (len(axes[0]), len(axes[1]), ...).
+    shape = tuple(len(axis) for axis in axes)
+    if int(np.prod(shape)) > MAX_POINTS:
+        raise ValueError(f"grille trop grande ({' × '.join(map(str, shape))} points)")
+    compiled = compile_expression(text, backend="numpy")
+    names = [axis.name for axis in axes]
+    check_names(compiled, set(names), env)
+    grids = np.meshgrid(*[axis.values for axis in axes], indexing="ij", sparse=True)
+    scope = ChainMap(dict(zip(names, grids)), env if env is not None else {})
+    with np.errstate(all="ignore"):
+        return as_real(compiled(scope), shape)
+
+
+def curve_family(text, x, params, variable="x", env=None):
+    # One curve per combination of parameter values: returns the labels and
+    # an array of shape (number of curves, len(x)).
+    z = evaluate_grid(text, [Axis(variable, x)] + list(params), env)
+    ys = z.reshape(z.shape[0], -1).T
+    labels = [", ".join(f"{axis.name}={value:g}" for axis, value in zip(params, combo))
+              for combo in itertools.product(*[axis.values for axis in params])]
+    return labels, ys
@@ -0,0 +1,108 @@
+from functools import lru_cache
+
+import mpmath
+import numpy as np
+import sympy as sp
+
+import instrumentation
+
+# Memoized symbolic operations for the ∂f(x) / ∫f(x) buttons. Parsing,
+# differentiation and integration results are cached per function text
+# (bounded LRU), and lambdify-compiled versions are cached as well so
+# evaluating f'(x) at another point, or over a whole array, does not touch
+# sympy again.
+
+x = sp.symbols('x')
+x_real = sp.Symbol('x', real=True)
+
+
+@lru_cache(maxsize=128)
+def parse_function(text):
+    with instrumentation.timed("symbolic.parse"):
+        return sp.sympify(text)
+
+
+@lru_cache(maxsize=128)
+def derivative(text):
+    with instrumentation.timed("symbolic.derivative"):
+        return sp.diff(parse_function(text), x)
+
+
+@lru_cache(maxsize=128)
+def antiderivative(text):
+    with instrumentation.timed("symbolic.antiderivative"):
+        return sp.integrate(parse_function(text), x)
+
+
+@lru_cache(maxsize=256)
+def definite_integral(text, a, b):
+    with instrumentation.timed("symbolic.integrate"):
+        return sp.integrate(parse_function(text), (x, a, b))
+
+
+@lru_cache(maxsize=128)
+def _lambdified(kind, text, modules):
+    expr = derivative(text) if kind == "derivative" else parse_function(text)
+    with instrumentation.timed("symbolic.lambdify"):
+        return sp.lambdify(x, expr, modules)
+
+
+@lru_cache(maxsize=128)
+def _real_expression(kind, text):
+    # With x declared real, sympy differentiates Abs, re, sign... to values
+    # instead of leaving Derivative(re(x), x) unevaluated.
+    expr = parse_function(text).subs(x, x_real)
+    return sp.diff(expr, x_real) if kind == "derivative" else expr
+
+
+def _value_at(kind, text, x_val):
+    try:
+        return _lambdified(kind, text, "math")(x_val)
+    except Exception:
+        pass
+    # Functions the math module lacks (besselj, zeta, Abs) and complex values
+    # (sqrt(x) at -1) are left to sympy, as the buttons did before.
+    with instrumentation.timed("symbolic.evalf"):
+        value = _real_expression(kind, text).subs(x_real, x_val)
+        if not value.has(sp.Derivative):
+            value = value.evalf()
+            return float(value) if value.is_real else value
+        # No closed form for f' (zeta): numerical differentiation.
+        value = complex(mpmath.diff(_lambdified("function", text, "mpmath"), x_val))
+    return value.real if value.imag == 0 else value
+
+
+def function_at(text, x_val):
+    return _value_at("function", text, x_val)
+
+
+def derivative_at(text, x_val):
+    return _value_at("derivative", text, x_val)
+
+
+def function_values(text, xs):
+    xs = np.asarray(xs, dtype=float)
+    with np.errstate(all="ignore"):
+        return np.broadcast_to(_lambdified("function", text, "numpy")(xs), xs.shape).astype(float)
+
+
+def derivative_values(text, xs):
+    xs = np.asarray(xs, dtype=float)
+    with np.errstate(all="ignore"):
+        return np.broadcast_to(_lambdified("derivative", text, "numpy")(xs), xs.shape).astype(float)
+
+
+def cache_info():
+    return {
+        "parse": parse_function.cache_info(),
+        "derivative": derivative.cache_info(),
+        "antiderivative": antiderivative.cache_info(),
+        "definite_integral": definite_integral.cache_info(),
+        "lambdify": _lambdified.cache_info(),
+    }
+
+
+def clear_caches():
+    for fn in (parse_function, derivative, antiderivative, definite_integral, _lambdified,
+               _real_expression):
+        fn.cache_clear()
@@ -0,0 +1,78 @@
+import instrumentation
+
+# Colors of the main window by widget role. Every themed widget is registered
+# with its role when it is created (and configured for the current theme
+# then); the options of each role are precomputed for every theme, so
+# switching theme is one pass over the registry, one configure() per widget,
+# without walking the widget tree. Composite widgets (history, profiler
+# panel) register a callback that receives the palette.
+
+PALETTES = {
+    "dark": {"bg": "#1e1e2e", "fg": "#ffffff", "screen": "#2e2e3e", "sidebar": "#2e2e2e",
+             "key": "#333344", "key_fg": "#ffffff", "accent": "#00bcd4", "accent_fg": "#ffffff",
+             "muted": "#888899"},
+    "light": {"bg": "#ffffff", "fg": "#000000", "screen": "#eeeeee", "sidebar": "#e0e0e0",
+              "key": "#e4e4ec", "key_fg": "#000000", "accent": "#00bcd4", "accent_fg": "#ffffff",
+              "muted": "#777788"},
+}
+
+# role: {widget option: palette color}
+ROLES = {
+    "window": {"bg": "bg"},
+    "frame": {"bg": "bg"},
+    "sidebar": {"bg": "sidebar"},
+    "sidebar_item": {"bg": "sidebar", "fg": "fg"},
+    "accent": {"bg": "accent", "fg": "accent_fg"},
+    "key": {"bg": "key", "fg": "key_fg"},
+    "screen": {"bg": "screen", "fg": "fg", "insertbackground": "fg"},
+    "label": {"bg": "bg", "fg": "fg"},
+    "muted": {"bg": "bg", "fg": "muted"},
+    "busy": {"bg": "bg", "fg": "accent"},
+}
+
+STYLES = {theme: {role: {option: palette[color] for option, color in options.items()}
+                  for role, options in ROLES.items()}
+          for theme, palette in PALETTES.items()}
+
+
+class ThemeRegistry:
+    def __init__(self, theme="dark"):
+        self.theme = theme
+        self._widgets = {role: [] for role in ROLES}
+        self._callbacks = []
+
+    @property
+    def palette(self):
+        return PALETTES[self.theme]
+
+    def options(self, role):
+        return STYLES[self.theme][role]
+
+    def register(self, widget, role):
+        widget.configure(**STYLES[self.theme][role])
+        self._widgets[role].append(widget)
+        return widget
+
+    def on_change(self, callback):
+        callback(self.palette)
+        self._callbacks.append(callback)
+
+    def __len__(self):
+        return sum(len(widgets) for widgets in self._widgets.values())
+
+    def apply(self, theme):
+        with instrumentation.timed("widget.theme"):
+            self.theme = theme
+            for role, widgets in self._widgets.items():
+                options = STYLES[theme][role]
+                # Widgets destroyed since they were registered are dropped.
+                alive = [widget for widget in widgets if widget.winfo_exists()]
+                for widget in alive:
+                    widget.configure(**options)
+                widgets[:] = alive
+            for callback in self._callbacks:
+                callback(self.palette)
+
+    def toggle(self):
+        self.apply("light" if self.theme == "dark" else "dark")
+        return self.theme
@@ -0,0 +1,196 @@
+import csv
+import itertools
+import operator
+from fractions import Fraction
+
+# Module-level unit registry. Every conversion is affine (y = scale * x + offset;
+# offset is zero except for temperatures), and for each category the full
+# NxN scale and offset tables are precomputed once, from exact fractions, so a
+# conversion is a table lookup plus one multiply-add. Arrays are converted in a
+# single vectorized NumPy expression (NumPy is only imported for that path).
+
+UNITS = {
+    "length": {"mètre": 1.0, "kilomètre": 1000.0, "centimètre": 0.01,
+               "pouce": 0.0254, "pied": 0.3048, "yard": 0.9144, "mile": 1609.34},
+    "volume": {"litre": 1.0, "millilitre": 0.001, "gallon (US)": 3.78541,
+               "pinte (US)": 0.473176, "mètre cube": 1000.0},
+    "weight": {"kilogramme": 1.0, "gramme": 0.001, "tonne": 1000.0,
+               "livre": 0.453592, "once": 0.0283495},
+    "temperature": {"Celsius": None, "Fahrenheit": None, "Kelvin": None},
+    "energy": {"joule": 1.0, "kilojoule": 1000.0, "calorie": 4.184,
+               "kilocalorie": 4184.0, "watt-heure": 3600.0, "kilowatt-heure": 3.6e6},
+    "area": {"m²": 1.0, "cm²": 0.0001, "km²": 1e6, "pouce²": 0.00064516,
+             "pied²": 0.092903, "acre": 4046.86},
+    "speed": {"m/s": 1.0, "km/h": 0.277778, "mph": 0.44704, "nœud": 0.514444},
+    "time": {"seconde": 1.0, "minute": 60.0, "heure": 3600.0, "jour": 86400.0},
+    "data": {
+        "bit": 1.0,
+        "octet": 8.0,
+        "kilobit": 1e3,
+        "kilobyte": 8e3,
+        "megabit": 1e6,
+        "megabyte": 8e6,
+        "gigabit": 1e9,
+        "gigabyte": 8e9,
+        "terabit": 1e12,
+        "terabyte": 8e12,
+        "petabit": 1e15,
+        "petabyte": 8e15,
+        "exabit": 1e18,
+        "exabyte": 8e18,
+        "zettabit": 1e21,
+        "zettabyte": 8e21,
+        "yottabit": 1e24,
+        "yottabyte": 8e24
+    },
+    "pressure": {"pascal": 1.0, "bar": 1e5, "atmosphère": 101325.0, "psi": 6894.76},
+    "power": {"watt": 1.0, "kilowatt": 1000.0, "cheval vapeur": 735.5, "horsepower (US)": 745.7}
+}
+
+# Affine maps to Kelvin: K = scale * x + offset.
+TEMPERATURE = {
+    "Celsius": (Fraction(1), Fraction("273.15")),
+    "Fahrenheit": (Fraction(5, 9), Fraction("273.15") - Fraction(32 * 5, 9)),
+    "Kelvin": (Fraction(1), Fraction(0)),
+}
+
+
+class UnitCategory:
+    def __init__(self, name, to_base):
+        # to_base: {unit: (scale, offset)} mapping each unit to the base unit.
+        self.name = name
+        self.units = list(to_base)
+        self.index = {unit: i for i, unit in enumerate(self.units)}
+        self.scale = []
+        self.offset = []
+        for u in self.units:
+            su, ou = to_base[u]
+            self.scale.append([float(su / to_base[v][0]) for v in self.units])
+            self.offset.append([float((ou - to_base[v][1]) / to_base[v][0]) for v in self.units])
+
+    def coefficients(self, from_unit, to_unit):
+        try:
+            i, j = self.index[from_unit], self.index[to_unit]
+        except KeyError as e:
+            raise ValueError(f"Unité inconnue : {e.args[0]}") from None
+        return self.scale[i][j], self.offset[i][j]
+
+    def convert(self, value, from_unit, to_unit):
+        if from_unit == to_unit and from_unit in self.index:
+            return value
+        a, b = self.coefficients(from_unit, to_unit)
+        return value * a + b if b else value * a
+
+    def convert_array(self, values, from_unit, to_unit):
+        import numpy as np
+        a, b = self.coefficients(from_unit, to_unit)
+        values = np.asarray(values, dtype=float)
+        return values * a + b if b else values * a
+
+    def matrix(self):
+        import numpy as np
+        return np.array(self.scale), np.array(self.offset)
+
+
+def _build_registry():
+    registry = {}
+    for name, factors in UNITS.items():
+        if name == "temperature":
+            to_base = TEMPERATURE
+        else:
+            to_base = {unit: (Fraction(repr(f)), Fraction(0)) for unit, f in factors.items()}
+        registry[name] = UnitCategory(name, to_base)
+    return registry
+
+
+REGISTRY = _build_registry()
+
+
+def category(conv_type):
+    try:
+        return REGISTRY[conv_type]
+    except KeyError:
+        raise ValueError(f"Type de conversion inconnu : {conv_type}") from None
+
+
+def convert(value, conv_type, from_unit, to_unit):
+    return category(conv_type).convert(value, from_unit, to_unit)
+
+
+def convert_array(values, conv_type, from_unit, to_unit):
+    return category(conv_type).convert_array(values, from_unit, to_unit)
+
+
+def _column_index(column, header):
+    if isinstance(column, int) or column.strip().isdigit():
+        col = int(column)
+        if header is not None and col >= len(header):
+            raise ValueError(f"colonne {col} absente (le fichier en a {len(header)})")
+        return col
+    if header is None or column.strip() not in header:
+        raise ValueError(f"colonne inconnue : {column!r}")
+    return header.index(column.strip())
+
+
+def _parse_cells(cells):
+    # Slow path for a chunk with cells that are not numbers: NaN in their
+    # place, and their indexes.
+    values = []
+    invalid = set()
+    for i, cell in enumerate(cells):
+        try:
+            values.append(float(cell))
+        except (TypeError, ValueError):
+            values.append(float("nan"))
+            invalid.add(i)
+    return values, invalid
+
+
+def convert_csv(source, target, column, conv_type, from_unit, to_unit,
+                has_header=True, chunk_rows=65536):
+    # Streams a CSV file, converting one column chunk by chunk; other columns
+    # are copied unchanged. `column` is a header name or a 0-based index.
+    # Each chunk's column is parsed into one array and converted with a single
+    # multiply-add. Cells that are not numbers (blank, "NA") and rows too
+    # short to have the column are copied unchanged; returns the number of
+    # rows and the [(line, cell)] left unconverted.
+    import numpy as np
+    a, b = category(conv_type).coefficients(from_unit, to_unit)
+    reader = csv.reader(source)
+    writer = csv.writer(target)
+    header = None
+    if has_header:
+        header = next(reader, None)
+        if header is None:
+            return 0, []
+    col = _column_index(column, header)
+    if header is not None:
+        writer.writerow(header)
+    cell = operator.itemgetter(col)
+    count = 0
+    skipped = []
+    while True:
+        rows = list(itertools.islice(reader, chunk_rows))
+        if not rows:
+            break
+        try:
+            values = np.array(list(map(cell, rows)), dtype=float)
+            invalid = None
+        except (IndexError, ValueError):
+            values, invalid = _parse_cells([row[col] if len(row) > col else None for row in rows])
+            values = np.array(values)
+        converted = values * a + b if b else values * a
+        texts = map(repr, converted.tolist())
+        if invalid is None:
+            for row, text in zip(rows, texts):
+                row[col] = text
+        else:
+            first_line = count + 1 + has_header
+            for i, (row, text) in enumerate(zip(rows, texts)):
+                if i in invalid:
+                    skipped.append((first_line + i, row[col] if len(row) > col else ""))
+                else:
+                    row[col] = text
+        writer.writerows(rows)
+        count += len(rows)
+    return count, skipped
@@ -0,0 +1,150 @@
+import math
+import re
+from collections import namedtuple
+from collections.abc import Mapping
+
+from expression_engine import BACKENDS, compile_expression
+
+# User-defined variables ("a = 2.5") and functions of several parameters
+# ("f(x, a, b) = a*sin(b*x)"). The expression engine resolves unknown names
+# and calls through the env mapping it is given; a Scope is that mapping. It
+# holds plain values and function texts only, so it can be sent to a worker
+# process, and function bodies are compiled (and cached) for the backend of
+# the scope, so the same definition works on floats, mpmath numbers and
+# NumPy arrays.
+
+Definition = namedtuple("Definition", ["kind", "name", "params", "body"])
+
+DEFINITION_RE = re.compile(r"^\s*([A-Za-z_]\w*)\s*(?:\(([^()]*)\))?\s*=\s*(\S.*)$", re.S)
+NAME_RE = re.compile(r"[A-Za-z_]\w*$")
+RESERVED = {"ans"}
+
+
+def _check_name(name):
+    builtins = BACKENDS["math"]
+    if name in builtins["functions"] or name in builtins["constants"] or name in RESERVED:
+        raise ValueError(f"« {name} » est un nom réservé")
+
+
+def parse_definition(text):
+    # Returns a Definition, or None when text is not of the form
+    # "name = expression" / "name(p1, p2, ...) = expression".
+    m = DEFINITION_RE.match(text)
+    if not m:
+        return None
+    name, params, body = m.groups()
+    _check_name(name)
+    if params is None:
+        compile_expression(body)
+        return Definition("variable", name, (), body.strip())
+    params = tuple(p.strip() for p in params.split(",")) if params.strip() else ()
+    for p in params:
+        if not NAME_RE.match(p):
+            raise ValueError(f"paramètre invalide : {p!r}")
+        _check_name(p)
+    if len(set(params)) != len(params):
+        raise ValueError("paramètre en double")
+    compile_expression(body)
+    return Definition("function", name, params, body.strip())
+
+
+class UserFunction:
+    __slots__ = ("name", "params", "body")
+
+    def __init__(self, name, params, body):
+        self.name = name
+        self.params = params
+        self.body = body
+
+    def __repr__(self):
+        return f"{self.name}({', '.join(self.params)}) = {self.body}"
+
+
+class Workspace:
+    def __init__(self):
+        self.variables = {}
+        self.functions = {}
+        # Bumped on every change, so results computed from a scope (plotted
+        # curves) can tell whether the definitions they used are still current.
+        self.version = 0
+
+    def set_variable(self, name, value):
+        _check_name(name)
+        self.functions.pop(name, None)
+        self.variables[name] = value
+        self.version += 1
+
+    def define_function(self, name, params, body):
+        _check_name(name)
+        self.variables.pop(name, None)
+        self.functions[name] = UserFunction(name, tuple(params), body)
+        self.version += 1
+
+    def remove(self, name):
+        self.variables.pop(name, None)
+        self.functions.pop(name, None)
+        self.version += 1
+
+    def clear(self):
+        self.variables.clear()
+        self.functions.clear()
+        self.version += 1
+
+    def listing(self):
+        lines = [f"{name} = {value}" for name, value in self.variables.items()]
+        lines += [repr(fn) for fn in self.functions.values()]
+        return lines
+
+    def scope(self, backend="math", local=None):
+        # A snapshot: later definitions do not affect a scope already handed
+        # to a worker.
+        return Scope(dict(self.variables), dict(self.functions), backend, local, self.version)
+
+    def float_scope(self, local=None):
+        # For live previews: every value as a float, so nothing can start an
+        # exact big-integer computation. Values that are not numbers are left out.
+        def floats(values):
+            out = {}
+            for name, value in values.items():
+                try:
+                    out[name] = float(value)
+                except OverflowError:
+                    out[name] = math.inf if value > 0 else -math.inf
+                except (TypeError, ValueError):
+                    pass
+            return out
+        return Scope(floats(self.variables), dict(self.functions), "float", floats(local or {}),
+                     self.version)
+
+
+class Scope(Mapping):
+    def __init__(self, variables, functions, backend="math", local=None, version=None):
+        self.variables = variables
+        self.functions = functions
+        self.backend = backend
+        self.local = local or {}
+        self.version = version
+
+    def __getitem__(self, name):
+        if name in self.local:
+            return self.local[name]
+        if name in self.variables:
+            return self.variables[name]
+        fn = self.functions[name]
+        return lambda *args: self.call(fn, *args)
+
+    def __iter__(self):
+        return iter({**self.local, **self.variables, **self.functions})
+
+    def __len__(self):
+        return len({**self.local, **self.variables, **self.functions})
+
+    def with_locals(self, local):
+        return Scope(self.variables, self.functions, self.backend, {**self.local, **local}, self.version)
+
+    def call(self, fn, *args):
+        if len(args) != len(fn.params):
+            raise TypeError(f"{fn.name}() attend {len(fn.params)} argument(s), {len(args)} donné(s)")
+        # Function bodies see their parameters and the workspace, not the caller's locals.
+        inner = Scope(self.variables, self.functions, self.backend, dict(zip(fn.params, args)))
+        return compile_expression(fn.body, self.backend)(inner)